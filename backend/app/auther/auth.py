@@ -1,6 +1,6 @@
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import datetime, timedelta
+from uuid import uuid4
 from typing import Optional
 from jose import jwt
 from config import Config
@@ -12,23 +12,16 @@ ACCESS_TOKEN_EXPIRE_MINUTES = Config.ACCESS_TOKEN_EXPIRE_MINUTES
 
 # Configurando Redis
 
-# Configurando o contexto de criptografia de senha
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hash e verificação de senhas: app.auther.hashing
 
 # Configurando OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+# Sem o cabeçalho devolve None em vez de 401 (rotas em que a autenticação é configurável)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
-# Função para gerar senha hash
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
-# Função para verificar senha
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-# Função para criar u de acesso
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
+# Função para criar u de acesso (com um "jti" único, usado na revogação; gerado aqui se não vier)
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None, jti: Optional[str] = None):
+    to_encode = {**data, "jti": jti or uuid4().hex}
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -0,0 +1,130 @@
+# Hash e verificação de senhas (bcrypt) fora do worker da API.
+#
+# Cada operação do bcrypt custa centenas de milissegundos de CPU; feita no próprio processo,
+# uma rajada de logins (troca de turno) ocupa o GIL e atrasa todas as outras rotas. Aqui as
+# operações vão para um pool de Config.PASSWORD_HASH_WORKERS processos (0 usa o pool de threads
+# do próprio processo), com no máximo Config.PASSWORD_HASH_QUEUE_LIMIT operações esperando
+# além das que estão em execução: acima disso o login/cadastro recebe 503 com Retry-After na
+# hora, em vez de se acumular e estourar o tempo do cliente.
+#
+# O custo do bcrypt vem de Config.BCRYPT_ROUNDS. Hashes gravados com outro custo continuam
+# válidos e são refeitos com o custo atual no próximo login bem-sucedido (verify_and_update).
+#
+# Benchmark da rajada de logins: benchmarks/bench_login_storm.py.
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from fastapi import FastAPI, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from passlib.context import CryptContext
+
+from app.logging.logger import AppLogger
+from config import Config
+
+logger = AppLogger().get_logger()
+
+_executor = None
+_pending = 0
+
+
+# Contexto do passlib para um custo (um por custo em cada processo do pool)
+@lru_cache(maxsize=None)
+def password_context(rounds):
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+# Funções executadas nos processos do pool (recebem o custo, que pode mudar sem reiniciar o pool)
+def _hash(password, rounds):
+    return password_context(rounds).hash(password)
+
+
+def _verify_and_update(password, password_hash, rounds):
+    return password_context(rounds).verify_and_update(password, password_hash)
+
+
+def _warm_up(rounds):
+    password_context(rounds)
+
+
+def _executor_or_none():
+    global _executor
+    if _executor is None and Config.PASSWORD_HASH_WORKERS > 0:
+        # spawn: o worker pode ter threads (pools do Redis) e o fork copiaria os locks delas
+        _executor = ProcessPoolExecutor(
+            max_workers=Config.PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def _unavailable():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Muitos logins em andamento. Tente novamente em instantes.",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def _run(function, *args):
+    global _pending, _executor
+    workers = Config.PASSWORD_HASH_WORKERS or 1
+    if _pending >= workers + Config.PASSWORD_HASH_QUEUE_LIMIT:
+        logger.warning(f"Fila do bcrypt cheia ({_pending} operações); requisição recusada")
+        raise _unavailable()
+    _pending += 1
+    try:
+        executor = _executor_or_none()
+        if executor is None:
+            return await run_in_threadpool(function, *args)
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+    except BrokenProcessPool:
+        # Um processo do pool morreu (ex.: falta de memória): o pool é recriado na próxima chamada
+        logger.error("Pool de processos do bcrypt interrompido; será recriado")
+        if _executor is executor:
+            _executor = None
+        raise _unavailable()
+    finally:
+        _pending -= 1
+
+
+# Hash da senha com o custo atual
+async def hash_password(password):
+    return await _run(_hash, password, Config.BCRYPT_ROUNDS)
+
+
+# Verifica a senha; devolve (válida, novo hash ou None). O novo hash vem quando o gravado usa
+# outro custo e deve substituir o antigo.
+async def verify_password(password, password_hash):
+    return await _run(_verify_and_update, password, password_hash, Config.BCRYPT_ROUNDS)
+
+
+# Sobe os processos no startup, para o primeiro login não pagar a criação deles
+async def start_pool():
+    global _executor
+    executor = _executor_or_none()
+    if executor is None:
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, _warm_up, Config.BCRYPT_ROUNDS)
+            for _ in range(Config.PASSWORD_HASH_WORKERS)
+        ))
+    except BrokenProcessPool:
+        logger.error("Não foi possível iniciar o pool de processos do bcrypt; nova tentativa no primeiro uso")
+        _executor = None
+
+
+async def stop_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def configure(app: FastAPI):
+    app.add_event_handler("startup", start_pool)
+    app.add_event_handler("shutdown", stop_pool)
@@ -0,0 +1,317 @@
+# Revogação de tokens (tablet perdido, logout).
+#
+# Cada token emitido por create_access_token leva um identificador "jti". Revogar grava o jti
+# no sorted set "revoked_tokens" com o "exp" do token como score: entradas vencidas são
+# removidas a cada revogação e a chave expira junto com o último token revogado. O jti também
+# é publicado no canal Config.REVOCATION_CHANNEL.
+#
+# Cada worker mantém um filtro de Bloom com os jtis revogados, carregado do sorted set no
+# startup (e de novo quando a assinatura do canal falha) e atualizado pelas mensagens do canal.
+# get_current_user consulta o filtro: um jti fora dele, o caso comum, é aceito sem sair do
+# processo; um positivo (revogado ou falso positivo, cerca de Config.REVOCATION_FILTER_ERROR_RATE)
+# é confirmado com um ZSCORE. Sem a assinatura ativa todo token é conferido no Redis. O filtro
+# não remove itens e é reconstruído a cada Config.REVOCATION_FILTER_REBUILD_INTERVAL segundos
+# de revogações, descartando os jtis vencidos.
+#
+# O login registra o jti de cada token no sorted set "issued_tokens:<usuário>", também com o exp
+# como score e expirando junto com o último token: as rotas /admin/users/{username}/tokens
+# listam os tokens ainda válidos de um usuário e revogam todos eles, sem que os jtis precisem
+# aparecer no log.
+#
+# Tokens sem jti (emitidos antes da revogação existir) não podem ser revogados e expiram em até
+# Config.ACCESS_TOKEN_EXPIRE_MINUTES.
+import hashlib
+import math
+import threading
+import time
+from typing import Optional
+
+import redis
+import redis.asyncio
+from fastapi import APIRouter, Depends, FastAPI, Form, Header, HTTPException, Response, status
+from jose import JWTError
+
+from app.auther.auth import oauth2_scheme
+from app.auther.token_cache import decode_token
+from app.logging.logger import AppLogger
+from app.redis_setting.async_pool import get_redis_client
+from app.redis_setting.backup import require_admin
+from app.redis_setting import cluster, redis_pool
+from config import Config
+
+logger = AppLogger().get_logger()
+router = APIRouter()
+
+REVOKED_TOKENS = "revoked_tokens"
+ISSUED_TOKENS_PREFIX = "issued_tokens"
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    # Posições dos bits do item (hash duplo sobre um blake2b de 128 bits)
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+def new_filter(items=()):
+    items = list(items)
+    bloom = BloomFilter(max(Config.REVOCATION_FILTER_CAPACITY, 2 * len(items)), Config.REVOCATION_FILTER_ERROR_RATE)
+    for item in items:
+        bloom.add(item)
+    return bloom
+
+
+_filter = None
+_filter_built = 0.0
+# jtis recebidos enquanto o filtro é recarregado, reaplicados no filtro novo
+_received_during_load = None
+_lock = threading.Lock()
+_listener = None
+
+
+def _text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+# Recarrega o filtro com os jtis ainda válidos do sorted set
+def load_filter(redis_client):
+    global _filter, _filter_built, _received_during_load
+    with _lock:
+        _received_during_load = []
+    try:
+        jtis = [_text(jti) for jti in redis_client.zrangebyscore(REVOKED_TOKENS, time.time(), "+inf")]
+    except (redis.RedisError, OSError):
+        with _lock:
+            _received_during_load = None
+        raise
+    with _lock:
+        bloom = new_filter(jtis + _received_during_load)
+        _filter, _filter_built, _received_during_load = bloom, time.monotonic(), None
+    logger.info(f"Filtro de tokens revogados carregado com {len(jtis)} jtis")
+
+
+def _add_to_filter(jti):
+    with _lock:
+        if _received_during_load is not None:
+            _received_during_load.append(jti)
+        if _filter is not None:
+            _filter.add(jti)
+
+
+# O token foi revogado? Só consulta o Redis quando o filtro não descarta o jti
+async def is_revoked(redis_client, payload):
+    jti = payload.get("jti")
+    if jti is None:
+        return False
+    bloom = _filter
+    if bloom is not None and jti not in bloom:
+        return False
+    expires_at = await redis_client.zscore(REVOKED_TOKENS, jti)
+    return expires_at is not None and expires_at > time.time()
+
+
+def issued_tokens_key(username):
+    return f"{ISSUED_TOKENS_PREFIX}:{username}"
+
+
+# Grava {membro: exp} no sorted set, descarta os vencidos e faz a chave expirar junto com o
+# último membro
+async def _add_until_expiry(redis_client, key, members):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zadd(key, members)
+    pipe.zremrangebyscore(key, "-inf", time.time())
+    pipe.zrange(key, -1, -1, withscores=True)
+    _, _, last = await pipe.execute()
+    # Vazio quando os membros venceram entre o filtro de quem chama e a remoção dos vencidos
+    if last:
+        await redis_client.expireat(key, math.ceil(last[0][1]))
+
+
+# Registra o token emitido no login (jti do usuário até o exp do token)
+async def record_issued_token(redis_client, username, jti, exp):
+    await _add_until_expiry(redis_client, issued_tokens_key(username), {jti: exp})
+
+
+# Tokens ainda válidos emitidos para o usuário: {jti: exp}
+async def issued_tokens(redis_client, username):
+    tokens = await redis_client.zrangebyscore(issued_tokens_key(username), time.time(), "+inf", withscores=True)
+    return {_text(jti): exp for jti, exp in tokens}
+
+
+# Revoga os tokens {jti: exp} (exp em epoch, segundos) ainda não expirados; devolve quantos
+async def revoke_tokens(redis_client, tokens):
+    now = time.time()
+    tokens = {jti: exp for jti, exp in tokens.items() if exp > now}
+    if not tokens:
+        return 0
+    await _add_until_expiry(redis_client, REVOKED_TOKENS, tokens)
+    for jti in tokens:
+        _add_to_filter(jti)
+    # No cluster o PUBLISH não tem chave para escolher o nó e chega aos inscritos de qualquer nó
+    target = {"target_nodes": redis.asyncio.RedisCluster.RANDOM} if cluster.enabled() else {}
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for jti in tokens:
+            pipe.publish(Config.REVOCATION_CHANNEL, jti, **target)
+        await pipe.execute()
+    except redis.RedisError as e:
+        # Já gravado: os outros workers que não receberem a mensagem continuam aceitando os
+        # tokens até recarregarem o filtro
+        logger.error(f"Erro ao publicar a revogação de {len(tokens)} tokens: {str(e)}")
+    logger.info(f"{len(tokens)} tokens revogados")
+    return len(tokens)
+
+
+# Revoga o jti até exp; devolve False se o token já expirou
+async def revoke(redis_client, jti, exp):
+    return await revoke_tokens(redis_client, {jti: exp}) == 1
+
+
+# Revoga todos os tokens ainda válidos do usuário; devolve quantos
+async def revoke_user_tokens(redis_client, username):
+    tokens = await issued_tokens(redis_client, username)
+    revoked = await revoke_tokens(redis_client, tokens)
+    if tokens:
+        # Só os revogados: um login feito durante a revogação continua registrado
+        await redis_client.zrem(issued_tokens_key(username), *tokens)
+    return revoked
+
+
+# Mensagem do canal (na thread da assinatura, onde o filtro também é reconstruído)
+def _on_revocation(message):
+    _add_to_filter(_text(message["data"]))
+    if _filter is not None and time.monotonic() - _filter_built > Config.REVOCATION_FILTER_REBUILD_INTERVAL:
+        load_filter(redis_pool.get_redis_client())
+
+
+# Mensagens perdidas durante a falha: o filtro é descartado (tudo vai ao Redis) e recarregado
+def _on_listener_error(error, pubsub, thread):
+    global _filter
+    logger.error(f"Erro na assinatura das revogações de tokens: {str(error)}")
+    _filter = None
+    time.sleep(1)
+    try:
+        load_filter(redis_pool.get_redis_client())
+    except (redis.RedisError, OSError) as e:
+        logger.error(f"Não foi possível recarregar o filtro de tokens revogados: {str(e)}")
+
+
+def start_listener():
+    global _listener
+    if _listener is not None:
+        return
+    redis_client = redis_pool.get_redis_client()
+    try:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{Config.REVOCATION_CHANNEL: _on_revocation})
+        load_filter(redis_client)
+    except (redis.RedisError, OSError) as e:
+        logger.error(f"Filtro de tokens revogados desativado, cada token será conferido no Redis: {str(e)}")
+        return
+    _listener = pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=_on_listener_error)
+
+
+def stop_listener():
+    global _listener, _filter
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener, _filter = None, None
+
+
+# Endpoint para revogar o próprio token (logout)
+@router.post(
+    "/token/revoke",
+    tags=["User Management"],
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def revoke_own_token(
+    token: str = Depends(oauth2_scheme),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+):
+    try:
+        payload = decode_token(token)
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Não foi possível validar as credenciais",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if payload.get("jti") is None:
+        raise HTTPException(status_code=400, detail="Token sem identificador (jti) não pode ser revogado.")
+    await revoke(redis_client, payload["jti"], payload["exp"])
+    await redis_client.zrem(issued_tokens_key(payload["sub"]), payload["jti"])
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# Endpoint administrativo para revogar um token pelo jti (ver GET /admin/users/{username}/tokens).
+# Sem o exp, vale pela duração máxima de um token.
+@router.post(
+    "/admin/tokens/revoke",
+    tags=["Admin"],
+    status_code=status.HTTP_204_NO_CONTENT
+)
+async def revoke_token_by_jti(
+    jti: str = Form(...),
+    exp: Optional[float] = Form(None),
+    x_admin_token: Optional[str] = Header(None),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+):
+    require_admin(x_admin_token)
+    if exp is None:
+        exp = time.time() + Config.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    if not await revoke(redis_client, jti, exp):
+        raise HTTPException(status_code=400, detail="Token já expirado.")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# Endpoint administrativo com os tokens ainda válidos de um usuário
+@router.get(
+    "/admin/users/{username}/tokens",
+    tags=["Admin"]
+)
+async def list_user_tokens(
+    username: str,
+    x_admin_token: Optional[str] = Header(None),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+):
+    require_admin(x_admin_token)
+    tokens = await issued_tokens(redis_client, username)
+    return [{"jti": jti, "exp": exp} for jti, exp in tokens.items()]
+
+
+# Endpoint administrativo para revogar todos os tokens de um usuário (ex.: tablet perdido)
+@router.post(
+    "/admin/users/{username}/tokens/revoke",
+    tags=["Admin"]
+)
+async def revoke_all_user_tokens(
+    username: str,
+    x_admin_token: Optional[str] = Header(None),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+):
+    require_admin(x_admin_token)
+    return {"revoked": await revoke_user_tokens(redis_client, username)}
+
+
+def configure(app: FastAPI):
+    app.add_event_handler("startup", start_listener)
+    app.add_event_handler("shutdown", stop_listener)
+    app.include_router(router)
@@ -0,0 +1,60 @@
+# Caches da autenticação (por processo), usados por get_current_user.
+#
+# - Tokens verificados: o token inteiro (cabeçalho, payload e assinatura, não só a assinatura,
+#   para que um payload alterado nunca acerte o cache) -> payload decodificado, até o "exp" do
+#   token, num LRU de até Config.AUTH_TOKEN_CACHE_SIZE entradas. Um token repetido não passa de
+#   novo pelo HMAC nem pela decodificação.
+# - Usuários: "user:<nome>" -> registro, por Config.AUTH_USER_CACHE_TTL segundos, para que as
+#   requisições autenticadas não leiam o usuário no Redis a cada chamada. Um usuário removido
+#   continua aceito por no máximo esse tempo.
+# Estatísticas em GET /auth/cache/stats.
+import time
+
+from fastapi import APIRouter, FastAPI
+from jose import jwt
+
+from app.redis_setting.local_cache import LocalCache, MISSING
+from config import Config
+
+router = APIRouter()
+
+token_cache = LocalCache(Config.AUTH_TOKEN_CACHE_SIZE, ttl=0)
+user_cache = LocalCache(Config.AUTH_USER_CACHE_SIZE, Config.AUTH_USER_CACHE_TTL)
+
+
+# Payload do token verificado (assinatura e validade); JWTError se for inválido
+def decode_token(token):
+    payload = token_cache.get(token)
+    if payload is not MISSING and payload["exp"] > time.time():
+        return payload
+    payload = jwt.decode(token, Config.SECRET_KEY, algorithms=[Config.ALGORITHM])
+    if not isinstance(payload.get("exp"), (int, float)):
+        # Sem validade não há até quando guardar: verificado de novo a cada uso
+        return payload
+    token_cache.set(token, payload, ttl=payload["exp"] - time.time())
+    return payload
+
+
+# Registro do usuário, do cache ou lido por loader()
+async def cached_user(user_id, loader):
+    user = user_cache.get(user_id)
+    if user is not MISSING:
+        return user
+    user = await loader()
+    if user is not None:
+        user_cache.set(user_id, user)
+    return user
+
+
+def clear():
+    token_cache.clear()
+    user_cache.clear()
+
+
+@router.get("/auth/cache/stats", tags=["Cache"])
+def get_auth_cache_stats():
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+
+def configure(app: FastAPI):
+    app.include_router(router)
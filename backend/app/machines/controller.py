@@ -4,23 +4,55 @@ from fastapi import (
     HTTPException,
     status,
     FastAPI,
+    Query,
+    Response,
+    Header,
+    Body,
 )
-import json
 from .models.schemas import (
     CreateMachinesSchema,
     DeleteMachinesSchema,
     GetMachinesSchema,
     GetAllMachinesSchema,
     UpdateMachinesSchema,
+    BulkUpdateMachinesSchema,
 )
 from app.logging.logger import AppLogger
 import redis
-from app.redis_setting.redis_pool import get_redis_client
-from typing import List
+import redis.asyncio
+from app.redis_setting.async_pool import (
+    get_redis_client,
+    fetch_collection,
+    fetch_collection_paginated,
+    load_record,
+    create_record,
+    merge_record,
+    delete_record,
+)
+from app.redis_setting.redis_pool import RECORD_EXISTS, MERGE_NOT_FOUND, DELETE_NOT_FOUND
+from app.redis_setting.replicas import get_read_client
+from app.redis_setting.cluster import record_key
+from app.redis_setting.streaming import wants_ndjson, ndjson_response
+from app.redis_setting.local_cache import cached_async, invalidate_async
+from app.redis_setting.versions import bump_versions_async, current_etag_async, not_modified_response
+from app.redis_setting.snapshots import collection_snapshot_response_async
+from app.redis_setting.trusted_reads import read_record, list_response
+from app.redis_setting.bulk import (
+    BulkItem,
+    BulkResultSchema,
+    bulk_create_async,
+    bulk_update_async,
+    bulk_delete_async,
+    notify_bulk_changes_async,
+)
+from typing import List, Optional
+from app.users.controller import require_user
+from config import Config
 from dependency_injector.wiring import inject
 
 logger = AppLogger().get_logger()
-router = APIRouter()
+# Todas as rotas exigem um usuário autenticado (ver Config.AUTH_REQUIRED)
+router = APIRouter(dependencies=[Depends(require_user)])
 
 # Endpoint para registrar uma nova máquina
 @router.post(
@@ -29,55 +61,140 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,
     response_model=CreateMachinesSchema,
 )
-def machine_register(
+async def machine_register(
     machine_create: CreateMachinesSchema,
-    redis_client: redis.Redis = Depends(get_redis_client),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client),
 ) -> CreateMachinesSchema:
     logger.info(f"Criando uma nova máquina {machine_create.name}")
-    machine_id = f"machine:{machine_create.serial_number}"
-
-    try:
-        if redis_client.exists(machine_id):
-            raise HTTPException(status_code=400, detail="Máquina já registrada.")
+    machine_id = record_key("machine", machine_create.serial_number)
 
-        machine_data = machine_create.dict()
-        machine_data_json = json.dumps(machine_data)
-        redis_client.set(machine_id, machine_data_json)
-        redis_client.sadd("machines_list", machine_id)
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    machine_data = machine_create.dict()
+    if await create_record(redis_client, machine_id, machine_data, sets=["machines_list"]) == RECORD_EXISTS:
+        raise HTTPException(status_code=400, detail="Máquina já registrada.")
+    await invalidate_async(redis_client, machine_id, "machines_list")
+    await bump_versions_async(redis_client, machine_id, "machines_list")
 
     return machine_create
 
 
+# Endpoints em lote (sincronização com o ERP): o lote inteiro é validado e gravado em pipelines,
+# com um resultado por item. Declarados antes das rotas /machines/{serial_number}.
+@router.post(
+    "/machines/bulk",
+    tags=["Machine Manage"],
+    response_model=BulkResultSchema,
+)
+async def machines_bulk_register(
+    machines_create: List[CreateMachinesSchema] = Body(..., min_items=1, max_items=Config.BULK_MAX_ITEMS),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client),
+) -> BulkResultSchema:
+    logger.info(f"Criando {len(machines_create)} máquinas em lote")
+    items = [
+        BulkItem(machine.serial_number, record_key("machine", machine.serial_number), machine.dict(), {"sets": ["machines_list"]})
+        for machine in machines_create
+    ]
+
+    result, changed = await bulk_create_async(redis_client, items, "Máquina já registrada.")
+    await notify_bulk_changes_async(redis_client, changed, "machines_list")
+
+    return result
+
+
+@router.put(
+    "/machines/bulk",
+    tags=["Machine Manage"],
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=BulkResultSchema,
+)
+async def machines_bulk_update(
+    machines_update: List[BulkUpdateMachinesSchema] = Body(..., min_items=1, max_items=Config.BULK_MAX_ITEMS),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client),
+) -> BulkResultSchema:
+    logger.info(f"Atualizando {len(machines_update)} máquinas em lote")
+    items = [
+        BulkItem(
+            machine.serial_number,
+            record_key("machine", machine.serial_number),
+            machine.dict(exclude_unset=True, exclude={"serial_number"}),
+        )
+        for machine in machines_update
+    ]
+
+    result, changed = await bulk_update_async(redis_client, items, "Máquina não encontrada")
+    await notify_bulk_changes_async(redis_client, changed, "machines_list")
+
+    return result
+
+
+@router.delete(
+    "/machines/bulk",
+    tags=["Machine Manage"],
+    response_model=BulkResultSchema,
+)
+async def machines_bulk_delete(
+    serial_numbers: List[str] = Body(..., min_items=1, max_items=Config.BULK_MAX_ITEMS),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client),
+) -> BulkResultSchema:
+    logger.info(f"Removendo {len(serial_numbers)} máquinas em lote")
+    items = [
+        BulkItem(serial_number, record_key("machine", serial_number), options={"sets": ["machines_list"]})
+        for serial_number in serial_numbers
+    ]
+
+    result, changed = await bulk_delete_async(redis_client, items, "Máquina não encontrada")
+    await notify_bulk_changes_async(redis_client, changed, "machines_list")
+
+    return result
+
+
+# Confere os registros de máquinas lidos do Redis, ignorando os inválidos
+async def _decode_machines(records):
+    async for key, machine_data_dict in records:
+        try:
+            yield read_record(GetAllMachinesSchema, machine_data_dict)
+        except ValueError as e:
+            logger.error(f"Erro ao decodificar os dados da máquina: {str(e)}")
+
+
 # Endpoint para obter todas as máquinas registradas
+# (Accept: application/x-ndjson envia uma máquina por linha, em streaming)
+# A lista completa é servida do snapshot pré-serializado; páginas e streaming leem direto do Redis
 @router.get(
     "/machines",
     tags=["Machine Manage"],
     response_model=List[GetAllMachinesSchema],
 )
-def get_machines(
-    redis_client: redis.Redis = Depends(get_redis_client),
+async def get_machines(
+    response: Response,
+    cursor: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=Config.MAX_PAGE_SIZE),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    redis_client: redis.asyncio.Redis = Depends(get_read_client),
 ) -> List[GetAllMachinesSchema]:
     logger.info("Obtendo todas as máquinas")
+    stream = wants_ndjson(accept)
 
-    try:
-        machine_keys = redis_client.smembers("machines_list")
-        machines = []
-
-        for key in machine_keys:
-            machine_data = redis_client.get(key)
-            if machine_data:
-                try:
-                    machine_data_dict = json.loads(machine_data.decode("utf-8"))
-                    if not isinstance(machine_data_dict, dict):
-                        raise ValueError(f"Formato inválido de dados: {machine_data_dict}")
-                    machines.append(CreateMachinesSchema(**machine_data_dict))
-                except (json.JSONDecodeError, ValueError) as e:
-                    logger.error(f"Erro ao decodificar os dados da máquina: {str(e)}")
-        return machines
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    # ETag da coleção: 304 sem ler os registros se o cliente já tem a versão atual
+    if not stream:
+        etag = await current_etag_async(redis_client, "machines_list")
+        not_modified = not_modified_response(response, if_none_match, etag)
+        if not_modified:
+            return not_modified
+    if cursor is None and limit is None and not stream:
+        return await collection_snapshot_response_async(
+            redis_client,
+            "machines_list",
+            etag,
+            lambda: _decode_machines(fetch_collection(redis_client, "machines_list")),
+            accept_encoding,
+        )
+    records = await fetch_collection_paginated(redis_client, "machines_list", response, cursor, limit, stream)
+    machines = _decode_machines(records)
+    if stream:
+        return ndjson_response(machines, headers=response.headers)
+    return list_response([machine async for machine in machines], response)
 
 
 # Endpoint para obter uma máquina específica pelo número de série
@@ -86,27 +203,29 @@ def get_machines(
     tags=["Machine Manage"],
     response_model=GetMachinesSchema,
 )
-def get_machine(
+async def get_machine(
     serial_number: str,
-    redis_client: redis.Redis = Depends(get_redis_client),
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    redis_client: redis.asyncio.Redis = Depends(get_read_client),
 ) -> GetMachinesSchema:
     logger.info(f"Obtendo máquina com número de série: {serial_number}")
-    machine_id = f"machine:{serial_number}"
-
-    try:
-        machine_data = redis_client.get(machine_id)
-        if not machine_data:
-            raise HTTPException(status_code=404, detail="Máquina não encontrada")
+    machine_id = record_key("machine", serial_number)
 
+    async def load_machine():
         try:
-            machine_data_dict = json.loads(machine_data.decode("utf-8"))
-            if not isinstance(machine_data_dict, dict):
-                raise ValueError(f"Formato inválido de dados: {machine_data_dict}")
-        except (json.JSONDecodeError, ValueError) as e:
+            machine_data_dict = await load_record(redis_client, machine_id)
+        except ValueError as e:
             raise HTTPException(status_code=500, detail=f"Erro ao decodificar os dados da máquina: {str(e)}")
+        if not machine_data_dict:
+            raise HTTPException(status_code=404, detail="Máquina não encontrada")
         return CreateMachinesSchema(**machine_data_dict)
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+
+    etag = await current_etag_async(redis_client, machine_id)
+    not_modified = not_modified_response(response, if_none_match, etag)
+    if not_modified:
+        return not_modified
+    return await cached_async(machine_id, load_machine, etag)
 
 
 # Endpoint para atualizar dados de uma máquina
@@ -116,32 +235,24 @@ def get_machine(
     status_code=status.HTTP_202_ACCEPTED,
     response_model=UpdateMachinesSchema,
 )
-def update_machine(
+async def update_machine(
     serial_number: str,
     machine_update: UpdateMachinesSchema,
-    redis_client: redis.Redis = Depends(get_redis_client),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client),
 ) -> UpdateMachinesSchema:
     logger.info(f"Atualizando dados da máquina com número de série: {serial_number}")
-    machine_id = f"machine:{serial_number}"
+    machine_id = record_key("machine", serial_number)
 
     try:
-        machine_data = redis_client.get(machine_id)
-        if not machine_data:
+        # Apenas os campos enviados são mesclados, no próprio Redis
+        result, machine_data_dict = await merge_record(redis_client, machine_id, machine_update.dict(exclude_unset=True))
+        if result == MERGE_NOT_FOUND:
             raise HTTPException(status_code=404, detail="Máquina não encontrada")
-
-        try:
-            machine_data_dict = json.loads(machine_data.decode("utf-8"))
-            if not isinstance(machine_data_dict, dict):
-                raise ValueError(f"Formato inválido de dados: {machine_data_dict}")
-        except (json.JSONDecodeError, ValueError) as e:
-            raise HTTPException(status_code=500, detail=f"Erro ao decodificar os dados da máquina: {str(e)}")
-
-        machine_data_dict.update(machine_update.dict())
-        machine_data_json = json.dumps(machine_data_dict)
-        redis_client.set(machine_id, machine_data_json)
+        await invalidate_async(redis_client, machine_id, "machines_list")
+        await bump_versions_async(redis_client, machine_id, "machines_list")
         return CreateMachinesSchema(**machine_data_dict)
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    except redis.ResponseError as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao decodificar os dados da máquina: {str(e)}")
 
 
 # Endpoint para excluir uma máquina
@@ -151,22 +262,18 @@ def update_machine(
     status_code=status.HTTP_200_OK,
     response_model=DeleteMachinesSchema,
 )
-def delete_machine(
+async def delete_machine(
     serial_number: str,
-    redis_client: redis.Redis = Depends(get_redis_client),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client),
 ) -> DeleteMachinesSchema:
     logger.info(f"Removendo máquina com número de série: {serial_number}")
-    machine_id = f"machine:{serial_number}"
-
-    try:
-        machine_data = redis_client.get(machine_id)
-        if not machine_data:
-            raise HTTPException(status_code=404, detail="Máquina não encontrada")
+    machine_id = record_key("machine", serial_number)
 
-        redis_client.srem("machines_list", machine_id)
-        redis_client.delete(machine_id)
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    # Registro e entrada na lista removidos atomicamente (script de remoção)
+    if await delete_record(redis_client, machine_id, sets=["machines_list"]) == DELETE_NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Máquina não encontrada")
+    await invalidate_async(redis_client, machine_id, "machines_list")
+    await bump_versions_async(redis_client, machine_id, "machines_list")
 
     return DeleteMachinesSchema(machine_id=serial_number)
 
@@ -21,6 +21,9 @@ class UpdateMachinesSchema(BaseModel):
     maintenance_history: Optional[List[str]] = None
     status: Optional[str] = None
 
+class BulkUpdateMachinesSchema(UpdateMachinesSchema):
+    serial_number: str
+
 class DeleteMachinesSchema(BaseModel):
     machine_id: str
 
@@ -1,19 +1,63 @@
-from fastapi import FastAPI, Depends, HTTPException, status, APIRouter
+from fastapi import FastAPI, Depends, HTTPException, status, APIRouter, Query, Response, Header, Body
 from .models.schemas import (
     CreateMaintenanceSchema,
     DeleteMaintenanceSchema,
     GetMaintenanceSchema,
     GetAllMaintenanceSchema,
-    UpdateMaintenanceSchema
+    UpdateMaintenanceSchema,
+    BulkUpdateMaintenanceSchema,
 )
 from app.logging.logger import AppLogger
-import json
 from typing import Optional, List
-from app.redis_setting.redis_pool import get_redis_client
+from datetime import date
+from app.redis_setting.async_pool import (
+    get_redis_client,
+    fetch_collection,
+    fetch_collection_paginated,
+    load_record,
+    create_record,
+    merge_record,
+    delete_record,
+)
+from app.redis_setting.redis_pool import (
+    RECORD_EXISTS,
+    RECORD_REQUIREMENT_MISSING,
+    MERGE_NOT_FOUND,
+    MERGE_REQUIREMENT_MISSING,
+    DELETE_NOT_FOUND,
+)
+from app.redis_setting.replicas import get_read_client
+from app.redis_setting.cluster import record_key, reference_key
+from app.redis_setting.streaming import wants_ndjson, ndjson_response
+from app.redis_setting.versions import bump_versions_async, current_etag_async, not_modified_response
+from app.redis_setting.snapshots import collection_snapshot_response_async
+from app.redis_setting.trusted_reads import read_record, list_response
+from app.redis_setting.bulk import (
+    BulkItem,
+    BulkResultSchema,
+    bulk_create_async,
+    bulk_update_async,
+    bulk_delete_async,
+    notify_bulk_changes_async,
+)
+from .indexes import (
+    MAINTENANCE_LIST,
+    DATE_INDEX,
+    creation_indexes,
+    index_prefixes,
+    update_indexes,
+    filtered_list_name_async,
+    query_client,
+    fetch_date_range_paginated_async,
+)
+from app.users.controller import require_user
+from config import Config
 import redis
+import redis.asyncio
 
 logger = AppLogger().get_logger()
-router = APIRouter()
+# Todas as rotas exigem um usuário autenticado (ver Config.AUTH_REQUIRED)
+router = APIRouter(dependencies=[Depends(require_user)])
 
 @router.post(
     "/maintenance",
@@ -21,69 +65,208 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,
     response_model=CreateMaintenanceSchema
 )
-def maintenance_register(
+async def maintenance_register(
     maintenance_create: CreateMaintenanceSchema,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
 ) -> CreateMaintenanceSchema:
     logger.info(f"Criando uma nova manutenção {maintenance_create.maintenance_register_id}")
 
-    maintenance_id = f"maintenance:{maintenance_create.maintenance_register_id}"
+    maintenance_id = record_key("maintenance", maintenance_create.maintenance_register_id)
+
+    maintenance_data = maintenance_create.dict()
+    maintenance_data['maintenance_register_id'] = str(maintenance_create.maintenance_register_id)
+    maintenance_data['request_date'] = maintenance_data['request_date'].isoformat()
+
+    # Registro, lista e índices secundários gravados atomicamente, se o registro não existir
+    # e a equipe atribuída existir
+    index_sets, date_index = creation_indexes(maintenance_data)
+    created = await create_record(
+        redis_client,
+        maintenance_id,
+        maintenance_data,
+        sets=[MAINTENANCE_LIST, *index_sets],
+        sorted_sets=date_index,
+        requires=[reference_key(maintenance_create.assigned_team_id)],
+    )
+    if created == RECORD_EXISTS:
+        raise HTTPException(status_code=400, detail="Manutenção já registrada.")
+    if created == RECORD_REQUIREMENT_MISSING:
+        raise HTTPException(status_code=400, detail="Equipe atribuída não encontrada.")
+    await bump_versions_async(redis_client, maintenance_id, MAINTENANCE_LIST)
 
-    try:
-        if redis_client.exists(maintenance_id):
-            raise HTTPException(status_code=400, detail="Manutenção já registrada.")
+    return maintenance_create
 
-        maintenance_data = maintenance_create.dict()
-        maintenance_data['maintenance_register_id'] = str(maintenance_create.maintenance_register_id)
+
+# Endpoints em lote: o lote inteiro é validado e gravado em pipelines, com um resultado por
+# item. Declarados antes das rotas /maintenance/{maintenance_register_id}.
+@router.post(
+    "/maintenance/bulk",
+    tags=["Maintenance Manage"],
+    response_model=BulkResultSchema
+)
+async def maintenance_bulk_register(
+    maintenance_create: List[CreateMaintenanceSchema] = Body(..., min_items=1, max_items=Config.BULK_MAX_ITEMS),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+) -> BulkResultSchema:
+    logger.info(f"Criando {len(maintenance_create)} manutenções em lote")
+
+    items = []
+    for maintenance in maintenance_create:
+        maintenance_register_id = str(maintenance.maintenance_register_id)
+        maintenance_data = maintenance.dict()
+        maintenance_data['maintenance_register_id'] = maintenance_register_id
         maintenance_data['request_date'] = maintenance_data['request_date'].isoformat()
+        index_sets, date_index = creation_indexes(maintenance_data)
+        items.append(BulkItem(
+            maintenance_register_id,
+            record_key("maintenance", maintenance_register_id),
+            maintenance_data,
+            {
+                "sets": [MAINTENANCE_LIST, *index_sets],
+                "sorted_sets": date_index,
+                "requires": [reference_key(maintenance.assigned_team_id)],
+            },
+        ))
+
+    result, changed = await bulk_create_async(
+        redis_client, items, "Manutenção já registrada.", "Equipe atribuída não encontrada."
+    )
+    await notify_bulk_changes_async(redis_client, changed, MAINTENANCE_LIST, invalidate_cache=False)
+
+    return result
 
-        team_id = maintenance_create.assigned_team_id
-        if not redis_client.exists(team_id):
-            raise HTTPException(status_code=400, detail="Equipe atribuída não encontrada.")
 
-        maintenance_data_json = json.dumps(maintenance_data)
-        redis_client.set(maintenance_id, maintenance_data_json)
-        redis_client.sadd("maintenance_list", maintenance_id)
+@router.put(
+    "/maintenance/bulk",
+    tags=["Maintenance Manage"],
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=BulkResultSchema
+)
+async def maintenance_bulk_update(
+    maintenance_update: List[BulkUpdateMaintenanceSchema] = Body(..., min_items=1, max_items=Config.BULK_MAX_ITEMS),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+) -> BulkResultSchema:
+    logger.info(f"Atualizando {len(maintenance_update)} manutenções em lote")
+    items = []
+    for maintenance in maintenance_update:
+        maintenance_register_id = str(maintenance.maintenance_register_id)
+        changes = maintenance.dict(exclude_unset=True, exclude={"maintenance_register_id"})
+        if changes.get('request_date'):
+            changes['request_date'] = changes['request_date'].isoformat()
+        indexes, date_index = update_indexes(changes)
+        items.append(BulkItem(
+            maintenance_register_id,
+            record_key("maintenance", maintenance_register_id),
+            changes,
+            {
+                "requires": [reference_key(maintenance.assigned_team_id)] if maintenance.assigned_team_id else [],
+                "indexes": indexes,
+                "sorted_sets": date_index,
+            },
+        ))
+
+    result, changed = await bulk_update_async(
+        redis_client, items, "Manutenção não encontrada", "Equipe atribuída não encontrada."
+    )
+    await notify_bulk_changes_async(redis_client, changed, MAINTENANCE_LIST, invalidate_cache=False)
+
+    return result
 
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
 
-    return maintenance_create
+@router.delete(
+    "/maintenance/bulk",
+    tags=["Maintenance Manage"],
+    response_model=BulkResultSchema
+)
+async def maintenance_bulk_delete(
+    maintenance_register_ids: List[str] = Body(..., min_items=1, max_items=Config.BULK_MAX_ITEMS),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+) -> BulkResultSchema:
+    logger.info(f"Removendo {len(maintenance_register_ids)} manutenções em lote")
+    # O script remove o registro da lista e dos índices secundários atomicamente
+    options = {"sets": [MAINTENANCE_LIST], "sorted_sets": [DATE_INDEX], "indexes": index_prefixes()}
+    items = [
+        BulkItem(maintenance_register_id, record_key("maintenance", maintenance_register_id), options=options)
+        for maintenance_register_id in maintenance_register_ids
+    ]
+
+    result, changed = await bulk_delete_async(redis_client, items, "Manutenção não encontrada")
+    await notify_bulk_changes_async(redis_client, changed, MAINTENANCE_LIST, invalidate_cache=False)
+
+    return result
+
+
+# Confere os registros de manutenção lidos do Redis, ignorando os inválidos
+async def _decode_maintenance(records):
+    async for key, maintenance_data_dict in records:
+        try:
+            maintenance_data_dict['maintenance_register_id'] = str(maintenance_data_dict.get('maintenance_register_id', ''))
+
+            yield read_record(GetAllMaintenanceSchema, maintenance_data_dict)
+
+        except ValueError as e:
+            logger.error(f"Erro ao decodificar os dados da manutenção: {str(e)}", exc_info=True)
 
 
+# Endpoint para obter as manutenções, com filtros opcionais resolvidos pelos índices secundários
+# (from_date/to_date consultam o índice de datas e devolvem as manutenções em ordem de data)
+# (Accept: application/x-ndjson envia uma manutenção por linha, em streaming)
+# Sem filtros, cursor ou streaming a lista é servida do snapshot pré-serializado
 @router.get(
     "/maintenance",
     tags=["Maintenance Manage"],
     response_model=List[GetAllMaintenanceSchema]
 )
-def get_maintenance(
+async def get_maintenance(
+    response: Response,
     machine_id: Optional[str] = None,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    assigned_team_id: Optional[str] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    cursor: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=Config.MAX_PAGE_SIZE),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    redis_client: redis.asyncio.Redis = Depends(get_read_client)
 ) -> List[GetAllMaintenanceSchema]:
-    logger.info(f"Obtendo todas as manutenções para a máquina: {machine_id}")
-
-    try:
-        maintenance_keys = redis_client.smembers("maintenance_list")
-        maintenance_list = []
-
-        for key in maintenance_keys:
-            maintenance_data = redis_client.get(key)
-            if maintenance_data:
-                try:
-                    maintenance_data_dict = json.loads(maintenance_data.decode('utf-8'))
-                    maintenance_data_dict['maintenance_register_id'] = str(maintenance_data_dict.get('maintenance_register_id', ''))
-
-                    maintenance_obj = GetAllMaintenanceSchema(**maintenance_data_dict)
-                    if machine_id is None or maintenance_obj.machine_id == machine_id:
-                        maintenance_list.append(maintenance_obj)
-
-                except (json.JSONDecodeError, ValueError) as e:
-                    logger.error(f"Erro ao decodificar os dados da manutenção: {str(e)}", exc_info=True)
-
-        return maintenance_list
-
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    filters = {
+        "machine_id": machine_id,
+        "assigned_team_id": assigned_team_id,
+        "status": status,
+        "priority": priority,
+    }
+    logger.info(f"Obtendo manutenções com os filtros: {filters}")
+    stream = wants_ndjson(accept)
+
+    # ETag da coleção: 304 sem ler os registros se o cliente já tem a versão atual
+    if not stream:
+        etag = await current_etag_async(redis_client, MAINTENANCE_LIST)
+        not_modified = not_modified_response(response, if_none_match, etag)
+        if not_modified:
+            return not_modified
+    has_filters = any(value is not None for value in filters.values()) or from_date or to_date
+    if not has_filters and cursor is None and limit is None and not stream:
+        return await collection_snapshot_response_async(
+            redis_client,
+            MAINTENANCE_LIST,
+            etag,
+            lambda: _decode_maintenance(fetch_collection(redis_client, MAINTENANCE_LIST)),
+            accept_encoding,
+        )
+    by_date = bool(from_date or to_date)
+    query_redis = query_client(redis_client, filters, by_date)
+    if by_date:
+        records = await fetch_date_range_paginated_async(query_redis, filters, response, from_date, to_date, cursor, limit)
+    else:
+        list_name = await filtered_list_name_async(query_redis, filters, cursor)
+        records = await fetch_collection_paginated(query_redis, list_name, response, cursor, limit, stream)
+    maintenance_list = _decode_maintenance(records)
+    if stream:
+        return ndjson_response(maintenance_list, headers=response.headers)
+    return list_response([maintenance async for maintenance in maintenance_list], response)
 
 # Endpoint para obter uma manutenção específica pelo número de registro
 @router.get(
@@ -91,29 +274,27 @@ def get_maintenance(
     tags=["Maintenance Manage"],
     response_model=GetMaintenanceSchema
 )
-def get_maintenance_by_id(
+async def get_maintenance_by_id(
     maintenance_register_id: str,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    redis_client: redis.asyncio.Redis = Depends(get_read_client)
 ) -> GetMaintenanceSchema:
     logger.info(f"Obtendo manutenção com número de registro: {maintenance_register_id}")
-    maintenance_id = f"maintenance:{maintenance_register_id}"
+    maintenance_id = record_key("maintenance", maintenance_register_id)
 
-    try:
-        maintenance_data = redis_client.get(maintenance_id)
-        if not maintenance_data:
-            raise HTTPException(status_code=404, detail="Manutenção não encontrada")
-
-        try:
-            maintenance_data_dict = json.loads(maintenance_data.decode('utf-8'))
-            if not isinstance(maintenance_data_dict, dict):
-                raise ValueError(f"Formato inválido de dados: {maintenance_data_dict}")
-        except (json.JSONDecodeError, ValueError) as e:
-            raise HTTPException(status_code=500, detail=f"Erro ao decodificar os dados da manutenção: {str(e)}")
+    not_modified = not_modified_response(response, if_none_match, await current_etag_async(redis_client, maintenance_id))
+    if not_modified:
+        return not_modified
 
-        return GetMaintenanceSchema(**maintenance_data_dict)
+    try:
+        maintenance_data_dict = await load_record(redis_client, maintenance_id)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao decodificar os dados da manutenção: {str(e)}")
+    if not maintenance_data_dict:
+        raise HTTPException(status_code=404, detail="Manutenção não encontrada")
 
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    return GetMaintenanceSchema(**maintenance_data_dict)
 
 # Endpoint para atualizar dados de uma manutenção
 @router.put(
@@ -122,42 +303,41 @@ def get_maintenance_by_id(
     status_code=status.HTTP_202_ACCEPTED,
     response_model=UpdateMaintenanceSchema
 )
-def update_maintenance(
+async def update_maintenance(
     maintenance_register_id: str,
     maintenance_update: UpdateMaintenanceSchema,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
 ) -> UpdateMaintenanceSchema:
     logger.info(f"Atualizando dados da manutenção com número de registro: {maintenance_register_id}")
-    maintenance_id = f"maintenance:{maintenance_register_id}"
+    maintenance_id = record_key("maintenance", maintenance_register_id)
+
+    changes = maintenance_update.dict(exclude_unset=True)
+    if changes.get('request_date'):
+        changes['request_date'] = changes['request_date'].isoformat()
+
+    # A equipe atribuída precisa existir; registro, mescla e índices são tratados num único script
+    requires = [reference_key(maintenance_update.assigned_team_id)] if maintenance_update.assigned_team_id else []
+    indexes, date_index = update_indexes(changes)
 
     try:
-        maintenance_data = redis_client.get(maintenance_id)
-        if not maintenance_data:
+        result, maintenance_data_dict = await merge_record(
+            redis_client,
+            maintenance_id,
+            changes,
+            requires=requires,
+            indexes=indexes,
+            sorted_sets=date_index,
+        )
+        if result == MERGE_NOT_FOUND:
             raise HTTPException(status_code=404, detail="Manutenção não encontrada")
-
-        try:
-            maintenance_data_dict = json.loads(maintenance_data.decode('utf-8'))
-            if not isinstance(maintenance_data_dict, dict):
-                raise ValueError(f"Formato inválido de dados: {maintenance_data_dict}")
-        except (json.JSONDecodeError, ValueError) as e:
-            raise HTTPException(status_code=500, detail=f"Erro ao decodificar os dados da manutenção: {str(e)}")
-
-        if maintenance_update.assigned_team_id:
-            team_id = maintenance_update.assigned_team_id
-            if not redis_client.exists(team_id):
-                raise HTTPException(status_code=400, detail="Equipe atribuída não encontrada.")
-        
-        maintenance_data_dict.update(maintenance_update.dict(exclude_unset=True))
-        if maintenance_data_dict.get('request_date'):
-            maintenance_data_dict['request_date'] = maintenance_data_dict['request_date'].isoformat()
-        maintenance_data_json = json.dumps(maintenance_data_dict)
-
-        redis_client.set(maintenance_id, maintenance_data_json)
+        if result == MERGE_REQUIREMENT_MISSING:
+            raise HTTPException(status_code=400, detail="Equipe atribuída não encontrada.")
+        await bump_versions_async(redis_client, maintenance_id, MAINTENANCE_LIST)
 
         return UpdateMaintenanceSchema(**maintenance_data_dict)
 
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    except redis.ResponseError as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao decodificar os dados da manutenção: {str(e)}")
 
 # Endpoint para remover uma manutenção
 @router.delete(
@@ -166,23 +346,24 @@ def update_maintenance(
     response_model=DeleteMaintenanceSchema,
     status_code=status.HTTP_200_OK
 )
-def delete_maintenance(
+async def delete_maintenance(
     maintenance_register_id: str,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
 ) -> DeleteMaintenanceSchema:
     logger.info(f"Removendo manutenção com número de registro: {maintenance_register_id}")
-    maintenance_id = f"maintenance:{maintenance_register_id}"
-
-    try:
-        maintenance_data = redis_client.get(maintenance_id)
-        if not maintenance_data:
-            raise HTTPException(status_code=404, detail="Manutenção não encontrada")
-
-        redis_client.srem("maintenance_list", maintenance_id)
-        redis_client.delete(maintenance_id)
-
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    maintenance_id = record_key("maintenance", maintenance_register_id)
+
+    # Remove o registro da lista e dos índices secundários atomicamente (script de remoção)
+    deleted = await delete_record(
+        redis_client,
+        maintenance_id,
+        sets=[MAINTENANCE_LIST],
+        sorted_sets=[DATE_INDEX],
+        indexes=index_prefixes(),
+    )
+    if deleted == DELETE_NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Manutenção não encontrada")
+    await bump_versions_async(redis_client, maintenance_id, MAINTENANCE_LIST)
 
     return DeleteMaintenanceSchema(maintenance_register_id=maintenance_register_id)
 
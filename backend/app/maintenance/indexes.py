@@ -0,0 +1,227 @@
+# Índices secundários das manutenções.
+#
+# Para cada campo indexado existe um set "maintenance_index:<campo>:<valor>" com as chaves
+# das manutenções que têm aquele valor. Os índices são mantidos atomicamente junto com o
+# registro (scripts de criação, atualização e remoção em app/redis_setting/redis_pool.py) e
+# permitem filtrar GET /maintenance com SINTER no próprio Redis.
+# A data de abertura (request_date) fica num sorted set com score em dias desde 1970-01-01,
+# consultado por intervalo com ZRANGEBYSCORE.
+#
+# No modo cluster cada índice é dividido pelos buckets das manutenções (ver
+# app/redis_setting/cluster.py): as interseções rodam bucket a bucket, e as consultas por
+# data juntam os intervalos de todos os buckets em ordem de data.
+#
+# Reconstrução a partir dos dados existentes (a partir da pasta backend):
+#   python -m app.maintenance.indexes rebuild
+import hashlib
+import heapq
+import sys
+from datetime import date
+
+from app.logging.logger import AppLogger
+from app.redis_setting import async_pool
+from app.redis_setting import cluster
+from app.redis_setting.async_pool import primary_client
+from app.redis_setting.cluster import collection_groups, collection_keys, member_key
+from app.redis_setting.redis_pool import (
+    get_redis_client,
+    scan_collection,
+    chunked,
+    NEXT_CURSOR_HEADER,
+)
+from config import Config
+
+logger = AppLogger().get_logger()
+
+MAINTENANCE_LIST = "maintenance_list"
+INDEX_PREFIX = "maintenance_index"
+INDEXED_FIELDS = ("machine_id", "assigned_team_id", "status", "priority")
+DATE_INDEX = f"{INDEX_PREFIX}:request_date"
+EPOCH = date(1970, 1, 1)
+
+
+def index_key(field, value):
+    return f"{INDEX_PREFIX}:{field}:{value}"
+
+
+# Score da data no índice: dias desde 1970-01-01 (aceita date ou string ISO)
+def epoch_day(value):
+    if not isinstance(value, date):
+        value = date.fromisoformat(value)
+    return (value - EPOCH).days
+
+
+# Chaves de índice de um registro (campos ausentes ou nulos não são indexados)
+def index_keys(data):
+    return {
+        index_key(field, data[field])
+        for field in INDEXED_FIELDS
+        if data.get(field) is not None
+    }
+
+
+# Índices de um registro novo no formato de create_record: (sets, {sorted set: score})
+def creation_indexes(data):
+    date_index = {DATE_INDEX: epoch_day(data["request_date"])} if data.get("request_date") else {}
+    return index_keys(data), date_index
+
+
+def add_to_indexes(pipe, maintenance_id, data):
+    for key in index_keys(data):
+        pipe.sadd(member_key(key, maintenance_id), maintenance_id)
+    if data.get("request_date"):
+        pipe.zadd(member_key(DATE_INDEX, maintenance_id), {maintenance_id: epoch_day(data["request_date"])})
+
+
+def remove_from_indexes(pipe, maintenance_id, data):
+    for key in index_keys(data):
+        pipe.srem(member_key(key, maintenance_id), maintenance_id)
+    pipe.zrem(member_key(DATE_INDEX, maintenance_id), maintenance_id)
+
+
+# Prefixo do set de índice de cada campo indexado ({campo: prefixo}), usado pelos scripts
+def index_prefixes():
+    return {field: index_key(field, "") for field in INDEXED_FIELDS}
+
+
+# Índices de uma atualização no formato de merge_record: ({campo: prefixo do set}, {sorted set: score}).
+# O script move o registro apenas nos índices dos campos cujo valor mudou.
+def update_indexes(changes):
+    date_index = {DATE_INDEX: epoch_day(changes["request_date"])} if changes.get("request_date") else {}
+    return index_prefixes(), date_index
+
+
+# Consultas cujo resultado é gravado no Redis (vários filtros, ou filtros com intervalo de datas)
+# rodam no primário: o resultado recém-gravado ainda pode não ter chegado à réplica de leitura
+def query_client(redis_client, filters, by_date=False):
+    count = sum(1 for value in filters.values() if value is not None)
+    return primary_client(redis_client) if count > (0 if by_date else 1) else redis_client
+
+
+# Devolve o set que contém as manutenções que atendem a todos os filtros.
+# Sem filtros é a lista completa; com um filtro, o próprio set do índice; com vários,
+# a interseção é gravada no Redis (SINTERSTORE) com expiração curta para que a paginação
+# por cursor continue percorrendo o mesmo resultado.
+async def filtered_list_name_async(redis_client, filters, cursor=None):
+    keys = sorted(index_key(field, value) for field, value in filters.items() if value is not None)
+    if not keys:
+        return MAINTENANCE_LIST
+    if len(keys) == 1:
+        return keys[0]
+
+    result_key = _query_key(keys)
+    if not cursor or not await redis_client.exists(*collection_keys(result_key)):
+        pipe = redis_client.pipeline()
+        _queue_intersection(pipe, result_key, keys)
+        await pipe.execute()
+    return result_key
+
+
+def _query_key(keys):
+    digest = hashlib.sha1("|".join(keys).encode("utf-8")).hexdigest()
+    return f"{INDEX_PREFIX}:query:{digest}"
+
+
+# SINTERSTORE dos índices em result_key (no cluster, uma por bucket), com expiração
+def _queue_intersection(pipe, result_key, keys):
+    for result, *sources in collection_groups(result_key, *keys):
+        pipe.sinterstore(result, sources)
+        pipe.expire(result, Config.MAINTENANCE_QUERY_TTL)
+
+
+# ZINTERSTORE do índice de datas com os sets dos índices (peso 0 para os sets, preservando o
+# score da data), por bucket no cluster
+def _queue_date_intersection(pipe, result_key, keys):
+    for result, date_index, *sources in collection_groups(result_key, DATE_INDEX, *keys):
+        pipe.zinterstore(result, {date_index: 1, **{key: 0 for key in sources}})
+        pipe.expire(result, Config.MAINTENANCE_QUERY_TTL)
+
+
+# Sorted set de datas restrito aos filtros informados. Com filtros, o índice de datas é
+# intersectado com os sets dos índices (ZINTERSTORE com peso 0 para os sets, preservando
+# o score da data) e o resultado expira como em filtered_list_name_async.
+async def _date_index_for_async(redis_client, filters, cursor=None):
+    keys = sorted(index_key(field, value) for field, value in filters.items() if value is not None)
+    if not keys:
+        return DATE_INDEX
+
+    result_key = _query_key(keys) + ":request_date"
+    if not cursor or not await redis_client.exists(*collection_keys(result_key)):
+        pipe = redis_client.pipeline()
+        _queue_date_intersection(pipe, result_key, keys)
+        await pipe.execute()
+    return result_key
+
+
+# No cluster o intervalo é lido do início em cada bucket (até start + num itens) e os
+# resultados são intercalados por data; a página fica em [start, start + num)
+def merge_by_score(replies, start, num):
+    merged = heapq.merge(*replies, key=lambda item: (item[1], item[0]))
+    return [member for member, _ in merged][start:start + num]
+
+
+# ZRANGEBYSCORE de um índice de datas lógico (todos os buckets no cluster)
+async def _range_by_score_async(redis_client, source, min_score, max_score, start, num):
+    if not cluster.enabled():
+        return await redis_client.zrangebyscore(source, min_score, max_score, start=start, num=num)
+    pipe = redis_client.pipeline(transaction=False)
+    for name in collection_keys(source):
+        pipe.zrangebyscore(name, min_score, max_score, start=0, num=start + num, withscores=True)
+    return merge_by_score(await pipe.execute(), start, num)
+
+
+# Manutenções com request_date entre from_date e to_date (inclusive), em ordem de data.
+# Sem cursor/limit o intervalo inteiro é lido em blocos; com cursor/limit é devolvida uma
+# página (o cursor é o deslocamento dentro do intervalo) e o próximo cursor vai no cabeçalho
+# X-Next-Cursor, valendo 0 quando não há mais resultados.
+async def fetch_date_range_paginated_async(
+    redis_client, filters, response, from_date=None, to_date=None, cursor=None, limit=None
+):
+    source = await _date_index_for_async(redis_client, filters, cursor)
+    min_score = epoch_day(from_date) if from_date else "-inf"
+    max_score = epoch_day(to_date) if to_date else "+inf"
+
+    if cursor is None and limit is None:
+        return _scan_date_range_async(redis_client, source, min_score, max_score)
+
+    offset, limit = cursor or 0, limit or Config.PAGE_SIZE
+    keys = await _range_by_score_async(redis_client, source, min_score, max_score, offset, limit + 1)
+    response.headers[NEXT_CURSOR_HEADER] = str(offset + limit if len(keys) > limit else 0)
+    return async_pool.fetch_many(redis_client, keys[:limit])
+
+
+async def _scan_date_range_async(redis_client, source, min_score, max_score):
+    offset, chunk_size = 0, Config.REDIS_BULK_CHUNK_SIZE
+    while True:
+        keys = await _range_by_score_async(redis_client, source, min_score, max_score, offset, chunk_size)
+        async for key, record in async_pool.fetch_many(redis_client, keys):
+            yield key, record
+        if len(keys) < chunk_size:
+            return
+        offset += chunk_size
+
+
+# Apaga todos os índices e os recria a partir dos registros em maintenance_list
+def rebuild_indexes(redis_client):
+    for chunk in chunked(redis_client.scan_iter(f"{INDEX_PREFIX}:*", count=1000), 1000):
+        redis_client.delete(*chunk)
+
+    total = 0
+    for chunk in chunked(scan_collection(redis_client, MAINTENANCE_LIST), Config.REDIS_BULK_CHUNK_SIZE):
+        pipe = redis_client.pipeline(transaction=False)
+        for key, maintenance_data in chunk:
+            try:
+                add_to_indexes(pipe, key, maintenance_data)
+            except ValueError as e:
+                logger.error(f"Erro ao decodificar a manutenção {key}: {str(e)}")
+        pipe.execute()
+        total += len(chunk)
+        logger.info(f"{total} manutenções indexadas")
+    return total
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("Uso: python -m app.maintenance.indexes rebuild")
+        sys.exit(1)
+    rebuild_indexes(get_redis_client())
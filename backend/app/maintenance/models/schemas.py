@@ -23,6 +23,10 @@ class UpdateMaintenanceSchema(BaseModel):
     machine_id: Optional[str] = None
 
 
+class BulkUpdateMaintenanceSchema(UpdateMaintenanceSchema):
+    maintenance_register_id: UUID4
+
+
 class DeleteMaintenanceSchema(BaseModel):
     maintenance_register_id: UUID4
 
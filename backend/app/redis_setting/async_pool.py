@@ -0,0 +1,315 @@
+# Acesso assíncrono ao Redis (redis.asyncio), usado pelas rotas async def dos controllers.
+#
+# Espelha as funções de redis_pool.py com os mesmos nomes e resultados, mas com os comandos
+# aguardados no event loop: uma chamada lenta ao Redis não prende mais uma thread do pool do
+# FastAPI. Codec, layout dos registros, scripts Lua e o cache do CLIENT TRACKING são os mesmos
+# do módulo síncrono, que continua sendo usado pelos comandos de linha (backup, migrações,
+# índices) e pelos benchmarks.
+#
+# O pool é criado no startup da aplicação, dentro do event loop que atende as requisições, e
+# fechado no shutdown. Se for usado a partir de outro loop (ex.: TestClient sem o startup), um
+# pool novo é criado para esse loop.
+#
+# No modo cluster (Config.REDIS_CLUSTER) o worker usa um redis.asyncio.RedisCluster no lugar do
+# pool, com os scripts carregados em todos os primários no startup (ver cluster.py).
+import asyncio
+
+import redis
+import redis.asyncio
+from fastapi import FastAPI
+
+from app.logging.logger import AppLogger
+from app.redis_setting import cluster
+from app.redis_setting.client_tracking import read_through_async
+from app.redis_setting.cluster import collection_keys
+from app.redis_setting.connection_pool import create_async_cluster, create_async_pool
+from app.redis_setting.redis_pool import (
+    NEXT_CURSOR_HEADER,
+    CREATE_RECORD_SCRIPT,
+    MERGE_RECORD_SCRIPT,
+    DELETE_RECORD_SCRIPT,
+    RECORD_REQUIREMENT_MISSING,
+    decode_fields,
+    decode_value,
+    create_arguments,
+    merge_arguments,
+    merge_result,
+    delete_arguments,
+    requirement_result,
+    split_page_cursor,
+    join_page_cursor,
+    legacy_record_keys,
+    decode_chunk,
+    tracked_lookup,
+    tracked_fill,
+    _decode_document,
+    _is_wrong_type,
+)
+from config import Config
+
+logger = AppLogger().get_logger()
+
+pool = None
+_pool_loop = None
+cluster_client = None
+_cluster_loop = None
+
+
+def _async_pool():
+    global pool, _pool_loop
+    loop = asyncio.get_running_loop()
+    if pool is None or _pool_loop is not loop:
+        pool, _pool_loop = create_async_pool(), loop
+    return pool
+
+
+def _async_cluster():
+    global cluster_client, _cluster_loop
+    loop = asyncio.get_running_loop()
+    if cluster_client is None or _cluster_loop is not loop:
+        cluster_client, _cluster_loop = create_async_cluster(), loop
+    return cluster_client
+
+
+# Dependência das rotas: cliente assíncrono sobre o pool do worker (ou o cliente do cluster)
+async def get_redis_client():
+    if cluster.enabled():
+        return _async_cluster()
+    return redis.asyncio.Redis(connection_pool=_async_pool())
+
+
+# Cliente de uma réplica de leitura (replicas.py). As poucas escritas feitas durante uma leitura
+# (época das versões, snapshots, consultas de manutenção) vão para o primário em .primary.
+class ReplicaClient(redis.asyncio.Redis):
+    def __init__(self, primary, **kwargs):
+        super().__init__(**kwargs)
+        self.primary = primary
+
+
+def primary_client(redis_client):
+    return getattr(redis_client, "primary", redis_client)
+
+
+# O CLIENT TRACKING só recebe as invalidações do primário: uma leitura atrasada numa réplica
+# não pode alimentar o cache, então as réplicas leem direto
+def _read_through(redis_client, key, loader):
+    if isinstance(redis_client, ReplicaClient):
+        return loader()
+    return read_through_async(key, loader)
+
+
+async def start_pool():
+    if not cluster.enabled():
+        _async_pool()
+        return
+    redis_client = _async_cluster()
+    await redis_client.initialize()
+    await load_scripts(redis_client)
+    logger.info(f"Conectado ao Redis Cluster ({len(redis_client.get_primaries())} primários)")
+
+
+async def stop_pool():
+    global pool, _pool_loop, cluster_client, _cluster_loop
+    if pool is not None:
+        await pool.disconnect()
+    if cluster_client is not None:
+        await cluster_client.close()
+    pool, _pool_loop = None, None
+    cluster_client, _cluster_loop = None, None
+
+
+# Os scripts só usam o cliente de registro para codificar os argumentos; a execução usa o
+# cliente (ou pipeline) passado em cada chamada
+_scripts = redis.asyncio.Redis()
+_create_record = _scripts.register_script(CREATE_RECORD_SCRIPT)
+_merge_record = _scripts.register_script(MERGE_RECORD_SCRIPT)
+_delete_record = _scripts.register_script(DELETE_RECORD_SCRIPT)
+
+
+# Carrega os scripts em todos os primários do cluster (ver redis_pool.load_scripts)
+async def load_scripts(redis_client):
+    for script in (_create_record, _merge_record, _delete_record):
+        await redis_client.script_load(script.script)
+
+
+# Lê um registro completo (ou None se não existir)
+async def load_record(redis_client, key):
+    try:
+        data = await _read_through(redis_client, key, lambda: redis_client.hgetall(key))
+    except redis.ResponseError as e:
+        if not _is_wrong_type(e):
+            raise
+        return _decode_document(await redis_client.get(key))
+    return decode_fields(data) if data else None
+
+
+# Lê apenas alguns campos do registro (HMGET); None se o registro não existir
+async def load_fields(redis_client, key, fields):
+    try:
+        values = await redis_client.hmget(key, fields)
+    except redis.ResponseError as e:
+        if not _is_wrong_type(e):
+            raise
+        document = _decode_document(await redis_client.get(key))
+        return {field: document.get(field) for field in fields} if document else None
+    if all(value is None for value in values):
+        return None
+    return {field: decode_value(value) if value is not None else None for field, value in zip(fields, values)}
+
+
+# Divide um iterável (síncrono ou assíncrono) em blocos de tamanho fixo
+async def chunked(iterable, size):
+    chunk = []
+    if hasattr(iterable, "__aiter__"):
+        async for item in iterable:
+            chunk.append(item)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+    else:
+        for item in iterable:
+            chunk.append(item)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+# Leitura em lote, como redis_pool.fetch_many: um pipeline de HGETALL por bloco de chaves
+async def fetch_many(redis_client, keys, chunk_size=None):
+    chunk_size = chunk_size or Config.REDIS_BULK_CHUNK_SIZE
+    async for chunk in chunked(keys, chunk_size):
+        results = await _fetch_hashes(redis_client, chunk)
+
+        legacy_keys = legacy_record_keys(chunk, results)
+        legacy = dict(zip(legacy_keys, await redis_client.mget(legacy_keys))) if legacy_keys else {}
+        for key, record in decode_chunk(chunk, results, legacy):
+            yield key, record
+
+
+async def _fetch_hashes(redis_client, chunk):
+    if isinstance(redis_client, ReplicaClient):
+        return await _hgetall_all(redis_client, chunk)
+    results, reservations, pending = tracked_lookup(chunk)
+    if pending:
+        replies = await _hgetall_all(redis_client, [chunk[i] for i in pending])
+        tracked_fill(chunk, results, reservations, pending, replies)
+    return results
+
+
+async def _hgetall_all(redis_client, keys):
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.hgetall(key)
+    return await pipe.execute(raise_on_error=False)
+
+
+# Membros de um set lógico; no cluster, os sets de todos os buckets num pipeline
+async def collection_members(redis_client, list_name):
+    names = collection_keys(list_name)
+    if len(names) == 1:
+        return await redis_client.smembers(list_name)
+    pipe = redis_client.pipeline(transaction=False)
+    for name in names:
+        pipe.smembers(name)
+    return set().union(*await pipe.execute())
+
+
+# Lê todos os registros de uma coleção (set de membros) em lote
+async def fetch_collection(redis_client, list_name, chunk_size=None):
+    async for key, record in fetch_many(redis_client, await collection_members(redis_client, list_name), chunk_size):
+        yield key, record
+
+
+async def _scan_members(redis_client, list_name, chunk_size):
+    for name in collection_keys(list_name):
+        async for key in redis_client.sscan_iter(name, count=chunk_size):
+            yield key
+
+
+# Percorre a coleção inteira com SSCAN em blocos (bucket a bucket no cluster)
+def scan_collection(redis_client, list_name, chunk_size=None):
+    chunk_size = chunk_size or Config.REDIS_BULK_CHUNK_SIZE
+    return fetch_many(redis_client, _scan_members(redis_client, list_name, chunk_size), chunk_size)
+
+
+# Lê uma página da coleção com SSCAN: (próximo cursor, registros da página)
+async def fetch_collection_page(redis_client, list_name, cursor=0, limit=None, chunk_size=None):
+    limit = limit or Config.PAGE_SIZE
+    names = collection_keys(list_name)
+    cursor, bucket = split_page_cursor(cursor, len(names))
+    keys = []
+    while bucket < len(names):
+        cursor, batch = await redis_client.sscan(names[bucket], cursor=cursor, count=limit)
+        keys.extend(batch)
+        if cursor == 0:
+            bucket += 1
+        if len(keys) >= limit:
+            break
+    return join_page_cursor(cursor, bucket, len(names)), fetch_many(redis_client, keys, chunk_size)
+
+
+# Coleção inteira ou uma página (próximo cursor no cabeçalho X-Next-Cursor)
+async def fetch_collection_paginated(redis_client, list_name, response, cursor=None, limit=None, stream=False):
+    if cursor is None and limit is None:
+        if stream:
+            return scan_collection(redis_client, list_name)
+        return fetch_collection(redis_client, list_name)
+
+    next_cursor, records = await fetch_collection_page(redis_client, list_name, cursor or 0, limit)
+    response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+    return records
+
+
+# Criação atômica do registro (ver redis_pool.create_record)
+async def create_record(redis_client, key, data, sets=(), sorted_sets=None, claims=None, requires=()):
+    if requires and cluster.enabled():
+        pipe = redis_client.pipeline(transaction=False)
+        for required in requires:
+            pipe.exists(required)
+        if not all(await pipe.execute()):
+            return RECORD_REQUIREMENT_MISSING
+    keys, args = create_arguments(key, data, sets, sorted_sets, claims, requires)
+    return await _create_record(keys=keys, args=args, client=redis_client)
+
+
+# Enfileira create_record num pipeline (no cluster, as chaves exigidas são conferidas antes)
+async def queue_create_record(pipe, key, data, sets=(), sorted_sets=None, claims=None, requires=()):
+    keys, args = create_arguments(key, data, sets, sorted_sets, claims, requires)
+    await _create_record(keys=keys, args=args, client=pipe)
+
+
+# Atualização parcial no próprio Redis (ver redis_pool.merge_record)
+async def merge_record(redis_client, key, changes, requires=(), indexes=None, sorted_sets=None):
+    if requires and cluster.enabled():
+        missing = await check_requirements(redis_client, key, requires)
+        if missing is not None:
+            return missing, None
+    keys, args = merge_arguments(key, changes, requires, indexes, sorted_sets)
+    return merge_result(await _merge_record(keys=keys, args=args, client=redis_client))
+
+
+# Conferência das chaves exigidas antes do script, no cluster (ver redis_pool.requirement_result)
+async def check_requirements(redis_client, key, requires):
+    pipe = redis_client.pipeline(transaction=False)
+    for required in (key, *requires):
+        pipe.exists(required)
+    replies = await pipe.execute()
+    return requirement_result(replies[0], replies[1:])
+
+
+async def queue_merge_record(pipe, key, changes, requires=(), indexes=None, sorted_sets=None):
+    keys, args = merge_arguments(key, changes, requires, indexes, sorted_sets)
+    await _merge_record(keys=keys, args=args, client=pipe)
+
+
+# Remoção atômica do registro (ver redis_pool.delete_record)
+async def delete_record(redis_client, key, sets=(), sorted_sets=(), indexes=None):
+    keys, args = delete_arguments(key, sets, sorted_sets, indexes)
+    return await _delete_record(keys=keys, args=args, client=redis_client)
+
+
+def configure(app: FastAPI):
+    app.add_event_handler("startup", start_pool)
+    app.add_event_handler("shutdown", stop_pool)
@@ -0,0 +1,217 @@
+# Backup e restauração de todos os registros (máquinas, equipes, peças, manutenções e usuários).
+#
+# O backup percorre as chaves com SCAN e lê os registros em lote (fetch_many), gravando um
+# registro por vez num arquivo gzip: em NDJSON, uma linha {"key", "fields"} por registro, ou
+# em msgpack, um mapa por registro. A restauração lê o arquivo aos poucos e grava os registros
+# em pipelines, recolocando cada um na lista da sua coleção; em seguida os índices das
+# manutenções e o índice de e-mails são reconstruídos e as versões (ETags) e os caches locais
+# são invalidados. A memória usada não depende do tamanho da base.
+#
+# As chaves são restauradas no layout em uso (com ou sem cluster, ver cluster.py), qualquer que
+# seja o layout da base de origem; é assim que cluster_migration.py copia a base para o cluster.
+#
+# Uso pela linha de comando: ver backup.py na pasta backend.
+import gzip
+import json
+import secrets
+import tempfile
+import time
+import zlib
+
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from app.logging.logger import AppLogger
+from app.redis_setting.redis_pool import get_redis_client, chunked, fetch_many, encode_fields
+from app.redis_setting.cluster import layout_key, member_key
+from app.redis_setting.resilience import no_request_budget
+from app.redis_setting.hash_migration import RECORD_PATTERNS
+from app.redis_setting.local_cache import invalidate_all
+from app.maintenance.indexes import rebuild_indexes
+from app.users.email_index import backfill_email_index
+from app.redis_setting.versions import reset_versions
+from config import Config
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = AppLogger().get_logger()
+router = APIRouter()
+
+NDJSON_FORMAT = "ndjson"
+MSGPACK_FORMAT = "msgpack"
+BACKUP_FORMATS = (NDJSON_FORMAT, MSGPACK_FORMAT)
+
+# Lista de cada coleção, pelo prefixo da chave (usuários não têm lista)
+COLLECTION_LISTS = {
+    "machine:": "machines_list",
+    "team:": "teams_list",
+    "parts:": "parts_list",
+    "maintenance:": "maintenance_list",
+}
+
+
+def check_format(backup_format):
+    if backup_format not in BACKUP_FORMATS:
+        raise ValueError(f"Formato de backup desconhecido: {backup_format}")
+    if backup_format == MSGPACK_FORMAT and msgpack is None:
+        raise ValueError("O formato msgpack precisa do pacote msgpack instalado")
+
+
+def _text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _encode_entry(key, fields, backup_format):
+    entry = {"key": key, "fields": fields}
+    if backup_format == MSGPACK_FORMAT:
+        return msgpack.packb(entry, use_bin_type=True)
+    return json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+# Registros (chave, campos) de todas as coleções, com o progresso no log
+def iter_records(redis_client, patterns=RECORD_PATTERNS):
+    total, started = 0, time.monotonic()
+    for pattern in patterns:
+        keys = redis_client.scan_iter(pattern, count=1000)
+        for chunk in chunked(fetch_many(redis_client, keys), Config.REDIS_BULK_CHUNK_SIZE):
+            for key, fields in chunk:
+                yield _text(key), fields
+            total += len(chunk)
+            logger.info(f"Backup: {total} registros exportados ({total / (time.monotonic() - started):.0f}/s)")
+
+
+# Registros de todas as coleções, já serializados no formato do backup
+def iter_backup(redis_client, backup_format=NDJSON_FORMAT, patterns=RECORD_PATTERNS):
+    check_format(backup_format)
+    for key, fields in iter_records(redis_client, patterns):
+        yield _encode_entry(key, fields, backup_format)
+
+
+# Grava o backup comprimido em out (arquivo binário); retorna a quantidade de registros
+def dump_backup(redis_client, out, backup_format=NDJSON_FORMAT):
+    total = 0
+    with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=Config.BACKUP_COMPRESSION_LEVEL) as compressed:
+        for entry in iter_backup(redis_client, backup_format):
+            compressed.write(entry)
+            total += 1
+    return total
+
+
+# Backup comprimido em blocos, para respostas em streaming
+def iter_compressed_backup(redis_client, backup_format=NDJSON_FORMAT):
+    compressor = zlib.compressobj(Config.BACKUP_COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+    for entries in chunked(iter_backup(redis_client, backup_format), Config.REDIS_BULK_CHUNK_SIZE):
+        block = compressor.compress(b"".join(entries))
+        if block:
+            yield block
+    yield compressor.flush()
+
+
+# Registros (chave, campos) de um backup comprimido, lidos aos poucos de source (arquivo binário)
+def read_backup(source, backup_format=NDJSON_FORMAT):
+    check_format(backup_format)
+    compressed = gzip.GzipFile(fileobj=source, mode="rb")
+    if backup_format == MSGPACK_FORMAT:
+        entries = msgpack.Unpacker(compressed, raw=False)
+    else:
+        entries = (json.loads(line) for line in compressed if line.strip())
+    for entry in entries:
+        try:
+            yield entry["key"], entry["fields"]
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Registro de backup inválido: {str(e)}")
+
+
+# Grava os registros (substituindo chaves existentes) e os coloca na lista da coleção.
+# Depois reconstrói os índices derivados e invalida versões e caches, mesmo que o arquivo
+# termine com erro no meio (os registros já gravados continuam consistentes).
+# Retorna a quantidade de registros gravados.
+def restore_backup(redis_client, records):
+    total, started = 0, time.monotonic()
+    try:
+        for chunk in chunked(records, Config.REDIS_BULK_CHUNK_SIZE):
+            pipe = redis_client.pipeline(transaction=False)
+            for key, fields in chunk:
+                key = layout_key(key)
+                pipe.delete(key)
+                if fields:
+                    pipe.hset(key, mapping=encode_fields(fields))
+                list_name = next((name for prefix, name in COLLECTION_LISTS.items() if key.startswith(prefix)), None)
+                if list_name:
+                    pipe.sadd(member_key(list_name, key), key)
+            pipe.execute()
+            total += len(chunk)
+            logger.info(f"Restauração: {total} registros gravados ({total / (time.monotonic() - started):.0f}/s)")
+    finally:
+        if total:
+            rebuild_indexes(redis_client)
+            backfill_email_index(redis_client)
+            reset_versions(redis_client)
+            invalidate_all(redis_client)
+    return total
+
+
+def require_admin(admin_token):
+    if not Config.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rotas administrativas desativadas")
+    if not admin_token or not secrets.compare_digest(admin_token, Config.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token administrativo inválido")
+
+
+def _query_format(backup_format):
+    try:
+        check_format(backup_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Endpoint que envia o backup comprimido em streaming (cabeçalho X-Admin-Token obrigatório)
+@router.get("/admin/backup", tags=["Admin"])
+def download_backup(
+    backup_format: str = Query(NDJSON_FORMAT, alias="format"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    require_admin(x_admin_token)
+    _query_format(backup_format)
+    logger.info(f"Gerando backup em {backup_format}")
+    filename = f"backup-{time.strftime('%Y%m%d-%H%M%S')}.{backup_format}.gz"
+    return StreamingResponse(
+        iter_compressed_backup(get_redis_client(), backup_format),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# Endpoint que restaura um backup enviado no corpo da requisição. O corpo é copiado para um
+# arquivo temporário (em disco acima de Config.BACKUP_SPOOL_BYTES) e restaurado numa thread.
+@router.post("/admin/restore", tags=["Admin"])
+async def upload_backup(
+    request: Request,
+    backup_format: str = Query(NDJSON_FORMAT, alias="format"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    require_admin(x_admin_token)
+    _query_format(backup_format)
+    with tempfile.SpooledTemporaryFile(max_size=Config.BACKUP_SPOOL_BYTES) as upload:
+        async for block in request.stream():
+            upload.write(block)
+        upload.seek(0)
+        logger.info(f"Restaurando backup em {backup_format}")
+        try:
+            # A restauração dura mais que o orçamento de tempo de uma requisição comum
+            with no_request_budget():
+                total = await run_in_threadpool(
+                    restore_backup, get_redis_client(), read_backup(upload, backup_format)
+                )
+        except (ValueError, OSError, EOFError) as e:
+            raise HTTPException(status_code=400, detail=f"Backup inválido: {str(e)}")
+    return {"restored": total}
+
+
+def configure(app: FastAPI):
+    app.include_router(router)
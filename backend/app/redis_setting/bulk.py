@@ -0,0 +1,215 @@
+# Operações em lote das rotas /<coleção>/bulk (criação, atualização e remoção).
+#
+# O corpo inteiro é validado pelo FastAPI antes de qualquer escrita. Os itens são gravados em
+# blocos de Config.BULK_WRITE_CHUNK_SIZE, cada bloco num pipeline MULTI/EXEC com um script por
+# item (create_record, merge_record ou delete_record), ou seja, um round trip por bloco em vez
+# de vários por item. Cada item recebe o seu próprio resultado: uma chave já existente ou não
+# encontrada não impede a gravação dos demais.
+#
+# No modo cluster (ver cluster.py) os itens de um bloco caem em slots diferentes, então o bloco
+# vai num pipeline sem MULTI/EXEC (cada script continua atômico) e as chaves exigidas pelas
+# atualizações são conferidas antes do pipeline.
+from typing import List, NamedTuple, Optional
+
+from pydantic import BaseModel
+from redis.exceptions import NoScriptError
+
+from app.logging.logger import AppLogger
+from app.redis_setting import async_pool, cluster
+from app.redis_setting.local_cache import invalidate_async
+from app.redis_setting.versions import bump_versions_async
+from app.redis_setting.redis_pool import (
+    chunked,
+    merge_result,
+    RECORD_CREATED,
+    RECORD_REQUIREMENT_MISSING,
+    MERGE_OK,
+    MERGE_NOT_FOUND,
+    DELETE_OK,
+)
+from config import Config
+
+logger = AppLogger().get_logger()
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+EXISTS = "exists"
+NOT_FOUND = "not_found"
+REQUIREMENT_MISSING = "requirement_missing"
+ERROR = "error"
+
+SUCCESS_STATUSES = {CREATED, UPDATED, DELETED}
+
+
+class BulkItemResultSchema(BaseModel):
+    id: str
+    status: str
+    detail: Optional[str] = None
+
+
+class BulkResultSchema(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResultSchema]
+
+
+# Item do lote: identificador devolvido ao cliente, chave do registro, dados e argumentos
+# extras do script (sets, sorted_sets, requires, indexes...)
+class BulkItem(NamedTuple):
+    id: str
+    key: str
+    data: Optional[dict] = None
+    options: Optional[dict] = None
+
+
+# Executa a corrotina queue(pipe, item) para cada item, um bloco por transação, e converte a
+# resposta de cada item com outcome(resposta) -> (status, detalhe).
+# Retorna o resultado do lote e as chaves efetivamente alteradas.
+async def run_bulk_async(redis_client, items, queue, outcome, rejected=()):
+    results, changed = list(rejected), []
+    for chunk in chunked(items, Config.BULK_WRITE_CHUNK_SIZE):
+        replies = await _execute_chunk_async(redis_client, chunk, queue)
+        missing = _missing_scripts(replies)
+        if missing:
+            # Nó do cluster sem os scripts (ex.: reiniciado): carrega e repete esses itens
+            await async_pool.load_scripts(redis_client)
+            retried = await _execute_chunk_async(redis_client, [chunk[i] for i in missing], queue)
+            for i, reply in zip(missing, retried):
+                replies[i] = reply
+        _collect(chunk, replies, outcome, results, changed)
+    return _bulk_result(results), changed
+
+
+async def _execute_chunk_async(redis_client, chunk, queue):
+    pipe = redis_client.pipeline(transaction=not cluster.enabled())
+    for item in chunk:
+        await queue(pipe, item)
+    return list(await pipe.execute(raise_on_error=False))
+
+
+def _missing_scripts(replies):
+    return [i for i, reply in enumerate(replies) if isinstance(reply, NoScriptError)]
+
+
+def _collect(chunk, replies, outcome, results, changed):
+    for item, reply in zip(chunk, replies):
+        if isinstance(reply, Exception):
+            logger.error(f"Erro ao gravar o item {item.id} do lote: {str(reply)}")
+            status, detail = ERROR, str(reply)
+        else:
+            status, detail = outcome(reply)
+        if status in SUCCESS_STATUSES:
+            changed.append(item.key)
+        results.append(BulkItemResultSchema(id=item.id, status=status, detail=detail))
+
+
+def _bulk_result(results):
+    succeeded = sum(result.status in SUCCESS_STATUSES for result in results)
+    return BulkResultSchema(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+
+def _create_outcome(exists_detail, requirement_detail):
+    def outcome(reply):
+        if reply == RECORD_CREATED:
+            return CREATED, None
+        if reply == RECORD_REQUIREMENT_MISSING:
+            return REQUIREMENT_MISSING, requirement_detail
+        return EXISTS, exists_detail
+
+    return outcome
+
+
+def _update_outcome(not_found_detail, requirement_detail):
+    def outcome(reply):
+        result, _ = merge_result(reply)
+        if result == MERGE_OK:
+            return UPDATED, None
+        if result == MERGE_NOT_FOUND:
+            return NOT_FOUND, not_found_detail
+        return REQUIREMENT_MISSING, requirement_detail
+
+    return outcome
+
+
+def _delete_outcome(not_found_detail):
+    return lambda reply: (DELETED, None) if reply == DELETE_OK else (NOT_FOUND, not_found_detail)
+
+
+async def bulk_create_async(redis_client, items, exists_detail, requirement_detail=None):
+    required = _required_keys(items)
+    existing = await _existing_keys_async(redis_client, required)
+    items, rejected = _split_requirements(items, existing, requirement_detail)
+    return await run_bulk_async(
+        redis_client,
+        items,
+        lambda pipe, item: async_pool.queue_create_record(pipe, item.key, item.data, **(item.options or {})),
+        _create_outcome(exists_detail, requirement_detail),
+        rejected,
+    )
+
+
+async def bulk_update_async(redis_client, items, not_found_detail, requirement_detail=None):
+    required = _required_keys(items)
+    existing = await _existing_keys_async(redis_client, required)
+    items, rejected = _split_requirements(items, existing, requirement_detail)
+    return await run_bulk_async(
+        redis_client,
+        items,
+        lambda pipe, item: async_pool.queue_merge_record(pipe, item.key, item.data, **(item.options or {})),
+        _update_outcome(not_found_detail, requirement_detail),
+        rejected,
+    )
+
+
+# Chaves exigidas pelos itens de uma criação ou atualização; só no cluster, em que ficam fora dos scripts
+def _required_keys(items):
+    if not cluster.enabled():
+        return []
+    return list({key for item in items for key in (item.options or {}).get("requires", ())})
+
+
+async def _existing_keys_async(redis_client, keys):
+    if not keys:
+        return set()
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.exists(key)
+    return {key for key, exists in zip(keys, await pipe.execute()) if exists}
+
+
+# Separa os itens cujas chaves exigidas não existem (recusados como REQUIREMENT_MISSING)
+def _split_requirements(items, existing, requirement_detail):
+    if not cluster.enabled():
+        return items, []
+    accepted, rejected = [], []
+    for item in items:
+        if all(key in existing for key in (item.options or {}).get("requires", ())):
+            accepted.append(item)
+        else:
+            rejected.append(rejected_item(item.id, REQUIREMENT_MISSING, requirement_detail))
+    return accepted, rejected
+
+
+async def bulk_delete_async(redis_client, items, not_found_detail):
+    return await run_bulk_async(
+        redis_client,
+        items,
+        lambda pipe, item: async_pool.delete_record(pipe, item.key, **(item.options or {})),
+        _delete_outcome(not_found_detail),
+    )
+
+
+# Depois do lote: versões (ETag) das chaves alteradas e da coleção e, para as coleções com
+# cache local, invalidação das entradas nos workers
+async def notify_bulk_changes_async(redis_client, changed, list_name, invalidate_cache=True):
+    if not changed:
+        return
+    if invalidate_cache:
+        await invalidate_async(redis_client, *changed, list_name)
+    await bump_versions_async(redis_client, *changed, list_name)
+
+
+# Resultado de um item recusado antes da gravação (ex.: equipe atribuída inexistente)
+def rejected_item(item_id, status, detail):
+    return BulkItemResultSchema(id=item_id, status=status, detail=detail)
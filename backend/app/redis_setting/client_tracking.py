@@ -0,0 +1,220 @@
+# Cache no cliente assistido pelo servidor (CLIENT TRACKING do Redis).
+#
+# Uma conexão dedicada por worker ativa o tracking em modo BCAST para os prefixos de
+# Config.REDIS_TRACKING_PREFIXES, redirecionando as invalidações para ela mesma, e assina o
+# canal __redis__:invalidate (protocolo RESP2). A partir daí o Redis avisa toda escrita em uma
+# chave desses prefixos, e os hashes lidos por load_record/fetch_many ficam numa LRU em memória
+# limitada a Config.REDIS_TRACKING_MAX_KEYS chaves.
+#
+# Uma leitura reserva a chave antes de ir ao Redis e só guarda o resultado se nenhuma
+# invalidação chegou nesse intervalo. Se a conexão de invalidação cair, o cache é esvaziado e
+# fica desligado até a reconexão.
+import threading
+from collections import OrderedDict
+
+import redis
+from fastapi import FastAPI
+
+from app.logging.logger import AppLogger
+from config import Config
+
+logger = AppLogger().get_logger()
+
+INVALIDATION_CHANNEL = b"__redis__:invalidate"
+MISSING = object()
+
+
+class TrackingCache:
+    def __init__(self, max_keys, prefixes):
+        self.max_keys = max_keys
+        self.prefixes = tuple(prefixes)
+        self.active = False
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def tracks(self, key):
+        return self.active and key.startswith(self.prefixes)
+
+    # Valor em cache da chave, ou MISSING (chaves reservadas contam como ausentes)
+    def lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key, MISSING)
+            if entry is MISSING or isinstance(entry, _Reservation):
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def reserve(self, key):
+        reservation = _Reservation()
+        with self._lock:
+            if not isinstance(self._entries.get(key), _Reservation):
+                self._entries[key] = reservation
+                self._evict()
+            return self._entries[key]
+
+    # Guarda o valor lido se a reserva ainda estiver de pé (sem invalidação no meio)
+    def fill(self, key, reservation, value):
+        with self._lock:
+            if self._entries.get(key) is reservation:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+
+    def invalidate(self, keys):
+        with self._lock:
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None and not isinstance(entry, _Reservation):
+                    self.invalidations += 1
+
+    def activate(self):
+        with self._lock:
+            self._entries.clear()
+            self.active = True
+
+    def deactivate(self):
+        with self._lock:
+            self.active = False
+            self._entries.clear()
+
+    def _evict(self):
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self.active,
+                "keys": len(self._entries),
+                "max_keys": self.max_keys,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class _Reservation:
+    __slots__ = ()
+
+
+tracking_cache = TrackingCache(Config.REDIS_TRACKING_MAX_KEYS, Config.REDIS_TRACKING_PREFIXES)
+_listener = None
+_stop = threading.Event()
+
+
+def _text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+# Lê a chave pelo cache quando ela pertence a um prefixo monitorado; senão chama loader()
+def read_through(key, loader):
+    key = _text(key)
+    if not tracking_cache.tracks(key):
+        return loader()
+    value = tracking_cache.lookup(key)
+    if value is not MISSING:
+        return value
+    reservation = tracking_cache.reserve(key)
+    value = loader()
+    tracking_cache.fill(key, reservation, value)
+    return value
+
+
+# Mesma leitura para as rotas assíncronas (loader() devolve um awaitable)
+async def read_through_async(key, loader):
+    key = _text(key)
+    if not tracking_cache.tracks(key):
+        return await loader()
+    value = tracking_cache.lookup(key)
+    if value is not MISSING:
+        return value
+    reservation = tracking_cache.reserve(key)
+    value = await loader()
+    tracking_cache.fill(key, reservation, value)
+    return value
+
+
+def _subscribe(connection, prefixes):
+    connection.connect()
+    connection.send_command("CLIENT", "ID")
+    client_id = connection.read_response()
+    prefix_args = [arg for prefix in prefixes for arg in ("PREFIX", prefix)]
+    connection.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", *prefix_args)
+    connection.read_response()
+    connection.send_command("SUBSCRIBE", INVALIDATION_CHANNEL)
+    connection.read_response()
+
+
+def _handle(message):
+    kind, channel, keys = message
+    if kind != b"message" or channel != INVALIDATION_CHANNEL:
+        return
+    # Sem chaves: o banco foi esvaziado (FLUSHDB/FLUSHALL)
+    if keys is None:
+        tracking_cache.activate()
+    else:
+        tracking_cache.invalidate(_text(key) for key in keys)
+
+
+def _listen(connection, prefixes):
+    while not _stop.is_set():
+        try:
+            _subscribe(connection, prefixes)
+            tracking_cache.activate()
+            logger.info("Cache com CLIENT TRACKING ativado")
+            while not _stop.is_set():
+                if connection.can_read(timeout=1):
+                    _handle(connection.read_response())
+        except (redis.RedisError, OSError) as e:
+            logger.error(f"Conexão de invalidação do CLIENT TRACKING perdida: {str(e)}")
+            tracking_cache.deactivate()
+            connection.disconnect()
+            _stop.wait(1)
+    tracking_cache.deactivate()
+    connection.disconnect()
+
+
+def start_tracking(redis_client=None, prefixes=None):
+    global _listener
+    if _listener is not None:
+        return
+    if redis_client is None:
+        from app.redis_setting.redis_pool import get_redis_client
+        redis_client = get_redis_client()
+    if prefixes:
+        tracking_cache.prefixes = tuple(prefixes)
+    pool = redis_client.connection_pool
+    connection = pool.connection_class(**pool.connection_kwargs)
+    _stop.clear()
+    _listener = threading.Thread(
+        target=_listen,
+        args=(connection, tracking_cache.prefixes),
+        name="redis-client-tracking",
+        daemon=True,
+    )
+    _listener.start()
+
+
+def stop_tracking():
+    global _listener
+    if _listener is None:
+        return
+    _stop.set()
+    _listener.join(timeout=5)
+    _listener = None
+
+
+# No modo cluster as invalidações viriam de cada nó em conexões separadas; o tracking fica desligado
+def configure(app: FastAPI):
+    if Config.REDIS_CLIENT_TRACKING and Config.REDIS_CLUSTER:
+        logger.warning("REDIS_CLIENT_TRACKING é ignorado no modo cluster")
+    elif Config.REDIS_CLIENT_TRACKING:
+        app.add_event_handler("startup", start_tracking)
+        app.add_event_handler("shutdown", stop_tracking)
@@ -0,0 +1,124 @@
+# Layout das chaves para o Redis Cluster (Config.REDIS_CLUSTER), com hash tags por bucket.
+#
+# No layout sem cluster cada coleção tem um set global ("machines_list", "maintenance_list",
+# os índices "maintenance_index:<campo>:<valor>"), que no cluster seria um único slot quente.
+# No cluster cada um desses sets vira Config.REDIS_CLUSTER_BUCKETS sets, um por bucket, e o
+# registro leva na chave a hash tag do seu bucket (bucket = crc32(id) % REDIS_CLUSTER_BUCKETS):
+#
+#   machine:{machine.7}:S-100                          registro
+#   machines_list:{machine.7}                          membros do bucket 7 da coleção
+#   maintenance_index:{maintenance.3}:status:Aberta    índice no bucket 3
+#
+# Registro, set do bucket e índices ficam no mesmo slot, então os scripts de criação, mescla
+# e remoção continuam atômicos, e os buckets de cada coleção se espalham pelos nós. As
+# listagens leem os buckets num pipeline do cluster, que envia os comandos de cada nó em
+# paralelo. Fora do modo cluster todas as funções abaixo devolvem as chaves de sempre.
+#
+# Diferenças no modo cluster: a equipe exigida por uma manutenção fica em outro slot e é
+# conferida antes do script; o e-mail é reservado no bucket do próprio e-mail antes do usuário;
+# os lotes (/bulk) não usam MULTI por bloco; o CLIENT TRACKING e as réplicas de
+# REDIS_REPLICAS ficam desligados (REDIS_CLUSTER_READ_FROM_REPLICAS lê das réplicas de cada
+# shard). Migração do layout atual: ver cluster_migration.py.
+import re
+import zlib
+
+from config import Config
+
+# Prefixo dos registros de cada set lógico, pelo primeiro segmento do nome
+COLLECTION_PREFIXES = {
+    "machines_list": "machine",
+    "teams_list": "team",
+    "parts_list": "parts",
+    "maintenance_list": "maintenance",
+    "maintenance_index": "maintenance",
+}
+
+CLUSTER_KEY = re.compile(r"^([^:{]+):(\{[^{}]+\.\d+\}):(.*)$", re.DOTALL)
+
+
+def enabled():
+    return Config.REDIS_CLUSTER
+
+
+def _text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def bucket_of(record_id):
+    return zlib.crc32(str(record_id).encode("utf-8")) % Config.REDIS_CLUSTER_BUCKETS
+
+
+def bucket_tag(prefix, bucket):
+    return f"{{{prefix}.{bucket}}}"
+
+
+# Chave do registro: "machine:S-100" ou, no cluster, "machine:{machine.7}:S-100"
+def record_key(prefix, record_id):
+    if not enabled():
+        return f"{prefix}:{record_id}"
+    return f"{prefix}:{bucket_tag(prefix, bucket_of(record_id))}:{record_id}"
+
+
+# Chave de um registro referenciado no formato "<prefixo>:<id>" (ex.: assigned_team_id = "team:A");
+# uma referência que já está no layout do cluster é usada como veio
+def reference_key(reference):
+    if CLUSTER_KEY.match(reference):
+        return reference
+    prefix, _, record_id = reference.partition(":")
+    return record_key(prefix, record_id) if record_id else reference
+
+
+# Identificador público de um registro ("team:A"), sem a hash tag do bucket
+def logical_key(key):
+    key = _text(key)
+    match = CLUSTER_KEY.match(key)
+    return f"{match.group(1)}:{match.group(3)}" if match else key
+
+
+# Converte a chave de um registro gravado em qualquer um dos layouts para o layout em uso
+# (restauração de backups e migração)
+def layout_key(key):
+    key = _text(key)
+    match = CLUSTER_KEY.match(key)
+    if match:
+        return key if enabled() else logical_key(key)
+    return reference_key(key) if enabled() else key
+
+
+def key_tag(key):
+    match = CLUSTER_KEY.match(_text(key))
+    return match.group(2) if match else None
+
+
+# Nome do set no bucket da tag: "machines_list" -> "machines_list:{machine.7}",
+# "maintenance_index:status:Aberta" -> "maintenance_index:{maintenance.7}:status:Aberta"
+def bucketed(name, tag):
+    head, separator, rest = name.partition(":")
+    return f"{head}:{tag}:{rest}" if separator else f"{name}:{tag}"
+
+
+# Set/sorted set (ou prefixo de índice) que recebe o registro: o do bucket do registro no cluster
+def member_key(name, key):
+    if not enabled():
+        return name
+    return bucketed(name, key_tag(key))
+
+
+def _bucket_tags(name):
+    prefix = COLLECTION_PREFIXES[name.partition(":")[0]]
+    return [bucket_tag(prefix, bucket) for bucket in range(Config.REDIS_CLUSTER_BUCKETS)]
+
+
+# Chaves de um set lógico: ele mesmo, ou um set por bucket no cluster
+def collection_keys(name):
+    if not enabled():
+        return [name]
+    return [bucketed(name, tag) for tag in _bucket_tags(name)]
+
+
+# Os mesmos sets lógicos agrupados por bucket, para comandos com várias chaves
+# (SINTERSTORE/ZINTERSTORE), que no cluster só podem envolver chaves de um mesmo slot
+def collection_groups(*names):
+    if not enabled():
+        return [list(names)]
+    return [[bucketed(name, tag) for name in names] for tag in _bucket_tags(names[0])]
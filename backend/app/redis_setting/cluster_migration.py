@@ -0,0 +1,50 @@
+# Migração de uma base sem cluster para o Redis Cluster, no layout com buckets (ver cluster.py).
+#
+# Lê os registros da base de origem com SCAN e leitura em lote e os grava no cluster com
+# restore_backup, que converte cada chave para o layout do cluster, coloca o registro no set
+# do seu bucket e, ao final, reconstrói os índices das manutenções e o índice de e-mails e
+# invalida versões e caches. A origem não é alterada; a memória usada não depende do tamanho
+# da base. Escritas feitas na origem durante a cópia não são levadas: rode com a aplicação
+# parada (ou repita o comando, que substitui os registros já copiados).
+#
+# Uso (a partir da pasta backend, com REDIS_CLUSTER=true e REDIS_CLUSTER_NODES do destino):
+#   python -m app.redis_setting.cluster_migration migrate --source-host redis-antigo --source-port 6379
+import argparse
+import sys
+
+import redis
+
+from app.logging.logger import AppLogger
+from app.redis_setting.backup import iter_records, restore_backup
+from app.redis_setting.redis_pool import get_redis_client
+from config import Config
+
+logger = AppLogger().get_logger()
+
+
+# Copia os registros de source (cliente da base sem cluster) para target (cliente do cluster);
+# retorna a quantidade de registros gravados
+def migrate_to_cluster(source, target):
+    total = restore_backup(target, iter_records(source))
+    logger.info(f"Migração para o cluster concluída: {total} registros")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migração da base do Redis para o Redis Cluster")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--source-host", required=True)
+    parser.add_argument("--source-port", type=int, default=6379)
+    parser.add_argument("--source-db", type=int, default=0)
+    args = parser.parse_args()
+
+    if not Config.REDIS_CLUSTER:
+        print("Defina REDIS_CLUSTER=true e REDIS_CLUSTER_NODES com os nós do cluster de destino")
+        sys.exit(1)
+    source = redis.Redis(host=args.source_host, port=args.source_port, db=args.source_db)
+    total = migrate_to_cluster(source, get_redis_client())
+    print(f"{total} registros copiados para o cluster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+# Pool de conexões com o Redis, configurado por Config (variáveis de ambiente) e instrumentado.
+#
+# O pool bloqueante (padrão) limita as conexões a Config.REDIS_MAX_CONNECTIONS e faz as
+# requisições esperarem por uma conexão livre; o pool comum abre conexões até o limite e
+# falha em seguida. Os dois registram quantas conexões foram obtidas, o tempo gasto para
+# obtê-las (espera na fila + conexão/health check) e as falhas por pool esgotado, expostos
+# em GET /redis/pool/stats junto com as conexões em uso e ociosas. GET /health/redis faz um
+# PING e devolve 503 quando o Redis não responde.
+# create_async_pool() monta o pool equivalente do redis.asyncio, com a mesma instrumentação.
+# Com Config.REDIS_CLUSTER os clientes são do Redis Cluster (create_cluster/create_async_cluster),
+# com um pool por nó gerenciado pelo próprio redis-py.
+import threading
+import time
+
+import redis
+import redis.asyncio
+import redis.cluster
+from fastapi import APIRouter, FastAPI, HTTPException, status
+from app.logging.logger import AppLogger
+from app.redis_setting.resilience import AsyncDeadlineRetry, DeadlineRetry, breaker_for, breakers
+from config import Config
+
+logger = AppLogger().get_logger()
+router = APIRouter()
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.exhausted = 0
+        self.created = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.acquired += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_exhausted(self):
+        with self._lock:
+            self.exhausted += 1
+
+    def record_created(self):
+        with self._lock:
+            self.created += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "acquired": self.acquired,
+                "exhausted": self.exhausted,
+                "created": self.created,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.acquired, 6) if self.acquired else 0.0,
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+class _MeteredPool:
+    def __init__(self, *args, **kwargs):
+        self.metrics = PoolMetrics()
+        super().__init__(*args, **kwargs)
+
+    def make_connection(self):
+        connection = super().make_connection()
+        self.metrics.record_created()
+        return connection
+
+    def _record_failure(self, start):
+        if self._is_exhausted(time.perf_counter() - start):
+            self.metrics.record_exhausted()
+
+
+class _InstrumentedPool(_MeteredPool):
+    def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        try:
+            connection = super().get_connection(command_name, *keys, **options)
+        except redis.ConnectionError:
+            self._record_failure(start)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+# Mesma instrumentação para os pools do redis.asyncio (get_connection é uma corrotina)
+class _InstrumentedAsyncPool(_MeteredPool):
+    async def get_connection(self, command_name, *keys, **options):
+        start = time.perf_counter()
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        except redis.ConnectionError:
+            self._record_failure(start)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class _PoolStats:
+    def _is_exhausted(self, elapsed):
+        return self._created_connections >= self.max_connections
+
+    def stats(self):
+        return {
+            "blocking": False,
+            "max_connections": self.max_connections,
+            "in_use": len(self._in_use_connections),
+            "idle": len(self._available_connections),
+            **self.metrics.stats(),
+        }
+
+
+class _BlockingPoolStats:
+    # Esgotado: a espera pela fila chegou ao timeout (falhas ao conectar não contam)
+    def _is_exhausted(self, elapsed):
+        return elapsed >= self.timeout
+
+    def stats(self):
+        # A fila guarda as conexões ociosas e None para as vagas ainda não usadas
+        # (queue.LifoQueue no pool síncrono, asyncio.LifoQueue no assíncrono)
+        queued = getattr(self.pool, "queue", None)
+        if queued is None:
+            queued = self.pool._queue
+        idle = sum(1 for connection in list(queued) if connection is not None)
+        open_connections = len(self._connections)
+        return {
+            "blocking": True,
+            "max_connections": self.max_connections,
+            "timeout": self.timeout,
+            "in_use": open_connections - idle,
+            "idle": idle,
+            **self.metrics.stats(),
+        }
+
+
+class InstrumentedConnectionPool(_InstrumentedPool, _PoolStats, redis.ConnectionPool):
+    pass
+
+
+class InstrumentedBlockingConnectionPool(_InstrumentedPool, _BlockingPoolStats, redis.BlockingConnectionPool):
+    pass
+
+
+class InstrumentedAsyncConnectionPool(_InstrumentedAsyncPool, _PoolStats, redis.asyncio.ConnectionPool):
+    pass
+
+
+class InstrumentedAsyncBlockingConnectionPool(
+    _InstrumentedAsyncPool, _BlockingPoolStats, redis.asyncio.BlockingConnectionPool
+):
+    pass
+
+
+# Opções das conexões. O Retry (resilience.py) faz as retentativas dentro do orçamento da
+# requisição e tem um circuit breaker por servidor, compartilhado pelos pools síncrono e assíncrono.
+def connection_options(retry_class=DeadlineRetry, host=None, port=None, breaker=None):
+    host, port = host or Config.REDIS_HOST, port or Config.REDIS_PORT
+    options = {
+        "host": host,
+        "port": port,
+        "db": Config.REDIS_DB,
+        "socket_timeout": Config.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": Config.REDIS_SOCKET_CONNECT_TIMEOUT,
+        "socket_keepalive": Config.REDIS_SOCKET_KEEPALIVE,
+        "health_check_interval": Config.REDIS_HEALTH_CHECK_INTERVAL,
+        "retry": retry_class(breaker or breaker_for(f"{host}:{port}")),
+        "retry_on_error": [redis.ConnectionError, redis.TimeoutError],
+    }
+    return options
+
+
+def create_pool():
+    if Config.REDIS_POOL_BLOCKING:
+        return InstrumentedBlockingConnectionPool(
+            max_connections=Config.REDIS_MAX_CONNECTIONS,
+            timeout=Config.REDIS_POOL_TIMEOUT,
+            **connection_options(),
+        )
+    return InstrumentedConnectionPool(max_connections=Config.REDIS_MAX_CONNECTIONS, **connection_options())
+
+
+# Pool do redis.asyncio com as mesmas configurações, usado pelas rotas assíncronas (async_pool.py)
+# e, com host/port, pelas réplicas de leitura (replicas.py)
+def create_async_pool(host=None, port=None):
+    options = connection_options(AsyncDeadlineRetry, host, port)
+    if Config.REDIS_POOL_BLOCKING:
+        return InstrumentedAsyncBlockingConnectionPool(
+            max_connections=Config.REDIS_MAX_CONNECTIONS,
+            timeout=Config.REDIS_POOL_TIMEOUT,
+            **options,
+        )
+    return InstrumentedAsyncConnectionPool(max_connections=Config.REDIS_MAX_CONNECTIONS, **options)
+
+
+# "host:porta,host:porta" -> [(host, porta)] (porta padrão: Config.REDIS_PORT)
+def parse_addresses(value):
+    addresses = []
+    for address in (value or "").split(","):
+        address = address.strip()
+        if address:
+            host, _, port = address.rpartition(":")
+            addresses.append((host, int(port)) if host else (port, Config.REDIS_PORT))
+    return addresses
+
+
+def cluster_nodes():
+    return parse_addresses(Config.REDIS_CLUSTER_NODES) or [(Config.REDIS_HOST, Config.REDIS_PORT)]
+
+
+# Opções dos clientes do cluster: as mesmas do pool, com o limite de conexões valendo por nó
+def cluster_options(retry_class=DeadlineRetry):
+    options = connection_options(retry_class, breaker=breaker_for("cluster"))
+    for name in ("host", "port", "db"):
+        options.pop(name)
+    return {
+        **options,
+        "max_connections": Config.REDIS_MAX_CONNECTIONS,
+        "read_from_replicas": Config.REDIS_CLUSTER_READ_FROM_REPLICAS,
+    }
+
+
+def create_cluster():
+    nodes = [redis.cluster.ClusterNode(host, port) for host, port in cluster_nodes()]
+    return redis.cluster.RedisCluster(startup_nodes=nodes, **cluster_options())
+
+
+def create_async_cluster():
+    nodes = [redis.asyncio.cluster.ClusterNode(host, port) for host, port in cluster_nodes()]
+    return redis.asyncio.RedisCluster(startup_nodes=nodes, **cluster_options(AsyncDeadlineRetry))
+
+
+def pool_stats(pool):
+    stats = getattr(pool, "stats", None)
+    return stats() if stats else {"instrumented": False}
+
+
+def _pool():
+    from app.redis_setting.redis_pool import pool
+    return pool
+
+
+def _async_pool():
+    from app.redis_setting import async_pool
+    return async_pool.pool
+
+
+def breaker_stats():
+    return {name: breaker.stats() for name, breaker in breakers.items()}
+
+
+# Endpoint com as métricas dos pools de conexões deste worker (síncrono e assíncrono) e o
+# estado dos circuit breakers
+@router.get("/redis/pool/stats", tags=["Redis"])
+def get_pool_stats():
+    if Config.REDIS_CLUSTER:
+        return {
+            "cluster": {"nodes": cluster_nodes(), "buckets": Config.REDIS_CLUSTER_BUCKETS},
+            "breakers": breaker_stats(),
+        }
+    async_pool = _async_pool()
+    return {
+        **pool_stats(_pool()),
+        "async": pool_stats(async_pool) if async_pool is not None else None,
+        "breakers": breaker_stats(),
+    }
+
+
+# Health check: PING no Redis (pelo pool assíncrono) com a latência medida
+@router.get("/health/redis", tags=["Redis"])
+async def redis_health():
+    from app.redis_setting.async_pool import get_redis_client
+
+    client = await get_redis_client()
+    start = time.perf_counter()
+    try:
+        await client.ping()
+    except (redis.RedisError, OSError) as e:
+        logger.error(f"Health check do Redis falhou: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Redis indisponível: {str(e)}")
+    return {"status": "ok", "latency_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+def configure(app: FastAPI):
+    app.include_router(router)
@@ -0,0 +1,39 @@
+# Migração dos registros antigos (string JSON) para o layout em hash.
+#
+# Percorre as chaves dos registros com SCAN e converte cada uma no próprio Redis (script
+# to_hash), em pipelines por bloco. Registros que já são hash não são alterados, então o
+# comando pode ser repetido com a aplicação no ar.
+#
+# Uso (a partir da pasta backend):
+#   python -m app.redis_setting.hash_migration migrate
+import sys
+
+from app.logging.logger import AppLogger
+from app.redis_setting.redis_pool import get_redis_client, chunked, convert_to_hash
+from config import Config
+
+logger = AppLogger().get_logger()
+
+RECORD_PATTERNS = ("machine:*", "team:*", "parts:*", "maintenance:*", "user:*")
+
+
+# Converte os registros legados de todas as coleções; retorna (lidos, convertidos)
+def migrate_to_hashes(redis_client, patterns=RECORD_PATTERNS):
+    total, converted = 0, 0
+    for pattern in patterns:
+        keys = redis_client.scan_iter(pattern, count=1000, _type="string")
+        for chunk in chunked(keys, Config.REDIS_BULK_CHUNK_SIZE):
+            pipe = redis_client.pipeline(transaction=False)
+            for key in chunk:
+                convert_to_hash(pipe, key)
+            converted += sum(pipe.execute())
+            total += len(chunk)
+            logger.info(f"{pattern}: {total} registros lidos, {converted} convertidos")
+    return total, converted
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["migrate"]:
+        print("Uso: python -m app.redis_setting.hash_migration migrate")
+        sys.exit(1)
+    migrate_to_hashes(get_redis_client())
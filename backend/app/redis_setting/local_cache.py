@@ -0,0 +1,225 @@
+# Cache em memória (por processo) das leituras de máquinas, equipes e peças.
+#
+# LRU com expiração por TTL, guardando os objetos já validados pelo Pydantic, indexados pela
+# chave do Redis que originou a leitura ("machine:<serial>", "machines_list", ...).
+# Cada escrita descarta as entradas localmente e publica as chaves alteradas no canal
+# Config.LOCAL_CACHE_CHANNEL, assinado por todos os workers. Se a assinatura cair, o cache é
+# esvaziado; mensagens perdidas durante a reconexão ficam limitadas pelo TTL.
+# O cache só é usado depois que a assinatura foi iniciada (evento de startup da aplicação).
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from fastapi import APIRouter, FastAPI
+
+from app.logging.logger import AppLogger
+from app.redis_setting.redis_pool import get_redis_client
+from app.redis_setting.client_tracking import tracking_cache
+from config import Config
+
+logger = AppLogger().get_logger()
+router = APIRouter()
+
+MISSING = object()
+# Mensagem de invalidação que esvazia o cache inteiro
+CLEAR_ALL = "*"
+
+
+class LocalCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Incrementado a cada invalidação: uma leitura iniciada antes dela não é guardada
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return MISSING
+
+    # ttl: validade desta entrada, se diferente do TTL do cache
+    def set(self, key, value, generation=None, ttl=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # Devolve o valor em cache ou o obtém com loader() e o guarda
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+        generation = self._generation
+        value = loader()
+        self.set(key, value, generation)
+        return value
+
+    async def get_or_load_async(self, key, loader):
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+        generation = self._generation
+        value = await loader()
+        self.set(key, value, generation)
+        return value
+
+    # A entrada guarda a versão (ETag) em que foi lida e só vale enquanto a versão atual for a
+    # mesma: uma leitura atrasada (ex.: réplica) não fica no cache depois que a versão muda
+    async def get_or_load_versioned_async(self, key, version, loader):
+        entry = self.get(key)
+        if entry is not MISSING and entry[0] == version:
+            return entry[1]
+        generation = self._generation
+        value = await loader()
+        self.set(key, (version, value), generation)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+cache = LocalCache(Config.LOCAL_CACHE_MAX_ENTRIES, Config.LOCAL_CACHE_TTL)
+_listener = None
+
+
+# Leitura através do cache; sem a assinatura de invalidação ativa, lê direto do Redis
+def cached(key, loader):
+    if _listener is None:
+        return loader()
+    return cache.get_or_load(key, loader)
+
+
+async def cached_async(key, loader, version=None):
+    if _listener is None:
+        return await loader()
+    if version is not None:
+        return await cache.get_or_load_versioned_async(key, version, loader)
+    return await cache.get_or_load_async(key, loader)
+
+
+# Descarta as chaves neste worker e avisa os demais. A escrita já foi feita, então uma falha
+# na publicação é apenas registrada (os outros workers expiram a entrada pelo TTL).
+def invalidate(redis_client, *keys):
+    cache.invalidate(*keys)
+    try:
+        redis_client.publish(Config.LOCAL_CACHE_CHANNEL, json.dumps(keys))
+    except (redis.RedisError, ConnectionError, TimeoutError) as e:
+        logger.error(f"Erro ao publicar a invalidação do cache: {str(e)}")
+
+
+async def invalidate_async(redis_client, *keys):
+    cache.invalidate(*keys)
+    try:
+        await redis_client.publish(Config.LOCAL_CACHE_CHANNEL, json.dumps(keys))
+    except (redis.RedisError, ConnectionError, TimeoutError) as e:
+        logger.error(f"Erro ao publicar a invalidação do cache: {str(e)}")
+
+
+# Esvazia o cache neste worker e nos demais (ex.: depois de restaurar um backup)
+def invalidate_all(redis_client):
+    cache.clear()
+    try:
+        redis_client.publish(Config.LOCAL_CACHE_CHANNEL, json.dumps(CLEAR_ALL))
+    except (redis.RedisError, ConnectionError, TimeoutError) as e:
+        logger.error(f"Erro ao publicar a invalidação do cache: {str(e)}")
+
+
+def _on_invalidation(message):
+    try:
+        keys = json.loads(message["data"])
+        if keys == CLEAR_ALL:
+            cache.clear()
+        else:
+            cache.invalidate(*keys)
+    except (ValueError, TypeError) as e:
+        logger.error(f"Mensagem de invalidação inválida: {str(e)}")
+        cache.clear()
+
+
+def _on_listener_error(error, pubsub, thread):
+    logger.error(f"Erro na assinatura de invalidação do cache: {str(error)}")
+    cache.clear()
+    time.sleep(1)
+
+
+def start_invalidation_listener(redis_client=None):
+    global _listener
+    if not Config.LOCAL_CACHE_ENABLED or _listener is not None:
+        return
+    try:
+        pubsub = (redis_client or get_redis_client()).pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{Config.LOCAL_CACHE_CHANNEL: _on_invalidation})
+    except (redis.RedisError, ConnectionError, TimeoutError) as e:
+        logger.error(f"Cache local desativado, não foi possível assinar as invalidações: {str(e)}")
+        return
+    _listener = pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=_on_listener_error)
+    logger.info("Cache local ativado")
+
+
+def stop_invalidation_listener():
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    cache.clear()
+
+
+# Endpoint com os contadores do cache local e do cache do CLIENT TRACKING deste worker
+@router.get("/cache/stats", tags=["Cache"])
+def get_cache_stats():
+    return {
+        "enabled": _listener is not None,
+        **cache.stats(),
+        "client_tracking": tracking_cache.stats(),
+    }
+
+
+def configure(app: FastAPI):
+    app.add_event_handler("startup", start_invalidation_listener)
+    app.add_event_handler("shutdown", stop_invalidation_listener)
+    app.include_router(router)
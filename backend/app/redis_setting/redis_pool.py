@@ -1,26 +1,608 @@
 from redis import Redis
 import redis
-from tenacity import retry, stop_after_attempt, wait_exponential
-from fastapi import HTTPException
+from itertools import chain, islice
 import json
+import threading
+from app.logging.logger import AppLogger
+from app.redis_setting import cluster
+from app.redis_setting.client_tracking import tracking_cache, read_through, MISSING
+from app.redis_setting.cluster import collection_keys, member_key
+from app.redis_setting.connection_pool import create_cluster, create_pool
 from config import Config
 
-pool = redis.ConnectionPool(host=Config.REDIS_HOST, port=Config.REDIS_PORT, db=Config.REDIS_DB)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = AppLogger().get_logger()
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Pool configurado e instrumentado (ver connection_pool.py)
+pool = create_pool()
+
+# No modo cluster (Config.REDIS_CLUSTER) o cliente é um RedisCluster compartilhado, criado
+# na primeira chamada
+_cluster_client = None
+_cluster_lock = threading.Lock()
 
 def get_redis_client():
-    return redis.Redis(connection_pool=pool)
+    global _cluster_client
+    if not cluster.enabled():
+        return redis.Redis(connection_pool=pool)
+    with _cluster_lock:
+        if _cluster_client is None:
+            _cluster_client = create_cluster()
+    return _cluster_client
+
+# Codec dos valores gravados nos campos dos registros. Cada valor começa com um byte de
+# versão que identifica o formato (JSON via orjson ou msgpack); valores sem esse byte são
+# JSON puro, gravados antes da camada de codec, e continuam legíveis.
+# O formato das novas gravações vem de Config.REDIS_CODEC.
+JSON_FORMAT = 1
+MSGPACK_FORMAT = 2
+CODEC_FORMATS = {"json": JSON_FORMAT, "msgpack": MSGPACK_FORMAT}
+
+
+def _json_dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value).encode("utf-8")
+
+
+def _json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _msgpack_dumps(value):
+    if msgpack is None:
+        raise RuntimeError("msgpack não está instalado")
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def _msgpack_loads(data):
+    if msgpack is None:
+        raise ValueError("Registro em msgpack, mas o msgpack não está instalado")
+    return msgpack.unpackb(data, raw=False)
+
+
+ENCODERS = {JSON_FORMAT: _json_dumps, MSGPACK_FORMAT: _msgpack_dumps}
+DECODERS = {JSON_FORMAT: _json_loads, MSGPACK_FORMAT: _msgpack_loads}
+
+
+# Formato usado nas gravações; sem o msgpack instalado os registros são gravados em JSON
+def resolve_format(name):
+    value_format = CODEC_FORMATS[name]
+    if value_format == MSGPACK_FORMAT and msgpack is None:
+        logger.warning("msgpack não está instalado; gravando os registros em JSON")
+        return JSON_FORMAT
+    return value_format
+
+
+WRITE_FORMAT = resolve_format(Config.REDIS_CODEC)
+
+
+def encode_value(value, value_format=None):
+    value_format = value_format or WRITE_FORMAT
+    return bytes([value_format]) + ENCODERS[value_format](value)
+
+
+def decode_value(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    decoder = DECODERS.get(data[0]) if data else None
+    if decoder is None:
+        return _json_loads(data)
+    return decoder(data[1:])
+
+
+# Layout dos registros: cada registro é um hash e cada campo guarda o próprio valor codificado
+# (textos, números e listas). Assim uma troca de status ou de quantidade grava só o campo
+# alterado, e leituras podem projetar apenas alguns campos (HMGET).
+# Registros antigos, gravados como uma string JSON única, continuam legíveis e são
+# convertidos para hash na primeira atualização ou pelo comando de migração
+# (python -m app.redis_setting.hash_migration).
+def encode_fields(data, value_format=None):
+    return {field: encode_value(value, value_format) for field, value in data.items()}
+
 
-@retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3))
-def save_to_redis(redis_client, key, data):
+def decode_fields(mapping):
+    return {_text(field): decode_value(value) for field, value in mapping.items()}
+
+
+def _text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _is_wrong_type(error):
+    return isinstance(error, redis.ResponseError) and str(error).startswith("WRONGTYPE")
+
+
+# Registro legado: a string JSON com o documento inteiro
+def _decode_document(data):
+    if not data:
+        return None
+    document = json.loads(_text(data))
+    if not isinstance(document, dict):
+        raise ValueError(f"Formato inválido de dados: {document}")
+    return document
+
+
+# Lê um registro completo (ou None se não existir).
+# Com o CLIENT TRACKING ativo, chaves dos prefixos monitorados vêm do cache do worker.
+def load_record(redis_client, key):
     try:
-        redis_client.set(key, json.dumps(data))
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
-    
-@retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3))
-def load_from_redis(redis_client, key):
+        data = read_through(key, lambda: redis_client.hgetall(key))
+    except redis.ResponseError as e:
+        if not _is_wrong_type(e):
+            raise
+        return _decode_document(redis_client.get(key))
+    return decode_fields(data) if data else None
+
+
+# Lê apenas alguns campos do registro (HMGET); None se o registro não existir
+def load_fields(redis_client, key, fields):
     try:
-        data = redis_client.get(key)
-        return json.loads(data.decode('utf-8')) if data else None
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+        values = redis_client.hmget(key, fields)
+    except redis.ResponseError as e:
+        if not _is_wrong_type(e):
+            raise
+        document = _decode_document(redis_client.get(key))
+        return {field: document.get(field) for field in fields} if document else None
+    if all(value is None for value in values):
+        return None
+    return {field: decode_value(value) if value is not None else None for field, value in zip(fields, values)}
+
+
+# Divide um iterável em blocos de tamanho fixo
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Leitura em lote: resolve as chaves com um pipeline de HGETALL por bloco em vez de um
+# round trip por chave, devolvendo pares (chave, registro decodificado).
+# Chaves que não existem mais (removidas entre o SMEMBERS e a leitura) são ignoradas, assim
+# como registros que não puderem ser decodificados; registros legados (string JSON) são
+# lidos com um MGET extra no mesmo bloco.
+# Com o CLIENT TRACKING ativo, só as chaves fora do cache do worker vão para o pipeline.
+def fetch_many(redis_client, keys, chunk_size=None):
+    chunk_size = chunk_size or Config.REDIS_BULK_CHUNK_SIZE
+    for chunk in chunked(keys, chunk_size):
+        results = _fetch_hashes(redis_client, chunk)
+
+        legacy_keys = legacy_record_keys(chunk, results)
+        legacy = dict(zip(legacy_keys, redis_client.mget(legacy_keys))) if legacy_keys else {}
+        yield from decode_chunk(chunk, results, legacy)
+
+
+# Chaves do bloco que ainda são registros legados (string JSON)
+def legacy_record_keys(chunk, results):
+    return [key for key, result in zip(chunk, results) if _is_wrong_type(result)]
+
+
+# Pares (chave, registro) de um bloco lido por fetch_many, ignorando os ausentes e inválidos
+def decode_chunk(chunk, results, legacy):
+    for key, result in zip(chunk, results):
+        try:
+            if key in legacy:
+                record = _decode_document(legacy[key])
+            elif isinstance(result, Exception):
+                raise result
+            else:
+                record = decode_fields(result) if result else None
+        except ValueError as e:
+            logger.error(f"Erro ao decodificar o registro {_text(key)}: {str(e)}")
+            continue
+        if record:
+            yield key, record
+
+
+# HGETALL das chaves do bloco num pipeline, aproveitando as que já estão no cache do tracking
+def _fetch_hashes(redis_client, chunk):
+    results, reservations, pending = tracked_lookup(chunk)
+    if pending:
+        pipe = redis_client.pipeline(transaction=False)
+        for i in pending:
+            pipe.hgetall(chunk[i])
+        tracked_fill(chunk, results, reservations, pending, pipe.execute(raise_on_error=False))
+    return results
+
+
+# Consulta o cache do tracking para as chaves do bloco: (resultados, reservas, posições pendentes)
+def tracked_lookup(chunk):
+    results = [MISSING] * len(chunk)
+    reservations = {}
+    for i, key in enumerate(chunk):
+        text_key = _text(key)
+        if tracking_cache.tracks(text_key):
+            results[i] = tracking_cache.lookup(text_key)
+            if results[i] is MISSING:
+                reservations[i] = tracking_cache.reserve(text_key)
+    return results, reservations, [i for i, result in enumerate(results) if result is MISSING]
+
+
+# Completa os resultados pendentes com as respostas do Redis, guardando-as no cache do tracking
+def tracked_fill(chunk, results, reservations, pending, replies):
+    for i, result in zip(pending, replies):
+        results[i] = result
+        if i in reservations and not isinstance(result, Exception):
+            tracking_cache.fill(_text(chunk[i]), reservations[i], result)
+
+
+# Membros de um set lógico; no cluster, os sets de todos os buckets num pipeline
+def collection_members(redis_client, list_name):
+    names = collection_keys(list_name)
+    if len(names) == 1:
+        return redis_client.smembers(list_name)
+    pipe = redis_client.pipeline(transaction=False)
+    for name in names:
+        pipe.smembers(name)
+    return set().union(*pipe.execute())
+
+
+# Lê todos os registros de uma coleção (set de membros) em lote
+def fetch_collection(redis_client, list_name, chunk_size=None):
+    return fetch_many(redis_client, collection_members(redis_client, list_name), chunk_size)
+
+
+# Percorre a coleção inteira com SSCAN em blocos, sem carregar o set de membros na memória.
+# O SSCAN pode repetir uma chave se o set for redimensionado durante a varredura.
+def scan_collection(redis_client, list_name, chunk_size=None):
+    chunk_size = chunk_size or Config.REDIS_BULK_CHUNK_SIZE
+    keys = chain.from_iterable(
+        redis_client.sscan_iter(name, count=chunk_size) for name in collection_keys(list_name)
+    )
+    return fetch_many(redis_client, keys, chunk_size)
+
+
+# Cursor das páginas: o cursor do SSCAN e, no cluster, o bucket em que a varredura está
+# (cursor = cursor do SSCAN * nº de buckets + bucket). Sem cluster é o próprio cursor do SSCAN.
+def split_page_cursor(cursor, buckets):
+    return divmod(cursor, buckets)
+
+
+def join_page_cursor(scan_cursor, bucket, buckets):
+    return 0 if bucket == buckets else scan_cursor * buckets + bucket
+
+
+# Lê uma página da coleção com SSCAN, sem materializar o set inteiro.
+# Retorna o próximo cursor (0 quando a coleção terminou) e os registros da página.
+# O limite é aproximado: o SSCAN pode devolver um pouco mais de chaves que o pedido.
+def fetch_collection_page(redis_client, list_name, cursor=0, limit=None, chunk_size=None):
+    limit = limit or Config.PAGE_SIZE
+    names = collection_keys(list_name)
+    cursor, bucket = split_page_cursor(cursor, len(names))
+    keys = []
+    while bucket < len(names):
+        cursor, batch = redis_client.sscan(names[bucket], cursor=cursor, count=limit)
+        keys.extend(batch)
+        if cursor == 0:
+            bucket += 1
+        if len(keys) >= limit:
+            break
+    return join_page_cursor(cursor, bucket, len(names)), fetch_many(redis_client, keys, chunk_size)
+
+
+# Lê a coleção inteira ou, se cursor/limit forem informados, apenas uma página,
+# devolvendo o próximo cursor no cabeçalho X-Next-Cursor da resposta.
+# Com stream=True a coleção inteira é percorrida aos poucos (SSCAN) em vez de via SMEMBERS.
+def fetch_collection_paginated(redis_client, list_name, response, cursor=None, limit=None, stream=False):
+    if cursor is None and limit is None:
+        if stream:
+            return scan_collection(redis_client, list_name)
+        return fetch_collection(redis_client, list_name)
+
+    next_cursor, records = fetch_collection_page(redis_client, list_name, cursor or 0, limit)
+    response.headers[NEXT_CURSOR_HEADER] = str(next_cursor)
+    return records
+
+
+# Resultados de create_record
+RECORD_CREATED = 0
+RECORD_EXISTS = 1
+CLAIM_TAKEN = 2
+RECORD_REQUIREMENT_MISSING = 3
+
+# Criação atômica de um registro num único round trip: verifica se a chave já existe, se as
+# chaves exigidas existem e as reservas de unicidade, grava o hash do registro e o adiciona à
+# lista da coleção e aos índices.
+# KEYS = [registro, sets..., sorted sets..., hashes de reserva..., chaves que precisam existir...]
+# ARGV = [nº de sets, nº de sorted sets, nº de reservas, nº de chaves exigidas, scores...,
+#         (campo, valor) das reservas..., (campo, valor) do registro...]
+CREATE_RECORD_SCRIPT = """
+local n_sets, n_zsets = tonumber(ARGV[1]), tonumber(ARGV[2])
+local n_claims, n_requires = tonumber(ARGV[3]), tonumber(ARGV[4])
+local first_claim_key, first_claim_arg = 1 + n_sets + n_zsets, 4 + n_zsets
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 1
+end
+for i = 1, n_requires do
+    if redis.call('EXISTS', KEYS[first_claim_key + n_claims + i]) == 0 then
+        return 3
+    end
+end
+for i = 1, n_claims do
+    if redis.call('HEXISTS', KEYS[first_claim_key + i], ARGV[first_claim_arg + 2 * i - 1]) == 1 then
+        return 2
+    end
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, first_claim_arg + 2 * n_claims + 1))
+for i = 1, n_sets do
+    redis.call('SADD', KEYS[1 + i], KEYS[1])
+end
+for i = 1, n_zsets do
+    redis.call('ZADD', KEYS[1 + n_sets + i], ARGV[4 + i], KEYS[1])
+end
+for i = 1, n_claims do
+    redis.call('HSET', KEYS[first_claim_key + i], ARGV[first_claim_arg + 2 * i - 1], ARGV[first_claim_arg + 2 * i])
+end
+return 0
+"""
+
+# Os scripts só usam o cliente de registro para codificar os argumentos; a execução usa o
+# cliente (ou pipeline) passado em cada chamada
+_scripts = Redis(connection_pool=pool)
+_create_record = _scripts.register_script(CREATE_RECORD_SCRIPT)
+
+
+# Cria o registro se a chave ainda não existir (HSET + SADD na lista/índices, atomicamente).
+# sets: sets que recebem a chave do registro; sorted_sets: {sorted set: score};
+# claims: {hash: (campo, valor)} reservados com unicidade (ex.: e-mail -> usuário);
+# requires: chaves que precisam existir (ex.: equipe atribuída).
+# No cluster, sets e sorted sets viram os do bucket do registro (cluster.member_key); os
+# hashes de reserva precisam estar no mesmo slot do registro e as chaves exigidas são
+# conferidas antes do script (ver requirement_result).
+# Retorna RECORD_CREATED, RECORD_EXISTS, CLAIM_TAKEN ou RECORD_REQUIREMENT_MISSING.
+def create_record(redis_client, key, data, sets=(), sorted_sets=None, claims=None, requires=()):
+    if requires and cluster.enabled() and not all(redis_client.exists(required) for required in requires):
+        return RECORD_REQUIREMENT_MISSING
+    keys, args = create_arguments(key, data, sets, sorted_sets, claims, requires)
+    return _create_record(keys=keys, args=args, client=redis_client)
+
+
+def create_arguments(key, data, sets=(), sorted_sets=None, claims=None, requires=()):
+    requires = [] if cluster.enabled() else list(requires)
+    sets = [member_key(name, key) for name in sets]
+    sorted_sets = {member_key(name, key): score for name, score in (sorted_sets or {}).items()}
+    claims = claims or {}
+    keys = [key, *sets, *sorted_sets, *claims, *requires]
+    args = [len(sets), len(sorted_sets), len(claims), len(requires), *sorted_sets.values()]
+    for field, claim_value in claims.values():
+        args.extend([field, claim_value])
+    for field, value in encode_fields(data).items():
+        args.extend([field, value])
+    return keys, args
+
+
+# Resultados de merge_record
+MERGE_OK = 0
+MERGE_NOT_FOUND = 1
+MERGE_REQUIREMENT_MISSING = 2
+
+# Converte um registro legado (string JSON) para hash, campo a campo, com os valores em JSON
+# puro (lidos como valores sem byte de versão). Tabelas vazias voltam a ser listas ("[]"),
+# já que o cjson não distingue lista vazia de objeto vazio e os registros não têm campos do
+# tipo objeto.
+TO_HASH_LUA = """
+local function to_hash(key)
+    if redis.call('TYPE', key)['ok'] ~= 'string' then
+        return 0
+    end
+    local document = cjson.decode(redis.call('GET', key))
+    redis.call('DEL', key)
+    for field, value in pairs(document) do
+        if type(value) == 'table' and next(value) == nil then
+            redis.call('HSET', key, field, '[]')
+        else
+            redis.call('HSET', key, field, cjson.encode(value))
+        end
+    end
+    return 1
+end
+"""
+
+_convert_to_hash = _scripts.register_script(TO_HASH_LUA + "return to_hash(KEYS[1])")
+
+
+# Migra um registro legado para hash (não faz nada se ele já for um hash).
+# Retorna 1 se o registro foi convertido.
+def convert_to_hash(redis_client, key):
+    return _convert_to_hash(keys=[key], client=redis_client)
+
+
+# Decodificação de um valor no Lua, espelhando decode_value: byte 1 = JSON, byte 2 = msgpack,
+# sem byte de versão = JSON puro
+DECODE_VALUE_LUA = """
+local function decode_value(value)
+    local tag = string.byte(value, 1)
+    if tag == 1 then
+        return cjson.decode(string.sub(value, 2))
+    elseif tag == 2 then
+        return cmsgpack.unpack(string.sub(value, 2))
+    end
+    return cjson.decode(value)
+end
+"""
+
+
+# Atualização parcial feita no próprio Redis, num único round trip: grava apenas os campos
+# enviados (HSET), move o registro nos índices dos campos cujo valor mudou e devolve o
+# registro atualizado. Registros legados são convertidos para hash antes.
+# As chaves dos índices dependem dos valores gravados e são montadas no script (prefixo ..
+# valor), fora de KEYS; ver index_prefix_keys para a garantia de que ficam no slot do registro.
+# KEYS = [registro, chaves que precisam existir..., sorted sets...]
+# ARGV = [{campo: prefixo do índice} (JSON), nº de chaves exigidas, nº de sorted sets, scores...,
+#         (campo, valor) alterados...]
+MERGE_RECORD_SCRIPT = TO_HASH_LUA + DECODE_VALUE_LUA + """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {1}
+end
+local n_requires, n_zsets = tonumber(ARGV[2]), tonumber(ARGV[3])
+for i = 1, n_requires do
+    if redis.call('EXISTS', KEYS[1 + i]) == 0 then
+        return {2}
+    end
+end
+to_hash(KEYS[1])
+local indexes = cjson.decode(ARGV[1])
+for i = 4 + n_zsets, #ARGV, 2 do
+    local field, value = ARGV[i], ARGV[i + 1]
+    local prefix = indexes[field]
+    if prefix then
+        local old = redis.call('HGET', KEYS[1], field)
+        if old ~= value then
+            if old then
+                old = decode_value(old)
+                if old ~= nil and old ~= cjson.null then
+                    redis.call('SREM', prefix .. tostring(old), KEYS[1])
+                end
+            end
+            local new = decode_value(value)
+            if new ~= nil and new ~= cjson.null then
+                redis.call('SADD', prefix .. tostring(new), KEYS[1])
+            end
+        end
+    end
+    redis.call('HSET', KEYS[1], field, value)
+end
+for i = 1, n_zsets do
+    redis.call('ZADD', KEYS[1 + n_requires + i], ARGV[3 + i], KEYS[1])
+end
+return {0, redis.call('HGETALL', KEYS[1])}
+"""
+
+_merge_record = _scripts.register_script(MERGE_RECORD_SCRIPT)
+
+
+# Aplica uma atualização parcial ao registro no Redis (sem GET + SET pelo Python, evitando
+# atualizações perdidas quando dois clientes editam o mesmo registro).
+# requires: chaves que precisam existir (ex.: equipe atribuída);
+# indexes: {campo: prefixo do set de índice}; sorted_sets: {sorted set: score}.
+# Retorna (MERGE_OK, registro atualizado) ou (MERGE_NOT_FOUND / MERGE_REQUIREMENT_MISSING, None).
+def merge_record(redis_client, key, changes, requires=(), indexes=None, sorted_sets=None):
+    if requires and cluster.enabled():
+        missing = requirement_result(redis_client.exists(key), [redis_client.exists(required) for required in requires])
+        if missing is not None:
+            return missing, None
+    keys, args = merge_arguments(key, changes, requires, indexes, sorted_sets)
+    return merge_result(_merge_record(keys=keys, args=args, client=redis_client))
+
+
+# No cluster as chaves exigidas ficam em outros slots e são conferidas antes do script (sem a
+# atomicidade do script: a equipe pode ser removida entre a conferência e a atualização).
+# Recebe o EXISTS do registro e das chaves exigidas; None se a atualização pode seguir.
+def requirement_result(record_exists, requires_exist):
+    if not record_exists:
+        return MERGE_NOT_FOUND
+    if not all(requires_exist):
+        return MERGE_REQUIREMENT_MISSING
+    return None
+
+
+# Enfileira merge_record num pipeline; a resposta de execute() é convertida com merge_result
+def queue_merge_record(pipe, key, changes, requires=(), indexes=None, sorted_sets=None):
+    keys, args = merge_arguments(key, changes, requires, indexes, sorted_sets)
+    _merge_record(keys=keys, args=args, client=pipe)
+
+
+# No cluster, as chaves exigidas ficam de fora do script (ver requirement_result) e sorted sets
+# e prefixos dos índices viram os do bucket do registro
+def merge_arguments(key, changes, requires=(), indexes=None, sorted_sets=None):
+    requires = [] if cluster.enabled() else list(requires)
+    sorted_sets = {member_key(name, key): score for name, score in (sorted_sets or {}).items()}
+    indexes = index_prefix_keys(indexes, key)
+    keys = [key, *requires, *sorted_sets]
+    args = [json.dumps(indexes), len(requires), len(sorted_sets), *sorted_sets.values()]
+    for field, value in encode_fields(changes).items():
+        args.extend([field, value])
+    return keys, args
+
+
+# Prefixos dos índices ({campo: prefixo}) passados aos scripts de mescla e remoção, que montam
+# as chaves dos sets como prefixo .. valor sem declará-las em KEYS. Fora do cluster há um único
+# nó; no cluster o prefixo leva a hash tag do bucket do registro (member_key), e como a tag
+# decide o slot, toda chave montada a partir dele cai no mesmo slot de KEYS[1]. Um registro sem
+# a tag do layout do cluster quebraria essa garantia e é recusado.
+def index_prefix_keys(indexes, key):
+    if indexes and cluster.enabled() and cluster.key_tag(key) is None:
+        raise ValueError(f"Registro fora do layout do cluster: {key}")
+    return {field: member_key(prefix, key) for field, prefix in (indexes or {}).items()}
+
+
+def merge_result(result):
+    if result[0] != MERGE_OK:
+        return result[0], None
+    flat = result[1]
+    return MERGE_OK, decode_fields(dict(zip(flat[::2], flat[1::2])))
+
+
+# Resultados de delete_record
+DELETE_OK = 0
+DELETE_NOT_FOUND = 1
+
+# Remoção atômica de um registro: apaga o hash e tira a chave da lista da coleção, dos
+# sorted sets e dos índices dos campos indexados (lidos do próprio registro, com as chaves
+# montadas no script como em MERGE_RECORD_SCRIPT).
+# KEYS = [registro, sets..., sorted sets...]
+# ARGV = [{campo: prefixo do índice} (JSON), nº de sets]
+DELETE_RECORD_SCRIPT = TO_HASH_LUA + DECODE_VALUE_LUA + """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 1
+end
+to_hash(KEYS[1])
+for field, prefix in pairs(cjson.decode(ARGV[1])) do
+    local value = redis.call('HGET', KEYS[1], field)
+    if value then
+        value = decode_value(value)
+        if value ~= nil and value ~= cjson.null then
+            redis.call('SREM', prefix .. tostring(value), KEYS[1])
+        end
+    end
+end
+redis.call('DEL', KEYS[1])
+local n_sets = tonumber(ARGV[2])
+for i = 2, #KEYS do
+    if i <= 1 + n_sets then
+        redis.call('SREM', KEYS[i], KEYS[1])
+    else
+        redis.call('ZREM', KEYS[i], KEYS[1])
+    end
+end
+return 0
+"""
+
+_delete_record = _scripts.register_script(DELETE_RECORD_SCRIPT)
+
+
+# Remove o registro e as suas entradas na lista, nos sorted sets e nos índices
+# (indexes: {campo: prefixo do set de índice}). Retorna DELETE_OK ou DELETE_NOT_FOUND.
+def delete_record(redis_client, key, sets=(), sorted_sets=(), indexes=None):
+    keys, args = delete_arguments(key, sets, sorted_sets, indexes)
+    return _delete_record(keys=keys, args=args, client=redis_client)
+
+
+def delete_arguments(key, sets=(), sorted_sets=(), indexes=None):
+    sets = [member_key(name, key) for name in sets]
+    sorted_sets = [member_key(name, key) for name in sorted_sets]
+    indexes = index_prefix_keys(indexes, key)
+    return [key, *sets, *sorted_sets], [json.dumps(indexes), len(sets)]
+
+
+# No cluster um pipeline não recarrega scripts ausentes (NOSCRIPT) como o cliente faz, então
+# os scripts são carregados em todos os primários no startup e a cada retentativa dos lotes
+def load_scripts(redis_client):
+    for script in (_create_record, _merge_record, _delete_record):
+        redis_client.script_load(script.script)
@@ -0,0 +1,212 @@
+# Leituras das rotas GET nas réplicas do Redis; escritas no primário.
+#
+# Com Config.REDIS_REPLICAS definido ("host:porta,host:porta"), cada worker abre um pool
+# assíncrono por réplica no startup e a dependência get_read_client entrega às rotas GET um
+# cliente de réplica, escolhida em rodízio ("round_robin") ou pela menor latência medida
+# ("least_latency"), conforme Config.REDIS_READ_STRATEGY. As rotas de escrita continuam com
+# async_pool.get_redis_client (primário). Sem réplicas configuradas, tudo vai para o primário.
+#
+# Uma tarefa de fundo consulta INFO replication em cada réplica a cada
+# Config.REDIS_REPLICA_CHECK_INTERVAL segundos: réplicas que não respondem ou com o link com o
+# primário caído saem do rodízio até voltarem, e sem nenhuma réplica saudável as leituras vão
+# para o primário. O estado fica em GET /redis/replicas.
+#
+# Ler as próprias escritas: cada escrita bem-sucedida (POST/PUT/PATCH/DELETE) devolve o cookie
+# e o cabeçalho X-Read-Your-Writes com o instante (epoch em segundos) até o qual o cliente lê
+# do primário, Config.REDIS_READ_YOUR_WRITES_WINDOW segundos depois da escrita. Um GET com o
+# cookie ou o cabeçalho dentro da janela é atendido pelo primário e vê a escrita mesmo com as
+# réplicas atrasadas.
+import asyncio
+import time
+
+import redis
+import redis.asyncio
+from fastapi import APIRouter, Depends, FastAPI, Request
+
+from app.logging.logger import AppLogger
+from app.redis_setting.async_pool import ReplicaClient, get_redis_client
+from app.redis_setting.connection_pool import create_async_pool, parse_addresses, pool_stats
+from config import Config
+
+logger = AppLogger().get_logger()
+router = APIRouter()
+
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+READ_YOUR_WRITES_COOKIE = "read_your_writes"
+WRITE_METHODS = frozenset(("POST", "PUT", "PATCH", "DELETE"))
+# Peso da última medição na média móvel da latência
+LATENCY_SMOOTHING = 0.3
+
+
+class Replica:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.pool = None
+        self.healthy = False
+        self.latency = None
+        self.reads = 0
+        self.failures = 0
+        self.last_error = None
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+    def record_check(self, latency, link_up):
+        self.latency = latency if self.latency is None else (
+            LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.latency
+        )
+        if link_up != self.healthy:
+            logger.info(f"Réplica {self.address} {'de volta ao' if link_up else 'fora do'} rodízio de leituras")
+        self.healthy = link_up
+        self.last_error = None if link_up else "link com o primário caído"
+
+    def record_failure(self, error):
+        if self.healthy:
+            logger.error(f"Réplica {self.address} fora do rodízio de leituras: {error}")
+        self.healthy = False
+        self.failures += 1
+        self.last_error = error
+
+    def stats(self):
+        return {
+            "address": self.address,
+            "healthy": self.healthy,
+            "latency_ms": round(self.latency * 1000, 3) if self.latency is not None else None,
+            "reads": self.reads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "pool": pool_stats(self.pool) if self.pool is not None else None,
+        }
+
+
+class ReplicaSelector:
+    def __init__(self, replicas, strategy="round_robin"):
+        if strategy not in ("round_robin", "least_latency"):
+            raise ValueError(f"Estratégia de leitura desconhecida: {strategy}")
+        self.replicas = replicas
+        self.strategy = strategy
+        self._next = 0
+
+    # Réplica saudável para a próxima leitura, ou None se nenhuma estiver disponível
+    def choose(self):
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        if self.strategy == "least_latency":
+            return min(healthy, key=lambda replica: replica.latency or 0.0)
+        replica = healthy[self._next % len(healthy)]
+        self._next += 1
+        return replica
+
+
+selector = None
+_checker = None
+
+
+async def check_replica(replica):
+    client = redis.asyncio.Redis(connection_pool=replica.pool)
+    start = time.perf_counter()
+    try:
+        info = await client.info("replication")
+    except (redis.RedisError, OSError) as e:
+        replica.record_failure(str(e))
+        return
+    replica.record_check(time.perf_counter() - start, info.get("role") == "slave" and info.get("master_link_status") == "up")
+
+
+async def _check_replicas_forever():
+    while True:
+        await asyncio.sleep(Config.REDIS_REPLICA_CHECK_INTERVAL)
+        await asyncio.gather(*(check_replica(replica) for replica in selector.replicas))
+
+
+async def start_replicas():
+    global selector, _checker
+    addresses = parse_addresses(Config.REDIS_REPLICAS)
+    if not addresses:
+        return
+    if Config.REDIS_CLUSTER:
+        logger.warning("REDIS_REPLICAS é ignorado no modo cluster (use REDIS_CLUSTER_READ_FROM_REPLICAS)")
+        return
+    replicas = [Replica(host, port) for host, port in addresses]
+    for replica in replicas:
+        replica.pool = create_async_pool(replica.host, replica.port)
+    selector = ReplicaSelector(replicas, Config.REDIS_READ_STRATEGY)
+    await asyncio.gather(*(check_replica(replica) for replica in replicas))
+    _checker = asyncio.get_running_loop().create_task(_check_replicas_forever())
+    logger.info(f"Leituras distribuídas entre as réplicas {', '.join(r.address for r in replicas)} ({selector.strategy})")
+
+
+async def stop_replicas():
+    global selector, _checker
+    if _checker is not None:
+        _checker.cancel()
+    if selector is not None:
+        for replica in selector.replicas:
+            await replica.pool.disconnect()
+    selector, _checker = None, None
+
+
+# O cliente escreveu há menos de REDIS_READ_YOUR_WRITES_WINDOW segundos (cookie ou cabeçalho)
+def reads_own_writes(request):
+    if not Config.REDIS_READ_YOUR_WRITES:
+        return False
+    value = request.headers.get(READ_YOUR_WRITES_HEADER) or request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    try:
+        return value is not None and float(value) > time.time()
+    except ValueError:
+        return False
+
+
+# Dependência das rotas GET: cliente de uma réplica, ou do primário quando não há réplica
+# saudável ou o cliente precisa ler as próprias escritas
+async def get_read_client(request: Request, primary: redis.asyncio.Redis = Depends(get_redis_client)):
+    if selector is None or reads_own_writes(request):
+        return primary
+    replica = selector.choose()
+    if replica is None:
+        return primary
+    replica.reads += 1
+    return ReplicaClient(primary, connection_pool=replica.pool)
+
+
+# Middleware ASGI: marca as respostas das escritas bem-sucedidas com a janela de leitura no primário
+class ReadYourWritesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS or selector is None \
+                or not Config.REDIS_READ_YOUR_WRITES:
+            return await self.app(scope, receive, send)
+
+        async def send_with_window(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                window = Config.REDIS_READ_YOUR_WRITES_WINDOW
+                until = f"{time.time() + window:.3f}"
+                cookie = f"{READ_YOUR_WRITES_COOKIE}={until}; Max-Age={max(1, round(window))}; Path=/; HttpOnly; SameSite=lax"
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (READ_YOUR_WRITES_HEADER.lower().encode(), until.encode()),
+                    (b"set-cookie", cookie.encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_window)
+
+
+# Estado das réplicas deste worker: saúde, latência média, leituras atendidas e pool
+@router.get("/redis/replicas", tags=["Redis"])
+def get_replicas_stats():
+    if selector is None:
+        return {"strategy": None, "replicas": []}
+    return {"strategy": selector.strategy, "replicas": [replica.stats() for replica in selector.replicas]}
+
+
+def configure(app: FastAPI):
+    app.include_router(router)
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.add_event_handler("startup", start_replicas)
+    app.add_event_handler("shutdown", stop_replicas)
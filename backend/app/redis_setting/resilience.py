@@ -0,0 +1,315 @@
+# Retentativas limitadas pelo tempo da requisição e circuit breaker para o Redis.
+#
+# Todas as conexões (pools síncrono e assíncrono, réplicas e cluster) usam o Retry deste
+# módulo, então as regras valem para qualquer comando dos controllers, inclusive pipelines e
+# scripts:
+#
+# - Orçamento por requisição: o middleware RequestBudgetMiddleware marca o prazo de cada
+#   requisição (Config.REDIS_REQUEST_BUDGET segundos). Uma retentativa só é feita se a espera
+#   couber no prazo, e nas rotas assíncronas cada tentativa é interrompida quando o prazo acaba.
+#   O prazo vale até o início da resposta; o corpo de uma resposta em streaming (NDJSON, backup)
+#   fica limitado apenas pelos timeouts de socket.
+# - Retentativas com jitter: até Config.REDIS_RETRY_ATTEMPTS, com espera aleatória entre metade
+#   e o total do backoff exponencial (base/teto de REDIS_RETRY_BACKOFF_*), para que os workers
+#   não repitam em sincronia depois de uma queda.
+# - Circuit breaker por servidor: depois de Config.REDIS_BREAKER_FAILURES chamadas seguidas
+#   com falha de conexão ou timeout (já esgotadas as retentativas), o circuito abre e as
+#   chamadas falham na hora por Config.REDIS_BREAKER_RESET_TIMEOUT segundos. Depois disso uma
+#   única chamada de teste passa (meio aberto): sucesso fecha o circuito, falha o reabre.
+#
+# Falhas de conexão, timeouts e circuito aberto viram 503 com Retry-After (ver configure).
+# Estado dos circuitos em GET /redis/pool/stats.
+import asyncio
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from time import sleep
+
+import redis
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+from redis.backoff import EqualJitterBackoff
+from redis.retry import Retry
+from redis.asyncio.retry import Retry as AsyncRetry
+
+from app.logging.logger import AppLogger
+from config import Config
+
+try:
+    from asyncio import timeout as async_timeout
+except ImportError:
+    from async_timeout import timeout as async_timeout
+
+logger = AppLogger().get_logger()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(redis.RedisError):
+    def __init__(self, breaker):
+        super().__init__(f"Circuito do Redis {breaker.name} aberto")
+        self.retry_after = breaker.retry_after()
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=None, reset_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or Config.REDIS_BREAKER_FAILURES
+        self.reset_timeout = reset_timeout if reset_timeout is not None else Config.REDIS_BREAKER_RESET_TIMEOUT
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.rejected = 0
+        self.retries = 0
+        self.budget_exhausted = 0
+
+    # Cada conexão recebe uma cópia do Retry; o circuito continua compartilhado
+    def __deepcopy__(self, memo):
+        return self
+
+    # Antes de cada chamada: recusa com CircuitOpenError se o circuito estiver aberto.
+    # No meio aberto passa uma chamada de teste por vez (outra, se a anterior não terminou
+    # dentro de reset_timeout, ex.: cancelada).
+    def before_call(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+                self.state, self._probing = HALF_OPEN, False
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and (not self._probing or now - self._probe_started >= self.reset_timeout):
+                self._probing, self._probe_started = True, now
+                return
+            self.rejected += 1
+        raise CircuitOpenError(self)
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Circuito do Redis {self.name} fechado")
+            self.state, self.failures, self._probing = CLOSED, 0, False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                logger.error(f"Circuito do Redis {self.name} aberto após {self.failures} falhas seguidas")
+                self.state, self.opened_at, self._probing = OPEN, time.monotonic(), False
+                self.opened += 1
+
+    # Segundos até a próxima chamada de teste (cabeçalho Retry-After)
+    def retry_after(self):
+        if self.state != OPEN:
+            return 0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "budget_exhausted": self.budget_exhausted,
+            "retry_after": round(self.retry_after(), 3),
+        }
+
+
+# Um circuito por servidor ("host:porta" ou "cluster"), compartilhado pelos pools do worker
+breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(name):
+    with _breakers_lock:
+        if name not in breakers:
+            breakers[name] = CircuitBreaker(name)
+        return breakers[name]
+
+
+# Prazo (time.monotonic) da requisição em andamento; None fora das requisições (linha de comando)
+_deadline = contextvars.ContextVar("redis_request_deadline", default=None)
+
+
+def remaining_budget():
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+# Trechos longos de uma requisição que não seguem o orçamento (ex.: restauração de backup)
+@contextmanager
+def no_request_budget():
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+# Antes da primeira tentativa: orçamento já gasto (sem culpa do Redis, não conta no circuito)
+# ou circuito aberto encerram a chamada na hora
+def _start_call(breaker):
+    remaining = remaining_budget()
+    if remaining is not None and remaining <= 0:
+        breaker.budget_exhausted += 1
+        raise redis.TimeoutError("Orçamento de tempo da requisição esgotado")
+    breaker.before_call()
+
+
+def retry_backoff():
+    return EqualJitterBackoff(cap=Config.REDIS_RETRY_BACKOFF_CAP, base=Config.REDIS_RETRY_BACKOFF_BASE)
+
+
+# Espera antes da retentativa, ou None se ela não couber no orçamento da requisição
+def _next_backoff(retry, breaker, failures):
+    if failures > retry._retries:
+        return None
+    backoff = retry._backoff.compute(failures)
+    remaining = remaining_budget()
+    if remaining is not None and backoff >= remaining:
+        breaker.budget_exhausted += 1
+        return None
+    breaker.retries += 1
+    return backoff
+
+
+# Erros que contam como falha do servidor: os do redis-py e, na abertura da conexão (que o
+# redis-py só converte depois do Retry), os de socket
+def _failure_errors(retry):
+    return (*retry._supported_errors, OSError)
+
+
+class DeadlineRetry(Retry):
+    __slots__ = ("breaker",)
+
+    def __init__(self, breaker, retries=None):
+        super().__init__(retry_backoff(), Config.REDIS_RETRY_ATTEMPTS if retries is None else retries)
+        self.breaker = breaker
+
+    def call_with_retry(self, do, fail):
+        _start_call(self.breaker)
+        failures = 0
+        while True:
+            try:
+                result = do()
+            except _failure_errors(self) as error:
+                failures += 1
+                fail(error)
+                backoff = _next_backoff(self, self.breaker, failures)
+                if backoff is None:
+                    self.breaker.record_failure()
+                    raise error
+                sleep(backoff)
+            except redis.ResponseError:
+                # O servidor respondeu: a conexão está saudável
+                self.breaker.record_success()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+
+class AsyncDeadlineRetry(AsyncRetry):
+    __slots__ = ("breaker",)
+
+    def __init__(self, breaker, retries=None):
+        super().__init__(retry_backoff(), Config.REDIS_RETRY_ATTEMPTS if retries is None else retries)
+        self.breaker = breaker
+
+    async def call_with_retry(self, do, fail):
+        _start_call(self.breaker)
+        failures = 0
+        while True:
+            try:
+                result = await _within_budget(do)
+            except _failure_errors(self) as error:
+                failures += 1
+                await fail(error)
+                backoff = _next_backoff(self, self.breaker, failures)
+                if backoff is None:
+                    self.breaker.record_failure()
+                    raise error
+                await asyncio.sleep(backoff)
+            except redis.ResponseError:
+                self.breaker.record_success()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+
+# Tentativa interrompida no fim do orçamento (a conexão interrompida é descartada pelo redis-py)
+async def _within_budget(do):
+    remaining = remaining_budget()
+    if remaining is None:
+        return await do()
+    try:
+        async with async_timeout(max(remaining, 0)):
+            return await do()
+    except asyncio.TimeoutError:
+        if remaining_budget() > 0:
+            raise
+        raise redis.TimeoutError("Orçamento de tempo da requisição esgotado")
+
+
+# Middleware ASGI: prazo das chamadas ao Redis de cada requisição, até o início da resposta
+class RequestBudgetMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not Config.REDIS_REQUEST_BUDGET:
+            return await self.app(scope, receive, send)
+
+        async def send_without_budget(message):
+            if message["type"] == "http.response.start":
+                _deadline.set(None)
+            await send(message)
+
+        token = _deadline.set(time.monotonic() + Config.REDIS_REQUEST_BUDGET)
+        try:
+            await self.app(scope, receive, send_without_budget)
+        finally:
+            _deadline.reset(token)
+
+
+def _unavailable(detail, retry_after):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return _unavailable("Redis indisponível no momento. Tente novamente em instantes.", exc.retry_after)
+
+
+# Ao abrir uma conexão, o redis-py embrulha o CircuitOpenError num ConnectionError
+def _circuit_error(exc):
+    while exc is not None and not isinstance(exc, CircuitOpenError):
+        exc = exc.__cause__
+    return exc
+
+
+async def redis_unavailable_handler(request: Request, exc: redis.RedisError):
+    circuit_error = _circuit_error(exc)
+    if circuit_error is not None:
+        return await circuit_open_handler(request, circuit_error)
+    logger.error(f"Erro ao conectar ao Redis em {request.url.path}: {str(exc)}")
+    return _unavailable(f"Erro ao conectar ao Redis: {str(exc)}", Config.REDIS_RETRY_BACKOFF_CAP)
+
+
+def configure(app: FastAPI):
+    app.add_middleware(RequestBudgetMiddleware)
+    app.add_exception_handler(CircuitOpenError, circuit_open_handler)
+    app.add_exception_handler(redis.ConnectionError, redis_unavailable_handler)
+    app.add_exception_handler(redis.TimeoutError, redis_unavailable_handler)
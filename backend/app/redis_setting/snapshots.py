@@ -0,0 +1,86 @@
+# Snapshots pré-serializados das listagens completas (sem filtros, cursor ou streaming).
+#
+# O corpo JSON da listagem fica no hash "snapshot:<coleção>" junto com o ETag da versão da
+# coleção em que foi gerado (ver versions.py), comprimido com gzip quando passa de
+# Config.SNAPSHOT_MIN_COMPRESS_BYTES. Depois de uma escrita a versão muda e o próximo GET
+# regenera o snapshot; os demais servem os bytes prontos, sem decodificar os registros nem
+# validar os schemas. Cada worker também guarda o último snapshot no cache local.
+import gzip
+from typing import NamedTuple, Optional
+
+from fastapi import Response
+
+from app.redis_setting.async_pool import primary_client
+from app.redis_setting.local_cache import cache, cached_async
+from app.redis_setting.trusted_reads import dumps_json
+from app.redis_setting.versions import ETAG_HEADER
+from config import Config
+
+SNAPSHOT_PREFIX = "snapshot"
+
+
+class Snapshot(NamedTuple):
+    etag: str
+    body: bytes
+    encoding: Optional[str]
+
+
+def _text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def snapshot_key(list_name):
+    return f"{SNAPSHOT_PREFIX}:{list_name}"
+
+
+# Mesmo JSON que o FastAPI geraria para a lista de schemas (JSONResponse)
+def serialize(items):
+    return dumps_json(list(items))
+
+
+# Snapshot da coleção na versão etag: lido do Redis ou, se estiver desatualizado, gerado com
+# build() (iterável assíncrono de schemas) e gravado no primário, mesmo quando lido de uma
+# réplica. O ETag foi lido antes dos registros, então um snapshot nunca fica marcado com uma
+# versão mais nova que o seu conteúdo.
+async def load_snapshot_async(redis_client, list_name, etag, build):
+    key = snapshot_key(list_name)
+    stored_etag, body, encoding = await redis_client.hmget(key, ["etag", "body", "encoding"])
+    if stored_etag is not None and _text(stored_etag) == etag:
+        return Snapshot(etag, body, _text(encoding) or None)
+
+    body, encoding = compress_snapshot(serialize([item async for item in build()]))
+    await primary_client(redis_client).hset(key, mapping={"etag": etag, "body": body, "encoding": encoding or ""})
+    return Snapshot(etag, body, encoding)
+
+
+def compress_snapshot(body):
+    if Config.SNAPSHOT_COMPRESSION and len(body) >= Config.SNAPSHOT_MIN_COMPRESS_BYTES:
+        return gzip.compress(body, compresslevel=Config.SNAPSHOT_COMPRESSION_LEVEL), "gzip"
+    return body, None
+
+
+def accepts_gzip(accept_encoding):
+    return bool(accept_encoding) and "gzip" in accept_encoding.lower()
+
+
+def snapshot_response(snapshot, accept_encoding=None):
+    body, headers = snapshot.body, {ETAG_HEADER: snapshot.etag, "Vary": "Accept-Encoding"}
+    if snapshot.encoding == "gzip":
+        if accepts_gzip(accept_encoding):
+            headers["Content-Encoding"] = "gzip"
+        else:
+            body = gzip.decompress(body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Resposta da listagem completa a partir do snapshot (cache do worker, depois Redis)
+async def collection_snapshot_response_async(redis_client, list_name, etag, build, accept_encoding=None):
+    def load():
+        return load_snapshot_async(redis_client, list_name, etag, build)
+
+    snapshot = await cached_async(list_name, load)
+    if snapshot.etag != etag:
+        # Cópia do worker desatualizada (a invalidação ainda não chegou)
+        cache.invalidate(list_name)
+        snapshot = await cached_async(list_name, load)
+    return snapshot_response(snapshot, accept_encoding)
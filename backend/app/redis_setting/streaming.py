@@ -0,0 +1,28 @@
+from fastapi.responses import StreamingResponse
+from app.redis_setting.redis_pool import chunked
+from app.redis_setting.async_pool import chunked as async_chunked
+from app.redis_setting.trusted_reads import dumps_json
+from config import Config
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+# Verifica se o cliente pediu a listagem em NDJSON pelo cabeçalho Accept
+def wants_ndjson(accept):
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+
+# Envia um objeto por linha à medida que os registros são lidos do Redis,
+# agrupando as linhas em blocos para não gerar uma escrita por registro.
+# items pode ser um iterável assíncrono (rotas que leem pelo redis.asyncio).
+def ndjson_response(items, headers=None):
+    if hasattr(items, "__aiter__"):
+        async def lines():
+            async for batch in async_chunked(items, Config.REDIS_BULK_CHUNK_SIZE):
+                yield b"".join(dumps_json(item) + b"\n" for item in batch)
+    else:
+        def lines():
+            for batch in chunked(items, Config.REDIS_BULK_CHUNK_SIZE):
+                yield b"".join(dumps_json(item) + b"\n" for item in batch)
+
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,78 @@
+# Leitura confiável dos registros nas rotas GET de listagem.
+#
+# Os registros foram validados pelo schema de criação antes de gravados, então reconstruir um
+# modelo Pydantic para cada um (e validá-lo de novo no response_model) só gasta CPU. Com
+# Config.TRUSTED_READS o registro é apenas conferido (campos obrigatórios presentes e não
+# nulos), projetado nos campos do schema de resposta e serializado direto para JSON, com
+# orjson quando instalado. O formato de cada schema é calculado uma única vez.
+import json
+from functools import lru_cache
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from config import Config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class RecordShape:
+    def __init__(self, schema):
+        self.schema = schema
+        self.fields = tuple(schema.__fields__)
+        self.required = tuple(name for name, field in schema.__fields__.items() if field.required)
+
+    # Registro com os campos do schema, sem validar os tipos
+    def project(self, data):
+        missing = [name for name in self.required if data.get(name) is None]
+        if missing:
+            raise ValueError(f"{self.schema.__name__}: campos obrigatórios ausentes {missing}")
+        return {name: data.get(name) for name in self.fields}
+
+
+@lru_cache(maxsize=None)
+def record_shape(schema):
+    return RecordShape(schema)
+
+
+# Registro lido do Redis pronto para a resposta: dict conferido (leitura confiável) ou modelo validado
+def read_record(schema, data):
+    if Config.TRUSTED_READS:
+        return record_shape(schema).project(data)
+    return schema(**data)
+
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.dict()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+# JSON compacto (bytes) de dicts ou modelos, no mesmo formato da JSONResponse
+def dumps_json(value):
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(
+        jsonable_encoder(value),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class TrustedJSONResponse(JSONResponse):
+    def render(self, content):
+        return dumps_json(content)
+
+
+# Resposta da listagem: na leitura confiável os itens são enviados direto, sem o response_model
+# (os cabeçalhos já gravados na resposta, como ETag e X-Next-Cursor, são mantidos)
+def list_response(items, response):
+    if not Config.TRUSTED_READS:
+        return list(items)
+    return TrustedJSONResponse(list(items), headers=response.headers)
@@ -0,0 +1,74 @@
+# Versões das coleções e dos registros, usadas como ETag nas rotas GET.
+#
+# O hash "versions" guarda um contador por coleção ("machines_list", ...) e por registro
+# ("machine:<serial>", ...), incrementado depois de cada escrita, e uma época aleatória
+# recriada se o hash for perdido, para que ETags antigos não voltem a coincidir.
+# A rota lê a versão antes dos dados: uma escrita entre as duas leituras só faz o cliente
+# receber o conteúdo novo com o ETag antigo, e a próxima requisição traz o conteúdo de novo.
+import uuid
+
+from fastapi import Response, status
+
+from app.redis_setting.async_pool import primary_client
+
+VERSIONS_KEY = "versions"
+EPOCH_FIELD = "_epoch"
+ETAG_HEADER = "ETag"
+
+
+def _text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+# Incrementa as versões das coleções/registros alterados (um round trip)
+def bump_versions(redis_client, *names):
+    pipe = redis_client.pipeline(transaction=False)
+    for name in names:
+        pipe.hincrby(VERSIONS_KEY, name, 1)
+    pipe.execute()
+
+
+def current_etag(redis_client, name):
+    epoch, version = redis_client.hmget(VERSIONS_KEY, [EPOCH_FIELD, name])
+    if epoch is None:
+        redis_client.hsetnx(VERSIONS_KEY, EPOCH_FIELD, uuid.uuid4().hex)
+        epoch = redis_client.hget(VERSIONS_KEY, EPOCH_FIELD)
+    return f'"{_text(epoch)}.{int(version or 0)}"'
+
+
+# Versões das rotas assíncronas (cliente do redis.asyncio)
+async def bump_versions_async(redis_client, *names):
+    pipe = redis_client.pipeline(transaction=False)
+    for name in names:
+        pipe.hincrby(VERSIONS_KEY, name, 1)
+    await pipe.execute()
+
+
+# Numa réplica, a época ausente é criada (e relida) no primário
+async def current_etag_async(redis_client, name):
+    epoch, version = await redis_client.hmget(VERSIONS_KEY, [EPOCH_FIELD, name])
+    if epoch is None:
+        primary = primary_client(redis_client)
+        await primary.hsetnx(VERSIONS_KEY, EPOCH_FIELD, uuid.uuid4().hex)
+        epoch = await primary.hget(VERSIONS_KEY, EPOCH_FIELD)
+    return f'"{_text(epoch)}.{int(version or 0)}"'
+
+
+# Troca a época: todos os ETags emitidos deixam de valer (ex.: depois de restaurar um backup)
+def reset_versions(redis_client):
+    redis_client.hset(VERSIONS_KEY, EPOCH_FIELD, uuid.uuid4().hex)
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+# Resposta 304 quando o ETag do cliente ainda vale; senão grava o ETag na resposta e devolve None
+def not_modified_response(response, if_none_match, etag):
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={ETAG_HEADER: etag})
+    response.headers[ETAG_HEADER] = etag
+    return None
@@ -3,7 +3,11 @@ from fastapi import (
     HTTPException,
     status,
     Depends,
-    FastAPI
+    FastAPI,
+    Query,
+    Response,
+    Header,
+    Body,
 )
 from app.logging.logger import AppLogger
 from .models.schemas import (
@@ -11,19 +15,47 @@ from .models.schemas import (
     DeleteTeamsSchema,
     GetAllTeamsSchema,
     GetTeamsSchema,
-    UpdateTeamsSchema
+    UpdateTeamsSchema,
+    BulkUpdateTeamsSchema,
+)
+from app.redis_setting.async_pool import (
+    get_redis_client,
+    fetch_collection,
+    fetch_collection_paginated,
+    create_record,
+    merge_record,
+    delete_record,
+)
+from app.redis_setting.redis_pool import RECORD_EXISTS, MERGE_NOT_FOUND, DELETE_NOT_FOUND
+from app.redis_setting.replicas import get_read_client
+from app.redis_setting.cluster import logical_key, record_key
+from app.redis_setting.streaming import wants_ndjson, ndjson_response
+from app.redis_setting.local_cache import cached_async, invalidate_async
+from app.redis_setting.versions import bump_versions_async, current_etag_async, not_modified_response
+from app.redis_setting.snapshots import collection_snapshot_response_async
+from app.redis_setting.trusted_reads import read_record, list_response
+from app.redis_setting.bulk import (
+    BulkItem,
+    BulkResultSchema,
+    bulk_create_async,
+    bulk_update_async,
+    bulk_delete_async,
+    notify_bulk_changes_async,
 )
-from app.redis_setting.redis_pool import get_redis_client
 import redis
+import redis.asyncio
 from redis import *
-import json
 from typing import (
-    List
+    List,
+    Optional
 )
+from app.users.controller import require_user
+from config import Config
 
 logger = AppLogger().get_logger()
 
-router = APIRouter()
+# Todas as rotas exigem um usuário autenticado (ver Config.AUTH_REQUIRED)
+router = APIRouter(dependencies=[Depends(require_user)])
 
 
 # Endpoint para registrar uma nova equipe de manutenção
@@ -33,67 +65,144 @@ router = APIRouter()
     response_model=GetTeamsSchema,
     status_code=status.HTTP_201_CREATED
 )
-def register_teams_on_maintenance(
+async def register_teams_on_maintenance(
     register_teams_on_maintenance: CreateTeamsSchema,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
 ) -> GetTeamsSchema:
     logger.info("Registrando nova equipe de manutenção")
-    team_id = f"team:{register_teams_on_maintenance.name}"
+    team_id = record_key("team", register_teams_on_maintenance.name)
 
-    try:
-        # Verificando se a equipe já existe
-        if redis_client.exists(team_id):
-            raise HTTPException(status_code=400, detail="Equipe já registrada.")
+    # Salvando os dados da equipe, se ela ainda não existir (verificação e gravação atômicas);
+    # o team_id público não leva a hash tag do cluster
+    team_data = register_teams_on_maintenance.dict()
+    team_data['team_id'] = logical_key(team_id)
+    if await create_record(redis_client, team_id, team_data, sets=["teams_list"]) == RECORD_EXISTS:
+        raise HTTPException(status_code=400, detail="Equipe já registrada.")
+    await invalidate_async(redis_client, team_id, "teams_list")
+    await bump_versions_async(redis_client, team_id, "teams_list")
 
-        # Salvando os dados da equipe
-        team_data = register_teams_on_maintenance.dict()
-        team_data['team_id'] = team_id
-        team_data_json = json.dumps(team_data)
-        redis_client.set(team_id, team_data_json)
-        redis_client.sadd("teams_list", team_id)
+    return GetTeamsSchema(team_id=logical_key(team_id))
 
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
 
-    return GetTeamsSchema(team_id=team_id)
+# Endpoints em lote: o lote inteiro é validado e gravado em pipelines, com um resultado por
+# item. Declarados antes das rotas /teams/{team_name}.
+@router.post(
+    "/teams/bulk",
+    tags=["Teams Manager"],
+    response_model=BulkResultSchema
+)
+async def register_teams_bulk(
+    teams_create: List[CreateTeamsSchema] = Body(..., min_items=1, max_items=Config.BULK_MAX_ITEMS),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+) -> BulkResultSchema:
+    logger.info(f"Registrando {len(teams_create)} equipes de manutenção em lote")
+    items = []
+    for team in teams_create:
+        team_id = record_key("team", team.name)
+        team_data = team.dict()
+        team_data['team_id'] = logical_key(team_id)
+        items.append(BulkItem(team.name, team_id, team_data, {"sets": ["teams_list"]}))
 
+    result, changed = await bulk_create_async(redis_client, items, "Equipe já registrada.")
+    await notify_bulk_changes_async(redis_client, changed, "teams_list")
 
+    return result
 
-# Endpoint para obter todas as equipes registradas
 
-@router.get(
-    "/teams",
+@router.put(
+    "/teams/bulk",
     tags=["Teams Manager"],
-    response_model=List[GetAllTeamsSchema]
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=BulkResultSchema
 )
-def get_teams(
-    redis_client: redis.Redis = Depends(get_redis_client)
-) -> List[GetAllTeamsSchema]:
-    logger.info("Obtendo todas as equipes de manutenção")
+async def update_teams_bulk(
+    teams_update: List[BulkUpdateTeamsSchema] = Body(..., min_items=1, max_items=Config.BULK_MAX_ITEMS),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+) -> BulkResultSchema:
+    logger.info(f"Atualizando {len(teams_update)} equipes em lote")
+    items = [
+        BulkItem(team.name, record_key("team", team.name), team.dict(exclude_unset=True, exclude={"name"}))
+        for team in teams_update
+    ]
 
-    try:
-        team_keys = redis_client.smembers("teams_list")
-        teams_list = []
+    result, changed = await bulk_update_async(redis_client, items, "Equipe não encontrada")
+    await notify_bulk_changes_async(redis_client, changed, "teams_list")
+
+    return result
+
+
+@router.delete(
+    "/teams/bulk",
+    tags=["Teams Manager"],
+    response_model=BulkResultSchema
+)
+async def delete_teams_bulk(
+    team_names: List[str] = Body(..., min_items=1, max_items=Config.BULK_MAX_ITEMS),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+) -> BulkResultSchema:
+    logger.info(f"Removendo {len(team_names)} equipes em lote")
+    items = [BulkItem(name, record_key("team", name), options={"sets": ["teams_list"]}) for name in team_names]
+
+    result, changed = await bulk_delete_async(redis_client, items, "Equipe não encontrada")
+    await notify_bulk_changes_async(redis_client, changed, "teams_list")
+
+    return result
 
-        # Iterando pelas chaves para obter os dados de cada equipe
-        for key in team_keys:
-            team_data = redis_client.get(key)
-            if team_data:
-                try:
-                    team_data_dict = json.loads(team_data.decode('utf-8'))
-                    if not isinstance(team_data_dict, dict):
-                        raise ValueError(f"Formato inválido de dados: {team_data_dict}")
 
-                    team_data_dict['team_id'] = key.decode('utf-8')
-                    teams_list.append(GetAllTeamsSchema(**team_data_dict))
 
-                except (json.JSONDecodeError, ValueError) as e:
-                    logger.error(f"Erro ao decodificar os dados da equipe: {str(e)}")
+# Confere os registros de equipes lidos do Redis, ignorando os inválidos
+async def _decode_teams(records):
+    async for key, team_data_dict in records:
+        try:
+            team_data_dict['team_id'] = logical_key(key)
+            yield read_record(GetAllTeamsSchema, team_data_dict)
+
+        except ValueError as e:
+            logger.error(f"Erro ao decodificar os dados da equipe: {str(e)}")
+
 
-        return teams_list
+# Endpoint para obter todas as equipes registradas
+# (Accept: application/x-ndjson envia uma equipe por linha, em streaming)
+# A lista completa é servida do snapshot pré-serializado; páginas e streaming leem direto do Redis
 
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+@router.get(
+    "/teams",
+    tags=["Teams Manager"],
+    response_model=List[GetAllTeamsSchema]
+)
+async def get_teams(
+    response: Response,
+    cursor: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=Config.MAX_PAGE_SIZE),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    redis_client: redis.asyncio.Redis = Depends(get_read_client)
+) -> List[GetAllTeamsSchema]:
+    logger.info("Obtendo todas as equipes de manutenção")
+    stream = wants_ndjson(accept)
+
+    # ETag da coleção: 304 sem ler os registros se o cliente já tem a versão atual
+    if not stream:
+        etag = await current_etag_async(redis_client, "teams_list")
+        not_modified = not_modified_response(response, if_none_match, etag)
+        if not_modified:
+            return not_modified
+    if cursor is None and limit is None and not stream:
+        return await collection_snapshot_response_async(
+            redis_client,
+            "teams_list",
+            etag,
+            lambda: _decode_teams(fetch_collection(redis_client, "teams_list")),
+            accept_encoding,
+        )
+
+    # Lendo os dados das equipes em lote (um pipeline por bloco de chaves), opcionalmente paginado
+    records = await fetch_collection_paginated(redis_client, "teams_list", response, cursor, limit, stream)
+    teams_list = _decode_teams(records)
+    if stream:
+        return ndjson_response(teams_list, headers=response.headers)
+    return list_response([team async for team in teams_list], response)
 
 
 # Endpoint para obter uma equipe específica pelo nome
@@ -102,32 +211,27 @@ def get_teams(
     tags=["Teams Manager"],
     response_model=GetTeamsSchema
 )
-def get_team_by_name(
+async def get_team_by_name(
     team_name: str,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    redis_client: redis.asyncio.Redis = Depends(get_read_client)
 ) -> GetTeamsSchema:
     logger.info(f"Obtendo equipe com nome: {team_name}")
-    team_id = f"team:{team_name}"
+    team_id = record_key("team", team_name)
 
-    try:
-        # Buscar os dados da equipe no Redis
-        team_data = redis_client.get(team_id)
-
-        if not team_data:
+    async def load_team():
+        # Verificar se a equipe existe no Redis
+        if not await redis_client.exists(team_id):
             raise HTTPException(status_code=404, detail="Equipe não encontrada")
 
-        # Decodificar os dados da equipe
-        try:
-            team_data_dict = json.loads(team_data.decode('utf-8'))
-            if not isinstance(team_data_dict, dict):
-                raise ValueError(f"Formato inválido de dados: {team_data_dict}")
-        except (json.JSONDecodeError, ValueError) as e:
-            raise HTTPException(status_code=500, detail=f"Erro ao decodificar os dados da equipe: {str(e)}")
-
-        return GetTeamsSchema(team_id=team_id)
+        return GetTeamsSchema(team_id=logical_key(team_id))
 
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    etag = await current_etag_async(redis_client, team_id)
+    not_modified = not_modified_response(response, if_none_match, etag)
+    if not_modified:
+        return not_modified
+    return await cached_async(team_id, load_team, etag)
 
 
 # Endpoint para atualizar dados de uma equipe
@@ -137,39 +241,26 @@ def get_team_by_name(
     status_code=status.HTTP_202_ACCEPTED,
     response_model=UpdateTeamsSchema
 )
-def update_team(
+async def update_team(
     team_name: str,
     team_update: UpdateTeamsSchema,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
 ) -> UpdateTeamsSchema:
     logger.info(f"Atualizando dados da equipe com nome: {team_name}")
-    team_id = f"team:{team_name}"
+    team_id = record_key("team", team_name)
 
     try:
-        # Buscar os dados da equipe no Redis
-        team_data = redis_client.get(team_id)
-        if not team_data:
+        # Atualizar no Redis apenas os campos fornecidos (leitura, mescla e gravação num único comando)
+        result, team_data_dict = await merge_record(redis_client, team_id, team_update.dict(exclude_unset=True))
+        if result == MERGE_NOT_FOUND:
             raise HTTPException(status_code=404, detail="Equipe não encontrada")
-
-        # Decodificar os dados existentes da equipe
-        try:
-            team_data_dict = json.loads(team_data.decode('utf-8'))
-            if not isinstance(team_data_dict, dict):
-                raise ValueError(f"Formato inválido de dados: {team_data_dict}")
-        except (json.JSONDecodeError, ValueError) as e:
-            raise HTTPException(status_code=500, detail=f"Erro ao decodificar os dados da equipe: {str(e)}")
-
-        # Atualizar os dados da equipe com as informações fornecidas
-        team_data_dict.update(team_update.dict())
-        team_data_json = json.dumps(team_data_dict)
-
-        # Atualizar os dados da equipe no Redis
-        redis_client.set(team_id, team_data_json)
+        await invalidate_async(redis_client, team_id, "teams_list")
+        await bump_versions_async(redis_client, team_id, "teams_list")
 
         return UpdateTeamsSchema(**team_data_dict)
 
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    except redis.ResponseError as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao decodificar os dados da equipe: {str(e)}")
 
 
 # Endpoint para remover uma equipe
@@ -177,25 +268,18 @@ def update_team(
     "/teams/{team_name}",
     tags=["Teams Manager"]
 )
-def delete_team(
+async def delete_team(
     team_name: str,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
 ):
     logger.info(f"Removendo equipe com nome: {team_name}")
-    team_id = f"team:{team_name}"
-
-    try:
-        # Buscar os dados da equipe no Redis
-        team_data = redis_client.get(team_id)
-        if not team_data:
-            raise HTTPException(status_code=404, detail="Equipe não encontrada")
-
-        # Remover a equipe do Redis
-        redis_client.srem("teams_list", team_id)
-        redis_client.delete(team_id)
+    team_id = record_key("team", team_name)
 
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    # Remover a equipe e a sua entrada na lista atomicamente (script de remoção)
+    if await delete_record(redis_client, team_id, sets=["teams_list"]) == DELETE_NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Equipe não encontrada")
+    await invalidate_async(redis_client, team_id, "teams_list")
+    await bump_versions_async(redis_client, team_id, "teams_list")
 
 
 # Função para configurar o roteador no aplicativo FastAPI
@@ -20,6 +20,10 @@ class UpdateTeamsSchema(BaseModel):
     specialites: Optional[List[str]] = None
 
 
+class BulkUpdateTeamsSchema(UpdateTeamsSchema):
+    name: str
+
+
 class DeleteTeamsSchema(BaseModel):
     team_id: str
 
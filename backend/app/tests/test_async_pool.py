@@ -0,0 +1,90 @@
+import asyncio
+import redis
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.redis_setting import async_pool
+from app.redis_setting.async_pool import (
+    chunked,
+    load_record,
+    load_fields,
+    fetch_many,
+    fetch_collection_paginated,
+    create_record,
+    merge_record,
+)
+from app.redis_setting.redis_pool import MERGE_OK, NEXT_CURSOR_HEADER
+
+
+async def collect(records):
+    return [record async for record in records]
+
+
+# Simula o pipeline assíncrono de HGETALL: cada execute devolve os hashes das chaves enfileiradas
+def mock_hash_pipeline(redis_client, records):
+    pipe = MagicMock()
+    redis_client.pipeline = MagicMock(return_value=pipe)
+    queued = []
+    pipe.hgetall.side_effect = queued.append
+
+    async def execute(raise_on_error=True):
+        results = [records.get(key, {}) for key in queued]
+        queued.clear()
+        return results
+
+    pipe.execute.side_effect = execute
+    return pipe
+
+
+# Teste Unitário para a divisão em blocos de iteráveis síncronos e assíncronos
+def test_async_chunked():
+    async def keys():
+        for key in range(5):
+            yield key
+
+    assert asyncio.run(collect(chunked(keys(), 2))) == [[0, 1], [2, 3], [4]]
+    assert asyncio.run(collect(chunked(range(3), 2))) == [[0, 1], [2]]
+
+
+# Teste Unitário para a leitura de um registro pelo cliente assíncrono, em hash ou legado
+def test_async_load_record_and_fields():
+    redis_client = AsyncMock()
+    redis_client.hgetall.return_value = {b"code": b'"P1"', b"quantity": b"3"}
+    assert asyncio.run(load_record(redis_client, "parts:P1")) == {"code": "P1", "quantity": 3}
+
+    redis_client.hgetall.side_effect = redis.ResponseError("WRONGTYPE Operation against a key")
+    redis_client.get.return_value = b'{"code": "P3", "quantity": 1}'
+    assert asyncio.run(load_record(redis_client, "parts:P3")) == {"code": "P3", "quantity": 1}
+
+    redis_client.hmget.return_value = [None, None]
+    assert asyncio.run(load_fields(redis_client, "parts:P5", ["code", "name"])) is None
+
+
+# Teste Unitário para a leitura em lote e a paginação com o cliente assíncrono
+def test_async_fetch_many_and_page():
+    redis_client = AsyncMock()
+    records = {k: {b"n": str(i).encode()} for i, k in enumerate(["k0", "k1", "k2", "k3"]) if k != "k2"}
+    pipe = mock_hash_pipeline(redis_client, records)
+
+    result = asyncio.run(collect(fetch_many(redis_client, ["k0", "k1", "k2", "k3"], chunk_size=2)))
+    assert result == [("k0", {"n": 0}), ("k1", {"n": 1}), ("k3", {"n": 3})]
+    assert pipe.execute.call_count == 2
+
+    async def page():
+        response = MagicMock(headers={})
+        redis_client.sscan.side_effect = [(5, ["k0"]), (0, ["k1"])]
+        records = await fetch_collection_paginated(redis_client, "parts_list", response, cursor=0, limit=2)
+        return response.headers[NEXT_CURSOR_HEADER], await collect(records)
+
+    assert asyncio.run(page()) == ("0", [("k0", {"n": 0}), ("k1", {"n": 1})])
+
+
+# Teste Unitário para os scripts de criação e mescla aguardados no cliente assíncrono
+def test_async_scripts_build_calls():
+    redis_client = AsyncMock()
+    with patch.object(async_pool, "_create_record", AsyncMock(return_value=0)) as script:
+        assert asyncio.run(create_record(redis_client, "team:A", {"name": "A"}, sets=["teams_list"])) == 0
+    keys, args = script.call_args.kwargs["keys"], script.call_args.kwargs["args"]
+    assert keys == ["team:A", "teams_list"]
+    assert args[:4] == [1, 0, 0, 0] and args[4:] == ["name", b'\x01"A"']
+
+    with patch.object(async_pool, "_merge_record", AsyncMock(return_value=[0, [b"name", b'"B"']])):
+        assert asyncio.run(merge_record(redis_client, "team:A", {"name": "B"})) == (MERGE_OK, {"name": "B"})
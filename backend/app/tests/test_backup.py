@@ -0,0 +1,70 @@
+import io
+import pytest
+from unittest.mock import MagicMock, patch
+from app.redis_setting.backup import (
+    dump_backup,
+    read_backup,
+    restore_backup,
+    iter_compressed_backup,
+    NDJSON_FORMAT,
+    MSGPACK_FORMAT,
+)
+from app.redis_setting.redis_pool import encode_fields
+
+RECORDS = [
+    (b"machine:SN1", {"name": "Máquina", "maintenance_history": [], "status": "operando"}),
+    (b"user:ana", {"username": "ana", "email": "ana@x.com"}),
+]
+
+
+def mock_scan(redis_client):
+    redis_client.scan_iter.side_effect = lambda pattern, count: [
+        key for key, _ in RECORDS if key.decode().startswith(pattern[:-1])
+    ]
+
+
+# Teste Unitário para o backup e a leitura de volta, nos dois formatos
+@pytest.mark.parametrize("backup_format", [NDJSON_FORMAT, MSGPACK_FORMAT])
+def test_dump_and_read_backup(backup_format):
+    redis_client = MagicMock()
+    mock_scan(redis_client)
+    out = io.BytesIO()
+
+    with patch("app.redis_setting.backup.fetch_many", side_effect=lambda client, keys: [
+        (key, fields) for key, fields in RECORDS if key in list(keys)
+    ]):
+        assert dump_backup(redis_client, out, backup_format) == 2
+
+    out.seek(0)
+    assert list(read_backup(out, backup_format)) == [(key.decode(), fields) for key, fields in RECORDS]
+
+
+# Teste Unitário para o backup comprimido em streaming (gzip válido)
+def test_iter_compressed_backup():
+    redis_client = MagicMock()
+    mock_scan(redis_client)
+    with patch("app.redis_setting.backup.fetch_many", side_effect=lambda client, keys: [
+        (key, fields) for key, fields in RECORDS if key in list(keys)
+    ]):
+        data = b"".join(iter_compressed_backup(redis_client))
+
+    assert [key for key, _ in read_backup(io.BytesIO(data))] == ["machine:SN1", "user:ana"]
+
+
+# Teste Unitário para a restauração: registros, listas e invalidação dos derivados
+def test_restore_backup():
+    redis_client = MagicMock()
+    pipe = redis_client.pipeline.return_value
+    records = [(key.decode(), fields) for key, fields in RECORDS]
+
+    with patch("app.redis_setting.backup.rebuild_indexes") as rebuild_indexes, \
+         patch("app.redis_setting.backup.backfill_email_index") as backfill_email_index, \
+         patch("app.redis_setting.backup.reset_versions") as reset_versions, \
+         patch("app.redis_setting.backup.invalidate_all") as invalidate_all:
+        assert restore_backup(redis_client, iter(records)) == 2
+
+    pipe.hset.assert_any_call("machine:SN1", mapping=encode_fields(RECORDS[0][1]))
+    pipe.sadd.assert_called_once_with("machines_list", "machine:SN1")
+    pipe.execute.assert_called_once()
+    for step in (rebuild_indexes, backfill_email_index, reset_versions, invalidate_all):
+        step.assert_called_once_with(redis_client)
@@ -0,0 +1,85 @@
+import asyncio
+import redis
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.redis_setting.bulk import (
+    BulkItem,
+    bulk_create_async,
+    bulk_update_async,
+    notify_bulk_changes_async,
+    rejected_item,
+    CREATED,
+    EXISTS,
+    ERROR,
+    UPDATED,
+    NOT_FOUND,
+    REQUIREMENT_MISSING,
+)
+from app.redis_setting.redis_pool import RECORD_CREATED, RECORD_EXISTS, RECORD_REQUIREMENT_MISSING, encode_value
+
+
+def mock_pipelines(redis_client, *replies):
+    pipes = []
+    for reply in replies:
+        pipe = MagicMock()
+        pipe.execute = AsyncMock(return_value=reply)
+        pipes.append(pipe)
+    redis_client.pipeline.side_effect = pipes
+    return pipes
+
+
+# Teste Unitário para a criação em lote: uma transação por bloco e um resultado por item
+def test_bulk_create_chunks_and_results():
+    redis_client = MagicMock()
+    pipes = mock_pipelines(
+        redis_client,
+        [RECORD_CREATED, RECORD_EXISTS],
+        [redis.ResponseError("falhou")],
+    )
+    items = [BulkItem(f"P{i}", f"parts:P{i}", {"code": f"P{i}"}, {"sets": ["parts_list"]}) for i in range(3)]
+
+    with patch("app.redis_setting.bulk.Config.BULK_WRITE_CHUNK_SIZE", 2), \
+         patch("app.redis_setting.bulk.async_pool.queue_create_record", new=AsyncMock()) as create_record:
+        result, changed = asyncio.run(bulk_create_async(redis_client, items, "Parte já registrada."))
+
+    assert [call.kwargs for call in redis_client.pipeline.call_args_list] == [{"transaction": True}] * 2
+    create_record.assert_any_await(pipes[0], "parts:P0", {"code": "P0"}, sets=["parts_list"])
+    assert [item.status for item in result.results] == [CREATED, EXISTS, ERROR]
+    assert (result.succeeded, result.failed) == (1, 2)
+    assert changed == ["parts:P0"]
+
+
+# Teste Unitário para a atualização em lote e os itens recusados pela equipe inexistente
+def test_bulk_update_results():
+    redis_client = MagicMock()
+    mock_pipelines(redis_client, [[0, [b"status", encode_value("Fechada")]], [1], [2]])
+    items = [BulkItem(str(i), f"maintenance:{i}", {"status": "Fechada"}) for i in range(3)]
+
+    with patch("app.redis_setting.bulk.async_pool.queue_merge_record", new=AsyncMock()):
+        result, changed = asyncio.run(
+            bulk_update_async(redis_client, items, "Manutenção não encontrada", "Equipe atribuída não encontrada.")
+        )
+
+    assert [item.status for item in result.results] == [UPDATED, NOT_FOUND, REQUIREMENT_MISSING]
+    assert changed == ["maintenance:0"]
+
+    # Na criação, a equipe inexistente é recusada pelo próprio script
+    mock_pipelines(redis_client, [RECORD_REQUIREMENT_MISSING])
+    with patch("app.redis_setting.bulk.async_pool.queue_create_record", new=AsyncMock()):
+        result, changed = asyncio.run(bulk_create_async(
+            redis_client, [items[0]], "Manutenção já registrada.", "Equipe atribuída não encontrada."
+        ))
+    assert result.results == [rejected_item("0", REQUIREMENT_MISSING, "Equipe atribuída não encontrada.")]
+    assert (result.succeeded, result.failed, changed) == (0, 1, [])
+
+
+# Teste Unitário para as versões e a invalidação depois do lote
+def test_notify_bulk_changes():
+    redis_client = MagicMock()
+    with patch("app.redis_setting.bulk.invalidate_async", new=AsyncMock()) as invalidate, \
+         patch("app.redis_setting.bulk.bump_versions_async", new=AsyncMock()) as bump_versions:
+        asyncio.run(notify_bulk_changes_async(redis_client, ["parts:P1"], "parts_list"))
+        asyncio.run(notify_bulk_changes_async(redis_client, [], "parts_list"))
+        asyncio.run(notify_bulk_changes_async(redis_client, ["maintenance:1"], "maintenance_list", invalidate_cache=False))
+
+    invalidate.assert_awaited_once_with(redis_client, "parts:P1", "parts_list")
+    assert bump_versions.await_count == 2
@@ -0,0 +1,78 @@
+import pytest
+from unittest.mock import MagicMock
+import app.redis_setting.client_tracking as client_tracking
+from app.redis_setting.client_tracking import TrackingCache, MISSING, INVALIDATION_CHANNEL
+from app.redis_setting.redis_pool import fetch_many
+
+
+@pytest.fixture
+def tracking_cache(monkeypatch):
+    cache = TrackingCache(max_keys=3, prefixes=("machine:", "team:"))
+    cache.activate()
+    monkeypatch.setattr(client_tracking, "tracking_cache", cache)
+    return cache
+
+
+# Teste Unitário para a leitura pelo cache: só chaves monitoradas ficam em memória
+def test_read_through_caches_tracked_prefixes(tracking_cache):
+    loader = MagicMock(return_value={b"status": b'"ok"'})
+
+    assert client_tracking.read_through(b"machine:1", loader) == {b"status": b'"ok"'}
+    assert client_tracking.read_through("machine:1", loader) == {b"status": b'"ok"'}
+    client_tracking.read_through("parts:1", loader)
+    client_tracking.read_through("parts:1", loader)
+
+    assert loader.call_count == 3
+    assert tracking_cache.stats()["hits"] == 1
+
+
+# Teste Unitário para a invalidação que chega enquanto a leitura está em andamento
+def test_invalidation_during_read_is_not_cached(tracking_cache):
+    def load_while_written():
+        client_tracking._handle([b"message", INVALIDATION_CHANNEL, [b"team:A"]])
+        return {b"name": b'"antigo"'}
+
+    client_tracking.read_through("team:A", load_while_written)
+    assert tracking_cache.lookup("team:A") is MISSING
+
+    client_tracking.read_through("team:A", lambda: {b"name": b'"novo"'})
+    client_tracking._handle([b"message", INVALIDATION_CHANNEL, [b"team:A"]])
+    assert tracking_cache.lookup("team:A") is MISSING
+    assert tracking_cache.stats()["invalidations"] == 1
+
+
+# Teste Unitário para o limite de chaves e o esvaziamento (FLUSHDB) e a desativação
+def test_bounded_keys_and_flush(tracking_cache):
+    for i in range(5):
+        client_tracking.read_through(f"machine:{i}", lambda: {})
+    assert tracking_cache.stats()["keys"] == 3
+    assert tracking_cache.stats()["evictions"] == 2
+
+    client_tracking._handle([b"message", INVALIDATION_CHANNEL, None])
+    assert tracking_cache.stats()["keys"] == 0
+
+    tracking_cache.deactivate()
+    assert not tracking_cache.tracks("machine:1")
+
+
+# Teste Unitário para a leitura em lote: só as chaves fora do cache vão ao Redis
+def test_fetch_many_skips_cached_keys(tracking_cache, monkeypatch):
+    import app.redis_setting.redis_pool as redis_pool
+    monkeypatch.setattr(redis_pool, "tracking_cache", tracking_cache)
+    redis_client = MagicMock()
+    pipe = redis_client.pipeline.return_value
+    pipe.execute.return_value = [{b"n": b"1"}, {b"n": b"2"}]
+
+    assert list(fetch_many(redis_client, ["machine:1", "parts:2"])) == [
+        ("machine:1", {"n": 1}), ("parts:2", {"n": 2})
+    ]
+    pipe.execute.return_value = [{b"n": b"3"}]
+    assert list(fetch_many(redis_client, ["machine:1", "parts:2"])) == [
+        ("machine:1", {"n": 1}), ("parts:2", {"n": 3})
+    ]
+    pipe.hgetall.assert_called_with("parts:2")
+    assert pipe.hgetall.call_count == 3
+
+
+if __name__ == "__main__":
+    pytest.main()
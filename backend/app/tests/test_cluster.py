@@ -0,0 +1,164 @@
+import shutil
+import socket
+import subprocess
+import time
+import pytest
+import redis
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app.redis_setting.cluster import (
+    collection_groups,
+    collection_keys,
+    layout_key,
+    logical_key,
+    member_key,
+    record_key,
+    reference_key,
+)
+from app.redis_setting.redis_pool import create_arguments, merge_arguments, fetch_collection_page
+from app.maintenance.indexes import index_prefixes, merge_by_score
+
+
+def cluster_mode(enabled=True):
+    return patch.multiple("config.Config", REDIS_CLUSTER=enabled, REDIS_CLUSTER_BUCKETS=4)
+
+
+# Teste Unitário para o layout das chaves: registro, sets dos buckets e conversão entre layouts
+def test_cluster_key_layout():
+    with cluster_mode():
+        key = record_key("machine", "S-100")
+        tag = key.split(":")[1]
+        assert key == f"machine:{tag}:S-100" and tag.startswith("{machine.")
+        assert reference_key("machine:S-100") == key and reference_key(key) == key
+        assert logical_key(key) == "machine:S-100"
+        assert layout_key("machine:S-100") == key and layout_key(key) == key
+        assert member_key("machines_list", key) == f"machines_list:{tag}"
+        assert member_key("maintenance_index:status:", "maintenance:{maintenance.2}:M") == "maintenance_index:{maintenance.2}:status:"
+        assert collection_keys("teams_list") == [f"teams_list:{{team.{b}}}" for b in range(4)]
+        assert collection_groups("maintenance_index:query:x", "maintenance_index:status:Aberta")[1] == [
+            "maintenance_index:{maintenance.1}:query:x",
+            "maintenance_index:{maintenance.1}:status:Aberta",
+        ]
+        keys, _ = create_arguments(key, {"serial_number": "S-100"}, sets=["machines_list"])
+        assert keys == [key, f"machines_list:{tag}"]
+
+    assert record_key("machine", "S-100") == "machine:S-100"
+    assert layout_key(key) == "machine:S-100"
+    assert collection_keys("teams_list") == ["teams_list"]
+
+
+# Teste Unitário para a garantia do slot: no cluster, registro sem a hash tag é recusado
+def test_index_prefixes_require_cluster_layout():
+    with cluster_mode():
+        with pytest.raises(ValueError):
+            merge_arguments("maintenance:1", {"status": "Fechada"}, indexes=index_prefixes())
+        keys, args = merge_arguments(record_key("maintenance", "1"), {"status": "Fechada"}, indexes=index_prefixes())
+        assert args[0].count("{maintenance.") == len(index_prefixes())
+
+# Teste Unitário para a paginação bucket a bucket: o cursor guarda o bucket e o cursor do SSCAN
+def test_collection_page_walks_buckets():
+    redis_client = MagicMock()
+    redis_client.sscan.side_effect = [(0, ["k0"]), (3, ["k1", "k2"]), (0, ["k3"]), (0, []), (0, ["k4"])]
+    redis_client.pipeline.return_value.execute.return_value = []
+
+    with cluster_mode():
+        cursor, _ = fetch_collection_page(redis_client, "parts_list", cursor=0, limit=3)
+        assert cursor == 3 * 4 + 1
+        cursor, _ = fetch_collection_page(redis_client, "parts_list", cursor=cursor, limit=3)
+        assert cursor == 0
+
+    scanned = [(call.args[0], call.kwargs["cursor"]) for call in redis_client.sscan.call_args_list]
+    assert scanned == [
+        ("parts_list:{parts.0}", 0),
+        ("parts_list:{parts.1}", 0),
+        ("parts_list:{parts.1}", 3),
+        ("parts_list:{parts.2}", 0),
+        ("parts_list:{parts.3}", 0),
+    ]
+
+
+# Teste Unitário para a junção dos intervalos de datas de vários buckets
+def test_merge_by_score():
+    replies = [[(b"m:a", 3.0), (b"m:c", 5.0)], [(b"m:b", 4.0)], [(b"m:d", 3.0)]]
+    assert merge_by_score(replies, 0, 10) == [b"m:a", b"m:d", b"m:b", b"m:c"]
+    assert merge_by_score(replies, 1, 2) == [b"m:d", b"m:b"]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(check, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except redis.ConnectionError:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError("Cluster de teste não ficou pronto")
+
+
+# Cluster local com três primários (redis-server no PATH), slots divididos igualmente
+@pytest.fixture
+def redis_cluster(tmp_path):
+    if shutil.which("redis-server") is None:
+        pytest.skip("redis-server não está instalado")
+    ports = [_free_port() for _ in range(3)]
+    processes = []
+    for port in ports:
+        processes.append(subprocess.Popen(
+            [
+                "redis-server", "--port", str(port), "--cluster-enabled", "yes",
+                "--cluster-config-file", f"nodes-{port}.conf", "--save", "", "--appendonly", "no",
+                "--dir", str(tmp_path),
+            ],
+            stdout=subprocess.DEVNULL,
+        ))
+    nodes = [redis.Redis(port=port) for port in ports]
+    _wait_for(lambda: all(node.ping() for node in nodes))
+    step = 16384 // len(nodes)
+    for i, node in enumerate(nodes):
+        last = 16383 if i == len(nodes) - 1 else (i + 1) * step - 1
+        node.execute_command("CLUSTER ADDSLOTS", *range(i * step, last + 1))
+        node.execute_command("CLUSTER MEET", "127.0.0.1", ports[0])
+    _wait_for(lambda: all(node.cluster("info")["cluster_state"] == "ok" for node in nodes))
+    yield ports
+    for process in processes:
+        process.terminate()
+        process.wait()
+
+
+# Teste de integração: cadastro, listagem, filtros e lotes no cluster
+def test_app_on_cluster(redis_cluster):
+    from app_factory import create_app
+
+    nodes = ",".join(f"127.0.0.1:{port}" for port in redis_cluster)
+    with patch.multiple(
+        "config.Config", REDIS_CLUSTER=True, REDIS_CLUSTER_NODES=nodes, REDIS_CLUSTER_BUCKETS=8, AUTH_REQUIRED=False
+    ):
+        with TestClient(create_app()) as client:
+            team = {"name": "Alfa", "members": ["Ana"], "specialites": ["Elétrica"]}
+            response = client.post("/teams", json=team)
+            assert response.status_code == 201
+            # O team_id público não expõe o bucket e volta como referência da manutenção
+            team_id = response.json()["team_id"]
+            assert team_id == "team:Alfa"
+            assert [team["team_id"] for team in client.get("/teams").json()] == [team_id]
+            parts = [
+                {"code": f"C-{i}", "description": "Parte", "location": "Almoxarifado", "name": "Rolamento", "quantity": i}
+                for i in range(20)
+            ]
+            assert client.post("/parts/bulk", json=parts).json()["succeeded"] == 20
+            assert len(client.get("/parts").json()) == 20
+
+            maintenance = {
+                "problem_description": "Vazamento", "request_date": "2024-01-02", "priority": "Alta",
+                "assigned_team_id": team_id, "status": "Aberta", "machine_id": "S-1",
+            }
+            assert client.post("/maintenance", json=maintenance).status_code == 201
+            assert len(client.get("/maintenance?status=Aberta&priority=Alta").json()) == 1
+            assert client.post("/maintenance", json={**maintenance, "assigned_team_id": "team:Beta"}).status_code == 400
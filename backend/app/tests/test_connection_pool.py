@@ -0,0 +1,97 @@
+import asyncio
+import os
+import pytest
+import redis
+from unittest.mock import patch
+from app.redis_setting.connection_pool import (
+    InstrumentedBlockingConnectionPool,
+    InstrumentedConnectionPool,
+    InstrumentedAsyncBlockingConnectionPool,
+    connection_options,
+    create_pool,
+)
+
+
+class StubConnection:
+    def __init__(self, **kwargs):
+        self.pid = os.getpid()
+
+    def connect(self):
+        pass
+
+    def can_read(self):
+        return False
+
+    def disconnect(self):
+        pass
+
+
+# Teste Unitário para as métricas do pool bloqueante: em uso, ociosas e pool esgotado
+def test_blocking_pool_stats():
+    pool = InstrumentedBlockingConnectionPool(connection_class=StubConnection, max_connections=2, timeout=0.01)
+
+    first = pool.get_connection("GET")
+    second = pool.get_connection("GET")
+    with pytest.raises(redis.ConnectionError):
+        pool.get_connection("GET")
+    stats = pool.stats()
+    assert (stats["in_use"], stats["idle"], stats["acquired"], stats["exhausted"], stats["created"]) == (2, 0, 2, 1, 2)
+
+    pool.release(first)
+    pool.release(second)
+    stats = pool.stats()
+    assert (stats["in_use"], stats["idle"]) == (0, 2)
+
+
+# Teste Unitário para o pool comum com limite de conexões
+def test_connection_pool_stats():
+    pool = InstrumentedConnectionPool(connection_class=StubConnection, max_connections=1)
+
+    connection = pool.get_connection("GET")
+    with pytest.raises(redis.ConnectionError):
+        pool.get_connection("GET")
+    assert pool.stats()["exhausted"] == 1
+
+    pool.release(connection)
+    assert (pool.stats()["in_use"], pool.stats()["idle"]) == (0, 1)
+
+
+# Teste Unitário para a configuração do pool a partir do Config
+def test_create_pool_from_config():
+    with patch("app.redis_setting.connection_pool.Config.REDIS_POOL_BLOCKING", False), \
+         patch("app.redis_setting.connection_pool.Config.REDIS_RETRY_ATTEMPTS", 0):
+        pool = create_pool()
+        assert isinstance(pool, InstrumentedConnectionPool)
+        assert connection_options()["retry"]._retries == 0
+
+    assert isinstance(create_pool(), InstrumentedBlockingConnectionPool)
+    assert connection_options()["retry"]._retries == 2
+
+
+class StubAsyncConnection(StubConnection):
+    async def connect(self):
+        pass
+
+    async def can_read_destructive(self):
+        return False
+
+    async def disconnect(self):
+        pass
+
+
+# Teste Unitário para as métricas do pool bloqueante do redis.asyncio
+def test_async_blocking_pool_stats():
+    async def scenario():
+        pool = InstrumentedAsyncBlockingConnectionPool(
+            connection_class=StubAsyncConnection, max_connections=1, timeout=0.01
+        )
+        connection = await pool.get_connection("GET")
+        with pytest.raises(redis.ConnectionError):
+            await pool.get_connection("GET")
+        in_use = pool.stats()
+        await pool.release(connection)
+        return in_use, pool.stats()
+
+    in_use, released = asyncio.run(scenario())
+    assert (in_use["in_use"], in_use["idle"], in_use["acquired"], in_use["exhausted"]) == (1, 0, 1, 1)
+    assert (released["in_use"], released["idle"]) == (0, 1)
@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi import HTTPException
+from app.auther import hashing
+from app.auther.hashing import hash_password, password_context, verify_password
+from app.users import controller
+
+
+def threads_only(**settings):
+    return patch.multiple("config.Config", PASSWORD_HASH_WORKERS=0, **settings)
+
+
+# Teste Unitário para o hash e a verificação, com novo hash quando o custo muda
+def test_verify_returns_new_hash_when_rounds_change():
+    with threads_only(BCRYPT_ROUNDS=4):
+        password_hash = asyncio.run(hash_password("senha"))
+        assert password_hash.startswith("$2b$04$")
+        assert asyncio.run(verify_password("senha", password_hash)) == (True, None)
+        assert asyncio.run(verify_password("errada", password_hash)) == (False, None)
+
+    with threads_only(BCRYPT_ROUNDS=5):
+        valid, new_hash = asyncio.run(verify_password("senha", password_hash))
+        assert valid and new_hash.startswith("$2b$05$")
+
+
+# Teste Unitário para o limite da fila: acima dele a operação é recusada com 503 na hora
+def test_queue_limit_rejects_with_503(monkeypatch):
+    monkeypatch.setattr(hashing, "_pending", 3)
+    with threads_only(PASSWORD_HASH_QUEUE_LIMIT=2):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(hash_password("senha"))
+    assert error.value.status_code == 503 and error.value.headers["Retry-After"] == "1"
+    assert hashing._pending == 3
+
+
+# Teste Unitário para o login: o hash com o custo antigo é regravado, o atual não
+def test_login_rehashes_password():
+    old_hash = password_context(4).hash("senha")
+    with threads_only(BCRYPT_ROUNDS=5), patch.object(controller, "merge_record", new=AsyncMock()) as merge:
+        assert asyncio.run(controller.check_password("redis", "user:ana", "senha", old_hash))
+        key, changes = merge.call_args.args[1:]
+        assert key == "user:ana" and changes["password"].startswith("$2b$05$")
+
+        merge.reset_mock()
+        assert not asyncio.run(controller.check_password("redis", "user:ana", "errada", old_hash))
+        assert asyncio.run(controller.check_password("redis", "user:ana", "senha", changes["password"]))
+        merge.assert_not_called()
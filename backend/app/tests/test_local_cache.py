@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+import app.redis_setting.local_cache as local_cache
+from app.redis_setting.local_cache import LocalCache, MISSING
+
+
+# Teste Unitário para o descarte LRU quando o cache enche
+def test_lru_eviction():
+    cache = LocalCache(max_entries=2, ttl=60)
+    cache.set("machine:1", 1)
+    cache.set("machine:2", 2)
+    assert cache.get("machine:1") == 1
+    cache.set("machine:3", 3)
+
+    assert cache.get("machine:2") is MISSING
+    assert cache.get("machine:1") == 1
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+# Teste Unitário para a expiração por TTL
+def test_ttl_expiration(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(local_cache.time, "monotonic", lambda: now[0])
+    cache = LocalCache(max_entries=10, ttl=30)
+    cache.set("parts:P1", "valor")
+
+    now[0] += 29
+    assert cache.get("parts:P1") == "valor"
+    now[0] += 2
+    assert cache.get("parts:P1") is MISSING
+    assert cache.stats()["expirations"] == 1
+
+
+# Teste Unitário para a leitura concorrente com uma escrita: o valor antigo não é guardado
+def test_invalidation_during_load_is_not_cached():
+    cache = LocalCache(max_entries=10, ttl=60)
+
+    def load_while_invalidated():
+        cache.invalidate("teams_list")
+        return ["antigo"]
+
+    assert cache.get_or_load("teams_list", load_while_invalidated) == ["antigo"]
+    assert cache.get("teams_list") is MISSING
+    assert cache.get_or_load("teams_list", lambda: ["novo"]) == ["novo"]
+    assert cache.get("teams_list") == ["novo"]
+
+
+# Teste Unitário para a invalidação publicada aos outros workers
+def test_invalidate_publishes_keys(monkeypatch):
+    cache = LocalCache(max_entries=10, ttl=60)
+    monkeypatch.setattr(local_cache, "cache", cache)
+    cache.set("machine:1", 1)
+    redis_client = MagicMock()
+
+    local_cache.invalidate(redis_client, "machine:1", "machines_list")
+
+    assert cache.get("machine:1") is MISSING
+    redis_client.publish.assert_called_once_with(
+        local_cache.Config.LOCAL_CACHE_CHANNEL, '["machine:1", "machines_list"]'
+    )
+
+    local_cache._on_invalidation({"data": b'["machine:2"]'})
+    assert cache.stats()["invalidations"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main()
+
+
+# Teste Unitário para a entrada versionada: só é servida enquanto a versão (ETag) não muda
+def test_versioned_entry_reloads_on_new_version():
+    cache = LocalCache(max_entries=10, ttl=60)
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return f"valor {len(loads)}"
+
+    async def scenario():
+        first = await cache.get_or_load_versioned_async("machine:1", '"e.1"', load)
+        again = await cache.get_or_load_versioned_async("machine:1", '"e.1"', load)
+        changed = await cache.get_or_load_versioned_async("machine:1", '"e.2"', load)
+        return first, again, changed
+
+    assert asyncio.run(scenario()) == ("valor 1", "valor 1", "valor 2")
+    assert len(loads) == 2
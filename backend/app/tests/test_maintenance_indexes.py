@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.maintenance.indexes import (
+    MAINTENANCE_LIST,
+    index_key,
+    add_to_indexes,
+    update_indexes,
+    filtered_list_name_async,
+    fetch_date_range_paginated_async,
+    epoch_day,
+    DATE_INDEX,
+)
+from app.redis_setting.redis_pool import NEXT_CURSOR_HEADER
+from datetime import date
+
+
+# Teste Unitário para a criação dos índices de uma manutenção
+def test_add_to_indexes():
+    pipe = MagicMock()
+    data = {"machine_id": "SN1", "assigned_team_id": "team:Alfa", "status": "Aberta", "priority": None}
+
+    add_to_indexes(pipe, "maintenance:1", data)
+
+    data["request_date"] = "2024-01-02"
+    add_to_indexes(pipe, "maintenance:1", data)
+
+    pipe.zadd.assert_called_once_with(DATE_INDEX, {"maintenance:1": epoch_day("2024-01-02")})
+    added = {call.args[0] for call in pipe.sadd.call_args_list}
+    assert added == {
+        index_key("machine_id", "SN1"),
+        index_key("assigned_team_id", "team:Alfa"),
+        index_key("status", "Aberta"),
+    }
+
+
+# Teste Unitário para os índices informados ao script de atualização
+def test_update_indexes():
+    prefixes, date_index = update_indexes({"status": "Fechada"})
+
+    assert prefixes["status"] == index_key("status", "")
+    assert set(prefixes) == {"machine_id", "assigned_team_id", "status", "priority"}
+    assert date_index == {}
+
+    _, date_index = update_indexes({"request_date": "2024-01-01"})
+    assert date_index == {DATE_INDEX: epoch_day("2024-01-01")}
+
+
+# Teste Unitário para a escolha do set consultado conforme os filtros
+def test_filtered_list_name():
+    redis_client = MagicMock(exists=AsyncMock(return_value=False))
+    pipe = redis_client.pipeline.return_value
+    pipe.execute = AsyncMock()
+
+    def filtered_list_name(*args, **kwargs):
+        return asyncio.run(filtered_list_name_async(*args, **kwargs))
+
+    assert filtered_list_name(redis_client, {"status": None}) == MAINTENANCE_LIST
+    assert filtered_list_name(redis_client, {"status": "Aberta"}) == index_key("status", "Aberta")
+    assert not redis_client.pipeline.called
+
+    result_key = filtered_list_name(redis_client, {"status": "Aberta", "priority": "Alta"})
+    pipe.sinterstore.assert_called_once_with(
+        result_key, [index_key("priority", "Alta"), index_key("status", "Aberta")]
+    )
+
+    # Continuando a paginação, o resultado já gravado é reaproveitado
+    redis_client.exists.return_value = True
+    assert filtered_list_name(redis_client, {"status": "Aberta", "priority": "Alta"}, cursor=42) == result_key
+    assert pipe.sinterstore.call_count == 1
+
+
+# Teste Unitário para o score das datas
+def test_epoch_day():
+    assert epoch_day("1970-01-02") == 1
+    assert epoch_day(date(2024, 1, 1)) == epoch_day("2024-01-01") == 19723
+
+
+# Teste Unitário para a consulta paginada por intervalo de datas
+def test_fetch_date_range_page():
+    redis_client = MagicMock(zrangebyscore=AsyncMock(return_value=["m0", "m1", "m2"]))
+    redis_client.pipeline.return_value.execute = AsyncMock(return_value=[{b"status": b'"Aberta"'}] * 2)
+    response = MagicMock()
+    response.headers = {}
+
+    async def page():
+        records = await fetch_date_range_paginated_async(
+            redis_client, {}, response, from_date=date(2024, 1, 1), cursor=4, limit=2
+        )
+        return [key async for key, _ in records]
+
+    assert asyncio.run(page()) == ["m0", "m1"]
+    redis_client.zrangebyscore.assert_awaited_once_with(
+        DATE_INDEX, epoch_day("2024-01-01"), "+inf", start=4, num=3
+    )
+    assert response.headers[NEXT_CURSOR_HEADER] == "6"
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,96 @@
+import fakeredis
+import pytest
+from unittest.mock import patch
+from redis.crc import key_slot
+from app.maintenance.indexes import (
+    DATE_INDEX,
+    MAINTENANCE_LIST,
+    creation_indexes,
+    index_key,
+    index_prefixes,
+    update_indexes,
+)
+from app.redis_setting.cluster import member_key, record_key
+from app.redis_setting.redis_pool import (
+    create_record,
+    merge_record,
+    delete_record,
+    decode_fields,
+    MERGE_OK,
+    DELETE_OK,
+    DELETE_NOT_FOUND,
+    RECORD_CREATED,
+    RECORD_EXISTS,
+    RECORD_REQUIREMENT_MISSING,
+)
+
+# Os scripts Lua rodam num Redis em memória (fakeredis com lupa, dependências de desenvolvimento)
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis()
+
+
+# Teste Unitário para a criação com chave exigida: recusada sem a equipe, sem gravar nada
+def test_create_record_requires_keys(redis_client):
+    data = {"status": "Aberta", "assigned_team_id": "team:Alfa"}
+
+    result = create_record(redis_client, "maintenance:1", data, sets=["maintenance_list"], requires=["team:Alfa"])
+    assert result == RECORD_REQUIREMENT_MISSING
+    assert not redis_client.exists("maintenance:1", "maintenance_list")
+
+    redis_client.hset("team:Alfa", "name", '"Alfa"')
+    result = create_record(redis_client, "maintenance:1", data, sets=["maintenance_list"], requires=["team:Alfa"])
+    assert result == RECORD_CREATED
+    assert decode_fields(redis_client.hgetall("maintenance:1")) == data
+    assert redis_client.smembers("maintenance_list") == {b"maintenance:1"}
+
+    assert create_record(redis_client, "maintenance:1", data, requires=["team:Alfa"]) == RECORD_EXISTS
+
+
+# Teste Unitário para a remoção: registro e entrada na lista num único script; 404 na segunda
+def test_delete_record_removes_list_entry(redis_client):
+    create_record(redis_client, "team:Alfa", {"name": "Alfa"}, sets=["teams_list"])
+
+    assert delete_record(redis_client, "team:Alfa", sets=["teams_list"]) == DELETE_OK
+    assert not redis_client.exists("team:Alfa", "teams_list")
+    assert delete_record(redis_client, "team:Alfa", sets=["teams_list"]) == DELETE_NOT_FOUND
+
+
+def cluster_mode(enabled):
+    return patch.multiple("config.Config", REDIS_CLUSTER=enabled, REDIS_CLUSTER_BUCKETS=4)
+
+
+def members(redis_client, name, key):
+    return redis_client.smembers(member_key(name, key))
+
+
+# Teste Unitário para os índices movidos pelos scripts na atualização e na remoção. No cluster,
+# as chaves montadas dentro dos scripts (fora de KEYS) ficam no slot do registro.
+@pytest.mark.parametrize("enabled", [False, True])
+def test_scripts_move_indexes(redis_client, enabled):
+    with cluster_mode(enabled):
+        key = record_key("maintenance", "1")
+        data = {"status": "Aberta", "priority": "Alta", "machine_id": "S1", "request_date": "2024-01-02"}
+        index_sets, date_index = creation_indexes(data)
+        create_record(redis_client, key, data, sets=[MAINTENANCE_LIST, *index_sets], sorted_sets=date_index)
+
+        changes = {"status": "Fechada", "priority": None, "request_date": "2024-01-05"}
+        indexes, date_index = update_indexes(changes)
+        result, record = merge_record(redis_client, key, changes, indexes=indexes, sorted_sets=date_index)
+        assert result == MERGE_OK and record["status"] == "Fechada"
+        assert not members(redis_client, index_key("status", "Aberta"), key)
+        assert members(redis_client, index_key("status", "Fechada"), key) == {key.encode()}
+        assert not members(redis_client, index_key("priority", "Alta"), key)
+        assert members(redis_client, index_key("machine_id", "S1"), key) == {key.encode()}
+        assert redis_client.zscore(member_key(DATE_INDEX, key), key) == date_index[DATE_INDEX]
+
+        if enabled:
+            assert {key_slot(name) for name in redis_client.keys()} == {key_slot(key.encode())}
+
+        assert delete_record(
+            redis_client, key, sets=[MAINTENANCE_LIST], sorted_sets=[DATE_INDEX], indexes=index_prefixes()
+        ) == DELETE_OK
+        assert redis_client.keys() == []
+
@@ -0,0 +1,254 @@
+import pytest
+import redis
+from unittest.mock import MagicMock
+from app.redis_setting.redis_pool import (
+    chunked,
+    encode_fields,
+    decode_fields,
+    encode_value,
+    decode_value,
+    JSON_FORMAT,
+    MSGPACK_FORMAT,
+    load_record,
+    load_fields,
+    fetch_many,
+    fetch_collection,
+    fetch_collection_page,
+    fetch_collection_paginated,
+    scan_collection,
+    create_record,
+    merge_record,
+    delete_record,
+    MERGE_OK,
+    MERGE_NOT_FOUND,
+    NEXT_CURSOR_HEADER,
+)
+import app.redis_setting.redis_pool as redis_pool
+from app.redis_setting.streaming import wants_ndjson
+
+
+# Teste Unitário para a divisão em blocos
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 3)) == []
+
+
+# Simula o pipeline de HGETALL: cada execute devolve os hashes das chaves enfileiradas
+def mock_hash_pipeline(redis_client, records):
+    pipe = redis_client.pipeline.return_value
+    queued = []
+    pipe.hgetall.side_effect = queued.append
+
+    def execute(raise_on_error=True):
+        results = [records.get(key, {}) for key in queued]
+        queued.clear()
+        return results
+
+    pipe.execute.side_effect = execute
+    return pipe
+
+
+# Teste Unitário para a codificação dos campos do hash
+def test_encode_and_decode_fields():
+    data = {"name": "Alfa", "quantity": 3, "members": ["a", "b"], "specialites": []}
+    encoded = encode_fields(data)
+
+    assert encoded["quantity"] == b"\x013"
+    assert encoded["specialites"] == b"\x01[]"
+    assert decode_fields({k.encode(): v for k, v in encoded.items()}) == data
+
+
+# Teste Unitário para o byte de versão do codec e a leitura de valores antigos (JSON puro)
+def test_codec_versions():
+    value = {"status": "Aberta", "history": ["2024-01-01"], "quantity": 3}
+
+    assert encode_value(value, JSON_FORMAT)[0] == JSON_FORMAT
+    assert encode_value(value, MSGPACK_FORMAT)[0] == MSGPACK_FORMAT
+    for value_format in (JSON_FORMAT, MSGPACK_FORMAT):
+        assert decode_value(encode_value(value, value_format)) == value
+    assert decode_value(b'{"status": "Aberta"}') == {"status": "Aberta"}
+    assert decode_value('"Aberta"') == "Aberta"
+    with pytest.raises(ValueError):
+        decode_value(b"\x02\xc1")
+
+
+# Teste Unitário para a leitura em lote: um pipeline por bloco e chaves ausentes ignoradas
+def test_fetch_many_uses_one_pipeline_per_chunk():
+    redis_client = MagicMock()
+    records = {k: {b"n": str(i).encode()} for i, k in enumerate(["k0", "k1", "k2", "k3", "k4"]) if k != "k2"}
+    pipe = mock_hash_pipeline(redis_client, records)
+
+    result = list(fetch_many(redis_client, ["k0", "k1", "k2", "k3", "k4"], chunk_size=2))
+
+    assert result == [("k0", {"n": 0}), ("k1", {"n": 1}), ("k3", {"n": 3}), ("k4", {"n": 4})]
+    assert pipe.execute.call_count == 3
+    assert not redis_client.get.called
+    assert not redis_client.mget.called
+
+
+# Teste Unitário para a leitura em lote de registros legados (string JSON)
+def test_fetch_many_reads_legacy_records():
+    redis_client = MagicMock()
+    pipe = redis_client.pipeline.return_value
+    pipe.execute.return_value = [
+        {b"n": b"1"},
+        redis.ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value"),
+    ]
+    redis_client.mget.return_value = [b'{"n": 2}']
+
+    assert list(fetch_many(redis_client, ["k1", "k2"])) == [("k1", {"n": 1}), ("k2", {"n": 2})]
+    redis_client.mget.assert_called_once_with(["k2"])
+
+
+# Teste Unitário para a leitura de um registro, em hash ou no formato legado
+def test_load_record_and_fields():
+    redis_client = MagicMock()
+    redis_client.hgetall.return_value = {b"code": b'"P1"', b"quantity": b"3"}
+    assert load_record(redis_client, "parts:P1") == {"code": "P1", "quantity": 3}
+
+    redis_client.hgetall.return_value = {}
+    assert load_record(redis_client, "parts:P2") is None
+
+    redis_client.hgetall.side_effect = redis.ResponseError("WRONGTYPE Operation against a key")
+    redis_client.get.return_value = b'{"code": "P3", "quantity": 1}'
+    assert load_record(redis_client, "parts:P3") == {"code": "P3", "quantity": 1}
+
+    redis_client.hmget.return_value = [b'"P4"', None]
+    assert load_fields(redis_client, "parts:P4", ["code", "name"]) == {"code": "P4", "name": None}
+    redis_client.hmget.return_value = [None, None]
+    assert load_fields(redis_client, "parts:P5", ["code", "name"]) is None
+
+
+# Teste Unitário para a leitura de uma coleção inteira
+def test_fetch_collection():
+    redis_client = MagicMock()
+    redis_client.smembers.return_value = {"machine:1"}
+    mock_hash_pipeline(redis_client, {"machine:1": {b"status": b'"ok"'}})
+
+    assert list(fetch_collection(redis_client, "machines_list")) == [("machine:1", {"status": "ok"})]
+    redis_client.smembers.assert_called_once_with("machines_list")
+
+
+# Teste Unitário para a paginação: o SSCAN é repetido até completar o limite
+def test_fetch_collection_page_stops_at_limit():
+    redis_client = MagicMock()
+    redis_client.sscan.side_effect = [(7, ["k0"]), (9, ["k1", "k2"]), (0, ["k3"])]
+    mock_hash_pipeline(redis_client, {k: {b"n": b"0"} for k in ["k0", "k1", "k2", "k3"]})
+
+    next_cursor, records = fetch_collection_page(redis_client, "parts_list", cursor=0, limit=3)
+
+    assert next_cursor == 9
+    assert [key for key, _ in records] == ["k0", "k1", "k2"]
+    assert redis_client.sscan.call_count == 2
+    assert not redis_client.smembers.called
+
+
+# Teste Unitário para o cabeçalho com o próximo cursor
+def test_fetch_collection_paginated_sets_next_cursor_header():
+    redis_client = MagicMock()
+    redis_client.sscan.return_value = (0, ["k0"])
+    mock_hash_pipeline(redis_client, {"k0": {b"n": b"0"}})
+    response = MagicMock()
+    response.headers = {}
+
+    records = list(fetch_collection_paginated(redis_client, "parts_list", response, cursor=0, limit=10))
+
+    assert records == [("k0", {"n": 0})]
+    assert response.headers[NEXT_CURSOR_HEADER] == "0"
+
+    response.headers = {}
+    redis_client.smembers.return_value = {"k0"}
+    list(fetch_collection_paginated(redis_client, "parts_list", response))
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+# Teste Unitário para a varredura da coleção em streaming (SSCAN em vez de SMEMBERS)
+def test_scan_collection_for_streaming():
+    redis_client = MagicMock()
+    redis_client.sscan_iter.return_value = iter(["k0", "k1", "k2"])
+    pipe = mock_hash_pipeline(redis_client, {k: {b"n": b"0"} for k in ["k0", "k1", "k2"]})
+
+    records = list(scan_collection(redis_client, "maintenance_list", chunk_size=2))
+
+    assert [key for key, _ in records] == ["k0", "k1", "k2"]
+    assert pipe.execute.call_count == 2
+    assert not redis_client.smembers.called
+    assert wants_ndjson("application/x-ndjson")
+    assert not wants_ndjson("application/json")
+    assert not wants_ndjson(None)
+
+
+# Teste Unitário para a montagem de chaves e argumentos do script de criação
+def test_create_record_builds_script_call(monkeypatch):
+    script = MagicMock(return_value=0)
+    monkeypatch.setattr(redis_pool, "_create_record", script)
+    redis_client = MagicMock()
+
+    assert create_record(
+        redis_client,
+        "maintenance:1",
+        {"status": "Aberta"},
+        sets=["maintenance_list", "idx:status:Aberta"],
+        sorted_sets={"idx:request_date": 19723},
+        claims={"email_index": ("a@x.com", "a")},
+        requires=["team:Alfa"],
+    ) == 0
+
+    script.assert_called_once_with(
+        keys=["maintenance:1", "maintenance_list", "idx:status:Aberta", "idx:request_date", "email_index", "team:Alfa"],
+        args=[2, 1, 1, 1, 19723, "a@x.com", "a", "status", encode_value("Aberta")],
+        client=redis_client,
+    )
+    assert not redis_client.exists.called
+
+
+# Teste Unitário para a atualização parcial via script
+def test_merge_record_builds_script_call(monkeypatch):
+    script = MagicMock(return_value=[0, [b"code", b'"P1"', b"quantity", b"3"]])
+    monkeypatch.setattr(redis_pool, "_merge_record", script)
+    redis_client = MagicMock()
+
+    result = merge_record(
+        redis_client,
+        "maintenance:1",
+        {"status": "Fechada"},
+        requires=["team:Alfa"],
+        indexes={"status": "idx:status:"},
+        sorted_sets={"idx:request_date": 19723},
+    )
+
+    assert result == (MERGE_OK, {"code": "P1", "quantity": 3})
+    script.assert_called_once_with(
+        keys=["maintenance:1", "team:Alfa", "idx:request_date"],
+        args=['{"status": "idx:status:"}', 1, 1, 19723, "status", encode_value("Fechada")],
+        client=redis_client,
+    )
+    assert not redis_client.hgetall.called
+
+    script.return_value = [1]
+    assert merge_record(redis_client, "parts:P2", {"quantity": 1}) == (MERGE_NOT_FOUND, None)
+
+
+if __name__ == "__main__":
+    pytest.main()
+
+
+# Teste Unitário para a remoção via script (lista, sorted sets e índices)
+def test_delete_record_builds_script_call(monkeypatch):
+    script = MagicMock(return_value=0)
+    monkeypatch.setattr(redis_pool, "_delete_record", script)
+    redis_client = MagicMock()
+
+    assert delete_record(
+        redis_client,
+        "maintenance:1",
+        sets=["maintenance_list"],
+        sorted_sets=["idx:request_date"],
+        indexes={"status": "idx:status:"},
+    ) == 0
+
+    script.assert_called_once_with(
+        keys=["maintenance:1", "maintenance_list", "idx:request_date"],
+        args=['{"status": "idx:status:"}', 1],
+        client=redis_client,
+    )
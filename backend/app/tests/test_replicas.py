@@ -0,0 +1,150 @@
+import asyncio
+import shutil
+import socket
+import subprocess
+import time
+import pytest
+import redis
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+from app.redis_setting import replicas
+from app.redis_setting.async_pool import ReplicaClient, primary_client
+from app.redis_setting.replicas import (
+    READ_YOUR_WRITES_COOKIE,
+    READ_YOUR_WRITES_HEADER,
+    Replica,
+    ReplicaSelector,
+    check_replica,
+    get_read_client,
+)
+from app.redis_setting.connection_pool import parse_addresses
+
+
+def make_replica(port, healthy=True, latency=None):
+    replica = Replica("127.0.0.1", port)
+    replica.healthy, replica.latency = healthy, latency
+    return replica
+
+
+# Teste Unitário para a escolha das réplicas: rodízio e menor latência, só entre as saudáveis
+def test_selector_strategies():
+    first, down, second = make_replica(1, latency=0.004), make_replica(2, healthy=False), make_replica(3, latency=0.001)
+
+    selector = ReplicaSelector([first, down, second])
+    assert [selector.choose().port for _ in range(4)] == [1, 3, 1, 3]
+    assert ReplicaSelector([first, down, second], "least_latency").choose() is second
+
+    first.healthy = second.healthy = False
+    assert selector.choose() is None
+    assert parse_addresses("replica-1:6380, replica-2") == [("replica-1", 6380), ("replica-2", 6379)]
+
+
+# Teste Unitário para a saúde da réplica a partir do INFO replication
+def test_check_replica_marks_link_status():
+    replica = make_replica(1, healthy=False)
+    replica.pool = MagicMock()
+
+    with patch("app.redis_setting.replicas.redis.asyncio.Redis") as client_class:
+        client_class.return_value.info = AsyncMock(return_value={"role": "slave", "master_link_status": "up"})
+        asyncio.run(check_replica(replica))
+        assert replica.healthy and replica.latency is not None
+
+        client_class.return_value.info = AsyncMock(return_value={"role": "slave", "master_link_status": "down"})
+        asyncio.run(check_replica(replica))
+        assert not replica.healthy
+
+        client_class.return_value.info = AsyncMock(side_effect=redis.ConnectionError("recusada"))
+        asyncio.run(check_replica(replica))
+        assert (replica.healthy, replica.failures, replica.last_error) == (False, 1, "recusada")
+
+
+# Teste Unitário para a dependência das rotas GET: réplica, ou primário dentro da janela da escrita
+def test_read_client_routing(monkeypatch):
+    primary = MagicMock()
+    replica = make_replica(1)
+    replica.pool = MagicMock()
+    monkeypatch.setattr(replicas, "selector", ReplicaSelector([replica]))
+
+    def request(headers=None, cookies=None):
+        return MagicMock(headers=headers or {}, cookies=cookies or {})
+
+    client = asyncio.run(get_read_client(request(), primary))
+    assert isinstance(client, ReplicaClient) and primary_client(client) is primary
+    assert replica.reads == 1
+
+    until = str(time.time() + 5)
+    assert asyncio.run(get_read_client(request(cookies={READ_YOUR_WRITES_COOKIE: until}), primary)) is primary
+    assert asyncio.run(get_read_client(request(headers={READ_YOUR_WRITES_HEADER: until}), primary)) is primary
+    expired = str(time.time() - 1)
+    assert isinstance(asyncio.run(get_read_client(request(cookies={READ_YOUR_WRITES_COOKIE: expired}), primary)), ReplicaClient)
+
+    replica.healthy = False
+    assert asyncio.run(get_read_client(request(), primary)) is primary
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(check, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except redis.ConnectionError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError("Redis de teste não ficou pronto")
+
+
+# Primário e réplica locais (redis-server no PATH), sem persistência em disco
+@pytest.fixture
+def primary_and_replica(tmp_path):
+    if shutil.which("redis-server") is None:
+        pytest.skip("redis-server não está instalado")
+    primary_port, replica_port = _free_port(), _free_port()
+    processes = []
+    for port, extra in ((primary_port, []), (replica_port, ["--replicaof", "127.0.0.1", str(primary_port)])):
+        processes.append(subprocess.Popen(
+            ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no", "--dir", str(tmp_path), *extra],
+            stdout=subprocess.DEVNULL,
+        ))
+    primary = redis.Redis(port=primary_port)
+    replica = redis.Redis(port=replica_port)
+    _wait_for(lambda: replica.info("replication").get("master_link_status") == "up")
+    yield primary_port, replica_port, replica
+    for process in processes:
+        process.terminate()
+        process.wait()
+
+
+# Teste de integração: escritas no primário, leituras na réplica e leitura das próprias escritas
+def test_reads_go_to_replica(primary_and_replica):
+    from app_factory import create_app
+
+    primary_port, replica_port, replica = primary_and_replica
+    part = {"code": "REPLICA-1", "description": "Parte", "location": "Almoxarifado", "name": "Rolamento", "quantity": 1}
+    with patch.multiple(
+        "config.Config",
+        REDIS_HOST="127.0.0.1",
+        REDIS_PORT=primary_port,
+        REDIS_DB=0,
+        REDIS_REPLICAS=f"127.0.0.1:{replica_port}",
+        AUTH_REQUIRED=False,
+    ):
+        with TestClient(create_app()) as client:
+            response = client.post("/parts", json=part)
+            assert response.status_code == 201
+            assert READ_YOUR_WRITES_HEADER in response.headers
+
+            # O cookie da escrita leva a leitura ao primário
+            assert client.get("/parts/REPLICA-1").status_code == 200
+            assert client.get("/redis/replicas").json()["replicas"][0]["reads"] == 0
+
+            client.cookies.clear()
+            _wait_for(lambda: replica.exists("parts:REPLICA-1"))
+            assert client.get("/parts/REPLICA-1").json()["code"] == "REPLICA-1"
+            assert client.get("/redis/replicas").json()["replicas"][0]["reads"] == 1
@@ -0,0 +1,127 @@
+import asyncio
+import time
+import pytest
+import redis
+from unittest.mock import MagicMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.redis_setting import resilience
+from app.redis_setting.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    AsyncDeadlineRetry,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineRetry,
+)
+
+
+# Teste Unitário para os estados do circuito: abre após as falhas, testa no meio aberto e fecha
+def test_breaker_opens_and_recovers():
+    breaker = CircuitBreaker("teste", failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert 0 < error.value.retry_after <= 0.05 and breaker.rejected == 1
+
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.opened == 2
+
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+# Teste Unitário para as retentativas: só enquanto a espera couber no orçamento da requisição
+def test_retry_respects_request_budget():
+    breaker = CircuitBreaker("teste", failure_threshold=10)
+    do = MagicMock(side_effect=redis.ConnectionError("recusada"))
+    fail = MagicMock()
+
+    with patch.multiple("config.Config", REDIS_RETRY_BACKOFF_BASE=0.01, REDIS_RETRY_BACKOFF_CAP=0.02):
+        with pytest.raises(redis.ConnectionError):
+            DeadlineRetry(breaker, retries=2).call_with_retry(do, fail)
+        assert do.call_count == 3 and breaker.retries == 2 and breaker.failures == 1
+
+        do.reset_mock()
+        token = resilience._deadline.set(time.monotonic() + 0.001)
+        try:
+            with pytest.raises(redis.ConnectionError):
+                DeadlineRetry(breaker, retries=2).call_with_retry(do, fail)
+            assert do.call_count == 1 and breaker.budget_exhausted == 1
+
+            time.sleep(0.002)
+            with pytest.raises(redis.TimeoutError):
+                DeadlineRetry(breaker, retries=2).call_with_retry(do, fail)
+            assert do.call_count == 1 and breaker.failures == 2
+        finally:
+            resilience._deadline.reset(token)
+
+    # Erro de comando não é falha do servidor
+    do.side_effect = redis.ResponseError("WRONGTYPE")
+    with pytest.raises(redis.ResponseError):
+        DeadlineRetry(breaker).call_with_retry(do, fail)
+    assert breaker.failures == 0
+
+
+# Teste Unitário para a tentativa assíncrona interrompida no fim do orçamento
+def test_async_attempt_cut_at_deadline():
+    breaker = CircuitBreaker("teste")
+
+    async def hang():
+        await asyncio.sleep(1)
+
+    async def fail(error):
+        pass
+
+    async def run():
+        resilience._deadline.set(time.monotonic() + 0.05)
+        await AsyncDeadlineRetry(breaker, retries=3).call_with_retry(hang, fail)
+
+    start = time.monotonic()
+    with pytest.raises(redis.TimeoutError, match="Orçamento"):
+        asyncio.run(run())
+    assert time.monotonic() - start < 0.5 and breaker.retries == 0
+
+
+# Teste Unitário para as respostas: 503 com Retry-After, inclusive com o circuito embrulhado
+def test_unavailable_responses():
+    breaker = CircuitBreaker("teste", reset_timeout=3)
+    breaker.record_failure()
+    breaker.state, breaker.opened_at = OPEN, time.monotonic()
+
+    app = FastAPI()
+    resilience.configure(app)
+
+    @app.get("/aberto")
+    def circuit_open():
+        raise CircuitOpenError(breaker)
+
+    @app.get("/embrulhado")
+    def wrapped():
+        try:
+            breaker.before_call()
+        except CircuitOpenError as error:
+            raise redis.ConnectionError(str(error)) from error
+
+    @app.get("/fora")
+    def unavailable():
+        raise redis.ConnectionError("recusada")
+
+    client = TestClient(app)
+    for path in ("/aberto", "/embrulhado"):
+        response = client.get(path)
+        assert response.status_code == 503 and response.headers["Retry-After"] == "3"
+    response = client.get("/fora")
+    assert response.status_code == 503 and "recusada" in response.json()["detail"]
@@ -0,0 +1,102 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.auther import revocation
+from app.auther.revocation import (
+    REVOKED_TOKENS, BloomFilter, is_revoked, load_filter, record_issued_token, revoke, revoke_user_tokens
+)
+
+
+@pytest.fixture(autouse=True)
+def no_filter(monkeypatch):
+    monkeypatch.setattr(revocation, "_filter", None)
+    monkeypatch.setattr(revocation, "_received_during_load", None)
+
+
+# Teste Unitário para o filtro de Bloom: sem falsos negativos e falsos positivos perto da taxa
+def test_bloom_filter():
+    bloom = BloomFilter(1000, 0.01)
+    for i in range(1000):
+        bloom.add(f"revogado-{i}")
+    assert all(f"revogado-{i}" in bloom for i in range(1000))
+    false_positives = sum(f"valido-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+# Teste Unitário para a consulta: o Redis só é lido quando o filtro não descarta o jti
+def test_is_revoked_checks_redis_only_on_filter_hit(monkeypatch):
+    redis_client = MagicMock(zscore=AsyncMock(return_value=time.time() + 60))
+    monkeypatch.setattr(revocation, "_filter", revocation.new_filter(["revogado"]))
+
+    assert not asyncio.run(is_revoked(redis_client, {"jti": "valido"}))
+    assert not asyncio.run(is_revoked(redis_client, {"sub": "sem-jti"}))
+    redis_client.zscore.assert_not_called()
+
+    assert asyncio.run(is_revoked(redis_client, {"jti": "revogado"}))
+    redis_client.zscore.assert_awaited_once_with(REVOKED_TOKENS, "revogado")
+
+    # Sem filtro (assinatura inativa) todo token é conferido; revogação vencida não conta
+    monkeypatch.setattr(revocation, "_filter", None)
+    redis_client.zscore.return_value = time.time() - 1
+    assert not asyncio.run(is_revoked(redis_client, {"jti": "valido"}))
+    assert redis_client.zscore.await_count == 2
+
+
+# Teste Unitário para a revogação: sorted set com o exp, expiração da chave, filtro e aviso aos workers
+def test_revoke_records_and_publishes(monkeypatch):
+    monkeypatch.setattr(revocation, "_filter", revocation.new_filter())
+    exp = time.time() + 60
+    redis_client = MagicMock(expireat=AsyncMock())
+    pipe = redis_client.pipeline.return_value
+    pipe.execute = AsyncMock(return_value=[1, 0, [(b"abc", exp)]])
+
+    assert asyncio.run(revoke(redis_client, "abc", exp))
+    pipe.zadd.assert_called_once_with(REVOKED_TOKENS, {"abc": exp})
+    redis_client.expireat.assert_awaited_once_with(REVOKED_TOKENS, int(exp) + 1)
+    pipe.publish.assert_called_once_with("token_revocation", "abc")
+    assert "abc" in revocation._filter
+
+    assert not asyncio.run(revoke(redis_client, "velho", time.time() - 1))
+
+    # Token vencido entre o filtro e a remoção dos vencidos: sorted set vazio, sem EXPIREAT
+    pipe.execute.return_value = [1, 1, []]
+    assert asyncio.run(revoke(redis_client, "vencendo", time.time() + 0.001))
+    assert redis_client.expireat.await_count == 1
+
+
+# Teste Unitário para os tokens do usuário: registrados no login até o exp e revogados de uma vez
+def test_revoke_user_tokens(monkeypatch):
+    monkeypatch.setattr(revocation, "_filter", revocation.new_filter())
+    exp = time.time() + 60
+    redis_client = MagicMock(expireat=AsyncMock(), zrem=AsyncMock())
+    pipe = redis_client.pipeline.return_value
+    pipe.execute = AsyncMock(return_value=[1, 0, [(b"abc", exp)]])
+
+    asyncio.run(record_issued_token(redis_client, "ana", "abc", exp))
+    pipe.zadd.assert_called_once_with("issued_tokens:ana", {"abc": exp})
+    redis_client.expireat.assert_awaited_once_with("issued_tokens:ana", int(exp) + 1)
+
+    redis_client.zrangebyscore = AsyncMock(return_value=[(b"abc", exp), (b"def", exp)])
+    assert asyncio.run(revoke_user_tokens(redis_client, "ana")) == 2
+    pipe.zadd.assert_called_with(REVOKED_TOKENS, {"abc": exp, "def": exp})
+    assert pipe.publish.call_count == 2
+    redis_client.zrem.assert_awaited_once_with("issued_tokens:ana", "abc", "def")
+    assert "abc" in revocation._filter and "def" in revocation._filter
+
+    redis_client.zrangebyscore.return_value = []
+    assert asyncio.run(revoke_user_tokens(redis_client, "ana")) == 0
+    assert redis_client.zrem.await_count == 1
+
+
+# Teste Unitário para a recarga: jtis recebidos pelo canal durante a leitura não se perdem
+def test_load_filter_keeps_messages_received_during_load():
+    redis_client = MagicMock()
+
+    def zrangebyscore(*args):
+        revocation._on_revocation({"data": b"durante"})
+        return [b"gravado"]
+
+    redis_client.zrangebyscore.side_effect = zrangebyscore
+    load_filter(redis_client)
+    assert "gravado" in revocation._filter and "durante" in revocation._filter
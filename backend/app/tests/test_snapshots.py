@@ -0,0 +1,66 @@
+import asyncio
+import gzip
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.redis_setting.snapshots import (
+    Snapshot,
+    serialize,
+    load_snapshot_async,
+    snapshot_response,
+    snapshot_key,
+)
+
+
+# Teste Unitário para a serialização compacta da listagem
+def test_serialize():
+    assert serialize(iter([{"name": "Máquina", "status": None}])) == '[{"name":"Máquina","status":null}]'.encode("utf-8")
+
+
+# Teste Unitário para o reaproveitamento do snapshot gravado na mesma versão
+def test_load_snapshot_reuses_current_version():
+    redis_client = MagicMock(spec=["hmget", "hset"])
+    redis_client.hmget = AsyncMock(return_value=[b'"e.1"', b"[]", b""])
+    redis_client.hset = AsyncMock()
+    build = MagicMock()
+
+    snapshot = asyncio.run(load_snapshot_async(redis_client, "machines_list", '"e.1"', build))
+
+    assert snapshot == Snapshot('"e.1"', b"[]", None)
+    build.assert_not_called()
+    redis_client.hset.assert_not_awaited()
+
+
+# Teste Unitário para a regeneração (comprimida) de um snapshot desatualizado
+def test_load_snapshot_rebuilds_stale_version():
+    redis_client = MagicMock(spec=["hmget", "hset"])
+    redis_client.hmget = AsyncMock(return_value=[b'"e.1"', b"[]", b""])
+    redis_client.hset = AsyncMock()
+    items = [{"serial_number": f"SN{i}"} for i in range(10)]
+
+    async def build():
+        for item in items:
+            yield item
+
+    with patch("app.redis_setting.snapshots.Config.SNAPSHOT_MIN_COMPRESS_BYTES", 16):
+        snapshot = asyncio.run(load_snapshot_async(redis_client, "machines_list", '"e.2"', build))
+
+    assert snapshot.encoding == "gzip"
+    assert json.loads(gzip.decompress(snapshot.body)) == items
+    redis_client.hset.assert_awaited_once_with(
+        snapshot_key("machines_list"),
+        mapping={"etag": '"e.2"', "body": snapshot.body, "encoding": "gzip"},
+    )
+
+
+# Teste Unitário para a resposta com e sem suporte a gzip no cliente
+@pytest.mark.parametrize("accept_encoding, content_encoding", [("gzip, deflate", "gzip"), (None, None)])
+def test_snapshot_response(accept_encoding, content_encoding):
+    snapshot = Snapshot('"e.3"', gzip.compress(b"[1,2]"), "gzip")
+
+    response = snapshot_response(snapshot, accept_encoding)
+
+    assert response.headers["ETag"] == '"e.3"'
+    assert response.headers.get("Content-Encoding") == content_encoding
+    body = gzip.decompress(response.body) if content_encoding else response.body
+    assert body == b"[1,2]"
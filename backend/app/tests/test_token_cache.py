@@ -0,0 +1,79 @@
+import asyncio
+import time
+import pytest
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import HTTPException
+from jose import jwt
+from app.auther import token_cache
+from app.auther.auth import create_access_token
+from app.auther.token_cache import cached_user, decode_token
+from app.users import controller
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+# Teste Unitário para o cache dos tokens: verificado uma vez, válido até o exp
+def test_token_verified_once_until_expiry():
+    token = create_access_token({"sub": "ana"})
+    with patch("app.auther.token_cache.jwt.decode", wraps=jwt.decode) as decode:
+        assert decode_token(token)["sub"] == "ana"
+        assert decode_token(token)["sub"] == "ana"
+        assert decode.call_count == 1
+
+    # Payload alterado com a assinatura de um token válido não acerta o cache
+    header, _, signature = token.split(".")
+    forged_payload = create_access_token({"sub": "root"}).split(".")[1]
+    with pytest.raises(jwt.JWTError):
+        decode_token(f"{header}.{forged_payload}.{signature}")
+
+    expired = create_access_token({"sub": "ana"}, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(jwt.ExpiredSignatureError):
+        decode_token(expired)
+    assert token_cache.token_cache.stats()["entries"] == 1
+
+    # O jti vem do parâmetro (ou é gerado), nunca dos dados
+    assert jwt.get_unverified_claims(create_access_token({"sub": "ana"}, jti="abc"))["jti"] == "abc"
+    assert jwt.get_unverified_claims(create_access_token({"sub": "ana", "jti": "abc"}))["jti"] != "abc"
+
+
+# Teste Unitário para o cache dos usuários: uma leitura no Redis por TTL, ausentes não ficam
+def test_user_cached_for_ttl():
+    loader = AsyncMock(return_value={"username": "ana"})
+    assert asyncio.run(cached_user("user:ana", loader)) == {"username": "ana"}
+    assert asyncio.run(cached_user("user:ana", loader)) == {"username": "ana"}
+    assert loader.await_count == 1
+
+    missing = AsyncMock(return_value=None)
+    asyncio.run(cached_user("user:bia", missing))
+    asyncio.run(cached_user("user:bia", missing))
+    assert missing.await_count == 2
+
+    with patch.object(token_cache.user_cache, "ttl", 0):
+        token_cache.user_cache.set("user:ana", {"username": "ana"})
+    time.sleep(0.001)
+    asyncio.run(cached_user("user:ana", loader))
+    assert loader.await_count == 2
+
+
+# Teste Unitário para a dependência: usuário do Redis, 401 sem token e rotas abertas sem AUTH_REQUIRED
+def test_current_user_dependency():
+    token = create_access_token({"sub": "ana"})
+    redis_client = MagicMock(zscore=AsyncMock(return_value=None))
+    with patch.object(controller, "load_record", new=AsyncMock(return_value={"username": "ana"})) as load, \
+         patch("config.Config.AUTH_REQUIRED", True):
+        assert asyncio.run(controller.get_current_user(token, redis_client)) == {"username": "ana"}
+        assert asyncio.run(controller.require_user(token, redis_client)) == {"username": "ana"}
+        assert load.await_count == 1
+
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(controller.require_user(None, redis_client))
+        assert error.value.status_code == 401
+
+        with patch("config.Config.AUTH_REQUIRED", False):
+            assert asyncio.run(controller.require_user(None, redis_client)) is None
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from app.maintenance.models.schemas import GetAllMaintenanceSchema
+from app.tools.controller import _decode_parts
+from app.redis_setting.trusted_reads import (
+    record_shape,
+    read_record,
+    dumps_json,
+    list_response,
+)
+
+MAINTENANCE = {
+    "maintenance_register_id": "9f1c4e0a-4b6e-4c59-9d3a-6a2f0d1b7c11",
+    "problem_description": "Vazamento",
+    "request_date": "2024-01-01",
+    "priority": "Alta",
+    "status": "Aberta",
+    "machine_id": "SN1",
+}
+
+
+# Teste Unitário para a projeção do registro nos campos do schema de resposta
+def test_record_shape_projects_fields():
+    data = dict(MAINTENANCE, extra="ignorado")
+
+    projected = record_shape(GetAllMaintenanceSchema).project(data)
+
+    assert list(projected) == list(GetAllMaintenanceSchema.__fields__)
+    assert projected["assigned_team_id"] is None
+    assert "extra" not in projected
+
+
+# Teste Unitário para a rejeição de registros sem campos obrigatórios
+def test_record_shape_rejects_missing_required():
+    with pytest.raises(ValueError, match="machine_id"):
+        record_shape(GetAllMaintenanceSchema).project(dict(MAINTENANCE, machine_id=None))
+
+
+# Teste Unitário para a validação completa quando a leitura confiável está desligada
+def test_read_record_validates_when_untrusted():
+    with patch("app.redis_setting.trusted_reads.Config.TRUSTED_READS", False):
+        record = read_record(GetAllMaintenanceSchema, MAINTENANCE)
+    assert isinstance(record, GetAllMaintenanceSchema)
+    assert json.loads(dumps_json([record])) == [dict(MAINTENANCE, assigned_team_id=None)]
+
+
+# Teste Unitário para a resposta da listagem mantendo os cabeçalhos já gravados
+def test_list_response_keeps_headers():
+    response = MagicMock()
+    response.headers = {"X-Next-Cursor": "12", "ETag": '"e.1"'}
+
+    result = list_response(iter([{"code": "P1"}]), response)
+
+    assert json.loads(result.body) == [{"code": "P1"}]
+    assert result.headers["X-Next-Cursor"] == "12"
+    assert result.headers["ETag"] == '"e.1"'
+
+
+# Teste Unitário para a listagem de partes: um registro inválido é registrado no log e pulado
+def test_decode_parts_skips_invalid_records():
+    part = {"description": "Rolamento 6204", "location": "A1", "name": "Rolamento", "quantity": 4}
+
+    async def records():
+        yield "parts:P1", dict(part, code="P1")
+        yield "parts:P2", dict(part, code=None)
+        yield "parts:P3", dict(part, code="P3")
+
+    async def decode():
+        return [part async for part in _decode_parts(records())]
+
+    with patch("app.tools.controller.logger") as logger:
+        parts = asyncio.run(decode())
+    assert [part["code"] for part in parts] == ["P1", "P3"]
+    logger.error.assert_called_once()
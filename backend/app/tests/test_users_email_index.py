@@ -0,0 +1,47 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.users.email_index import (
+    check_user_available_async,
+    backfill_email_index,
+    EMAIL_INDEX,
+    USER_CREATED,
+    USERNAME_TAKEN,
+    EMAIL_TAKEN,
+)
+
+
+# Teste Unitário para a verificação de duplicidade sem varrer os usuários
+def test_check_user_available():
+    redis_client = MagicMock()
+    pipe = redis_client.pipeline.return_value
+
+    for existing, expected in (
+        ([0, 0], USER_CREATED),
+        ([1, 0], USERNAME_TAKEN),
+        ([0, 1], EMAIL_TAKEN),
+    ):
+        pipe.execute = AsyncMock(return_value=existing)
+        assert asyncio.run(check_user_available_async(redis_client, "user:a", "a@x.com")) == expected
+
+    pipe.hexists.assert_called_with(EMAIL_INDEX, "a@x.com")
+    assert not redis_client.keys.called
+
+
+# Teste Unitário para o preenchimento do índice a partir dos usuários existentes
+def test_backfill_email_index():
+    redis_client = MagicMock()
+    redis_client.scan_iter.return_value = iter(["user:a", "user:b"])
+    pipe = redis_client.pipeline.return_value
+    pipe.execute.side_effect = [
+        [{b"username": b'"a"', b"email": b'"a@x.com"'}, {b"username": b'"b"'}],
+        [],
+    ]
+
+    assert backfill_email_index(redis_client) == 2
+    pipe.hsetnx.assert_called_once_with(EMAIL_INDEX, "a@x.com", "a")
+    assert not redis_client.keys.called
+
+
+if __name__ == "__main__":
+    pytest.main()
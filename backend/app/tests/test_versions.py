@@ -0,0 +1,52 @@
+import pytest
+from unittest.mock import MagicMock
+from app.redis_setting.versions import (
+    bump_versions,
+    current_etag,
+    etag_matches,
+    not_modified_response,
+    VERSIONS_KEY,
+    ETAG_HEADER,
+)
+
+
+# Teste Unitário para o incremento das versões num único pipeline
+def test_bump_versions():
+    redis_client = MagicMock()
+    pipe = redis_client.pipeline.return_value
+
+    bump_versions(redis_client, "machine:1", "machines_list")
+
+    pipe.hincrby.assert_any_call(VERSIONS_KEY, "machine:1", 1)
+    pipe.hincrby.assert_any_call(VERSIONS_KEY, "machines_list", 1)
+    pipe.execute.assert_called_once()
+
+
+# Teste Unitário para o ETag com a época e a versão da coleção
+def test_current_etag():
+    redis_client = MagicMock()
+    redis_client.hmget.return_value = [b"abc", b"7"]
+    assert current_etag(redis_client, "parts_list") == '"abc.7"'
+
+    redis_client.hmget.return_value = [None, None]
+    redis_client.hget.return_value = b"nova"
+    assert current_etag(redis_client, "parts_list") == '"nova.0"'
+    redis_client.hsetnx.assert_called_once()
+
+
+# Teste Unitário para a comparação com o If-None-Match
+def test_not_modified_response():
+    assert etag_matches('"a.1", W/"b.2"', '"b.2"')
+    assert etag_matches("*", '"b.2"')
+    assert not etag_matches('"a.1"', '"a.2"')
+    assert not etag_matches(None, '"a.2"')
+
+    response = MagicMock()
+    response.headers = {}
+    assert not_modified_response(response, '"a.1"', '"a.1"').status_code == 304
+    assert not_modified_response(response, '"a.1"', '"a.2"') is None
+    assert response.headers[ETAG_HEADER] == '"a.2"'
+
+
+if __name__ == "__main__":
+    pytest.main()
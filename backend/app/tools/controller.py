@@ -3,7 +3,11 @@ from fastapi import (
     Depends,
     HTTPException,
     status,
-    FastAPI
+    FastAPI,
+    Query,
+    Response,
+    Header,
+    Body,
 )
 from .models.schemas import (
     CreatePartsSchema,
@@ -11,14 +15,42 @@ from .models.schemas import (
     UpdatePartsSchema,
     GetAllPartsSchema,
     GetPartsSchema,
+    BulkUpdatePartsSchema,
 )
-import json
 from app.logging.logger import AppLogger
-from app.redis_setting.redis_pool import get_redis_client
+from app.redis_setting.async_pool import (
+    get_redis_client,
+    fetch_collection,
+    fetch_collection_paginated,
+    load_fields,
+    create_record,
+    merge_record,
+    delete_record,
+)
+from app.redis_setting.redis_pool import RECORD_EXISTS, MERGE_NOT_FOUND, DELETE_NOT_FOUND
+from app.redis_setting.replicas import get_read_client
+from app.redis_setting.cluster import record_key
+from app.redis_setting.streaming import wants_ndjson, ndjson_response
+from app.redis_setting.local_cache import cached_async, invalidate_async
+from app.redis_setting.versions import bump_versions_async, current_etag_async, not_modified_response
+from app.redis_setting.snapshots import collection_snapshot_response_async
+from app.redis_setting.trusted_reads import read_record, list_response
+from app.redis_setting.bulk import (
+    BulkItem,
+    BulkResultSchema,
+    bulk_create_async,
+    bulk_update_async,
+    bulk_delete_async,
+    notify_bulk_changes_async,
+)
 import redis
-from typing import List
+import redis.asyncio
+from typing import List, Optional
+from app.users.controller import require_user
+from config import Config
 
-router = APIRouter()
+# Todas as rotas exigem um usuário autenticado (ver Config.AUTH_REQUIRED)
+router = APIRouter(dependencies=[Depends(require_user)])
 logger = AppLogger().get_logger()
 
 
@@ -29,27 +61,86 @@ logger = AppLogger().get_logger()
     response_model=CreatePartsSchema,
     status_code=status.HTTP_201_CREATED
 )
-def post_parts_of_reposition(
+async def post_parts_of_reposition(
     parts_of_reposition: CreatePartsSchema,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
 ) -> CreatePartsSchema:
     logger.info(f"Criando uma nova parte de reposição: {parts_of_reposition.name}")
-    parts_id = f"parts:{parts_of_reposition.code}"
+    parts_id = record_key("parts", parts_of_reposition.code)
 
-    if redis_client.exists(parts_id):
-        raise HTTPException(status_code=400, detail="Parte já registrada.")
+    created = await create_record(redis_client, parts_id, parts_of_reposition.dict(), sets=["parts_list"])
 
-    try:
-        parts_data_json = json.dumps(parts_of_reposition.dict())
-        redis_client.set(parts_id, parts_data_json)
-        redis_client.sadd("parts_list", parts_id)
-    except (ConnectionError, TimeoutError) as e:
-        logger.error(f"Erro ao conectar ao Redis: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    if created == RECORD_EXISTS:
+        raise HTTPException(status_code=400, detail="Parte já registrada.")
+    await invalidate_async(redis_client, parts_id, "parts_list")
+    await bump_versions_async(redis_client, parts_id, "parts_list")
 
     return parts_of_reposition
 
 
+# Endpoints em lote (sincronização com o ERP): o lote inteiro é validado e gravado em pipelines,
+# com um resultado por item. Declarados antes das rotas /parts/{code}.
+@router.post(
+    "/parts/bulk",
+    tags=["Parts Manager"],
+    response_model=BulkResultSchema,
+)
+async def post_parts_of_reposition_bulk(
+    parts_of_reposition: List[CreatePartsSchema] = Body(..., min_items=1, max_items=Config.BULK_MAX_ITEMS),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+) -> BulkResultSchema:
+    logger.info(f"Criando {len(parts_of_reposition)} partes de reposição em lote")
+    items = [
+        BulkItem(part.code, record_key("parts", part.code), part.dict(), {"sets": ["parts_list"]})
+        for part in parts_of_reposition
+    ]
+
+    result, changed = await bulk_create_async(redis_client, items, "Parte já registrada.")
+    await notify_bulk_changes_async(redis_client, changed, "parts_list")
+
+    return result
+
+
+@router.put(
+    "/parts/bulk",
+    tags=["Parts Manager"],
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=BulkResultSchema
+)
+async def update_parts_of_reposition_bulk(
+    updated_parts: List[BulkUpdatePartsSchema] = Body(..., min_items=1, max_items=Config.BULK_MAX_ITEMS),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+) -> BulkResultSchema:
+    logger.info(f"Atualizando {len(updated_parts)} partes de reposição em lote")
+    items = [
+        BulkItem(part.code, record_key("parts", part.code), part.dict(exclude_unset=True, exclude={"code"}))
+        for part in updated_parts
+    ]
+
+    result, changed = await bulk_update_async(redis_client, items, "Parte não encontrada.")
+    await notify_bulk_changes_async(redis_client, changed, "parts_list")
+
+    return result
+
+
+@router.delete(
+    "/parts/bulk",
+    tags=["Parts Manager"],
+    response_model=BulkResultSchema
+)
+async def delete_parts_of_reposition_bulk(
+    codes: List[str] = Body(..., min_items=1, max_items=Config.BULK_MAX_ITEMS),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+) -> BulkResultSchema:
+    logger.info(f"Deletando {len(codes)} partes de reposição em lote")
+    items = [BulkItem(code, record_key("parts", code), options={"sets": ["parts_list"]}) for code in codes]
+
+    result, changed = await bulk_delete_async(redis_client, items, "Parte não encontrada.")
+    await notify_bulk_changes_async(redis_client, changed, "parts_list")
+
+    return result
+
+
 # Endpoint para atualizar uma parte existente
 @router.put(
     "/parts/{code}",
@@ -57,27 +148,27 @@ def post_parts_of_reposition(
     status_code=status.HTTP_202_ACCEPTED,
     response_model=UpdatePartsSchema
 )
-def update_parts_of_reposition(
+async def update_parts_of_reposition(
     code: str,
     updated_part: UpdatePartsSchema,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
 ) -> UpdatePartsSchema:
     logger.info(f"Atualizando parte de reposição com código: {code}")
-    parts_id = f"parts:{code}"
-
-    if not redis_client.exists(parts_id):
-        raise HTTPException(status_code=404, detail="Parte não encontrada.")
+    parts_id = record_key("parts", code)
 
     try:
-        # Obtém os dados existentes e atualiza com os novos valores
-        existing_data = json.loads(redis_client.get(parts_id).decode("utf-8"))
-        updated_data = updated_part.dict(exclude_unset=True)  # Atualiza apenas os campos enviados
-        existing_data.update(updated_data)
-        redis_client.set(parts_id, json.dumps(existing_data))
-    except (json.JSONDecodeError, ConnectionError, TimeoutError) as e:
+        # Mescla no Redis apenas os campos enviados
+        updated_data = updated_part.dict(exclude_unset=True)
+        result, existing_data = await merge_record(redis_client, parts_id, updated_data)
+    except redis.ResponseError as e:
         logger.error(f"Erro ao atualizar parte: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
+    if result == MERGE_NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Parte não encontrada.")
+    await invalidate_async(redis_client, parts_id, "parts_list")
+    await bump_versions_async(redis_client, parts_id, "parts_list")
+
     return UpdatePartsSchema(**existing_data)
 
 
@@ -87,46 +178,68 @@ def update_parts_of_reposition(
     tags=["Parts Manager"],
     status_code=status.HTTP_204_NO_CONTENT
 )
-def delete_parts_of_reposition(
+async def delete_parts_of_reposition(
     code: str,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
 ) -> None:
     logger.info(f"Deletando parte de reposição com código: {code}")
-    parts_id = f"parts:{code}"
+    parts_id = record_key("parts", code)
 
-    if not redis_client.exists(parts_id):
+    # Registro e entrada na lista removidos atomicamente (script de remoção)
+    if await delete_record(redis_client, parts_id, sets=["parts_list"]) == DELETE_NOT_FOUND:
         raise HTTPException(status_code=404, detail="Parte não encontrada.")
+    await invalidate_async(redis_client, parts_id, "parts_list")
+    await bump_versions_async(redis_client, parts_id, "parts_list")
 
-    try:
-        redis_client.delete(parts_id)
-        redis_client.srem("parts_list", parts_id)
-    except (ConnectionError, TimeoutError) as e:
-        logger.error(f"Erro ao conectar ao Redis: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+
+# Converte os registros de partes lidos do Redis
+async def _decode_parts(records):
+    async for key, part_data in records:
+        try:
+            yield read_record(GetAllPartsSchema, part_data)
+        except ValueError as e:
+            logger.error(f"Erro ao decodificar os dados da parte: {str(e)}")
 
 
 # Endpoint para obter todas as partes registradas
+# (Accept: application/x-ndjson envia uma parte por linha, em streaming)
+# A lista completa é servida do snapshot pré-serializado; páginas e streaming leem direto do Redis
 @router.get(
     "/parts",
     tags=["Parts Manager"],
     response_model=List[GetAllPartsSchema]
 )
-def get_all_parts(
-    redis_client: redis.Redis = Depends(get_redis_client)
+async def get_all_parts(
+    response: Response,
+    cursor: Optional[int] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=Config.MAX_PAGE_SIZE),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    redis_client: redis.asyncio.Redis = Depends(get_read_client)
 ) -> List[GetAllPartsSchema]:
     logger.info("Obtendo todas as partes de reposição")
+    stream = wants_ndjson(accept)
 
-    try:
-        parts_keys = redis_client.smembers("parts_list")
-        parts_list = []
-
-        for key in parts_keys:
-            part_data = redis_client.get(key)
-            if part_data:
-                parts_list.append(GetAllPartsSchema(**json.loads(part_data.decode("utf-8"))))
-    except (ConnectionError, TimeoutError) as e:
-        logger.error(f"Erro ao conectar ao Redis: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    # ETag da coleção: 304 sem ler os registros se o cliente já tem a versão atual
+    if not stream:
+        etag = await current_etag_async(redis_client, "parts_list")
+        not_modified = not_modified_response(response, if_none_match, etag)
+        if not_modified:
+            return not_modified
+    if cursor is None and limit is None and not stream:
+        return await collection_snapshot_response_async(
+            redis_client,
+            "parts_list",
+            etag,
+            lambda: _decode_parts(fetch_collection(redis_client, "parts_list")),
+            accept_encoding,
+        )
+    records = await fetch_collection_paginated(redis_client, "parts_list", response, cursor, limit, stream)
+    parts_list = _decode_parts(records)
+    if stream:
+        return ndjson_response(parts_list, headers=response.headers)
+    parts_list = list_response([part async for part in parts_list], response)
 
     return parts_list
 
@@ -138,20 +251,30 @@ def get_all_parts(
     response_model=GetPartsSchema,
     status_code=status.HTTP_200_OK
 )
-def get_part_by_code(
+async def get_part_by_code(
     code: str,
-    redis_client: redis.Redis = Depends(get_redis_client)
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    redis_client: redis.asyncio.Redis = Depends(get_read_client)
 ) -> GetPartsSchema:
     logger.info(f"Obtendo parte de reposição com código: {code}")
-    parts_id = f"parts:{code}"
+    parts_id = record_key("parts", code)
 
-    try:
-        part_data = redis_client.get(parts_id)
+    async def load_part():
+        # Lê apenas o campo usado pela resposta
+        part_data = await load_fields(redis_client, parts_id, ["code"])
         if not part_data:
             raise HTTPException(status_code=404, detail="Parte não encontrada.")
 
-        return GetPartsSchema(**json.loads(part_data.decode("utf-8")))
-    except (ConnectionError, TimeoutError, json.JSONDecodeError) as e:
+        return GetPartsSchema(**part_data)
+
+    try:
+        etag = await current_etag_async(redis_client, parts_id)
+        not_modified = not_modified_response(response, if_none_match, etag)
+        if not_modified:
+            return not_modified
+        return await cached_async(parts_id, load_part, etag)
+    except ValueError as e:
         logger.error(f"Erro ao obter parte: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
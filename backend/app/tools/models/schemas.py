@@ -23,6 +23,10 @@ class UpdatePartsSchema(BaseModel):
     quantity: Optional [int] = None
 
 
+class BulkUpdatePartsSchema(UpdatePartsSchema):
+    code: str
+
+
 class DeletePartsSchema(BaseModel):
     code: str
 
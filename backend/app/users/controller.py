@@ -1,13 +1,14 @@
 from app.auther.auth import (
-    verify_password,
     SECRET_KEY,
     ALGORITHM,
     oauth2_scheme,
+    optional_oauth2_scheme,
     create_access_token,
-    get_password_hash,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
-import json
+from app.auther.hashing import hash_password, verify_password
+from app.auther.token_cache import cached_user, decode_token
+from app.auther.revocation import is_revoked, record_issued_token
 from fastapi import (
     Depends,
     HTTPException,
@@ -33,15 +34,30 @@ from datetime import (
     datetime,
     timedelta
 )
-from app.redis_setting.redis_pool import (
-    get_redis_client
+from typing import Optional
+from uuid import uuid4
+import time
+from app.redis_setting.async_pool import (
+    get_redis_client,
+    load_record,
+    load_fields,
+    merge_record,
 )
 import redis
+import redis.asyncio
 from fastapi import (
     APIRouter,
     FastAPI
 )
+from app.redis_setting.cluster import record_key
+from app.redis_setting.versions import bump_versions_async
 from config import Config
+from .email_index import (
+    check_user_available_async,
+    claim_user_async,
+    USERNAME_TAKEN,
+    EMAIL_TAKEN,
+)
 
 router = APIRouter()
 
@@ -49,47 +65,76 @@ logger = AppLogger().get_logger()
 
 
 # Função para obter o usuário
-def get_user(username: str):
-    user_id = f"user:{username}"
-    user_data = get_redis_client.get(user_id)
-    if user_data:
-        return json.loads(user_data.decode('utf-8'))
-    return None
+async def get_user(redis_client, username: str):
+    user_id = record_key("user", username)
+    return await load_record(redis_client, user_id)
+
+
+# Confere a senha no pool do bcrypt e, se o hash gravado usa outro custo, grava o hash novo
+async def check_password(redis_client, user_id, password, password_hash):
+    valid, new_hash = await verify_password(password, password_hash)
+    if valid and new_hash is not None:
+        try:
+            await merge_record(redis_client, user_id, {"password": new_hash})
+            logger.info(f"Hash da senha de {user_id} refeito com o custo atual do bcrypt")
+        except redis.RedisError as e:
+            logger.warning(f"Não foi possível regravar o hash da senha de {user_id}: {str(e)}")
+    return valid
 
 
-# Função para autenticar o usuário
-def authenticate_user(username: str, password: str):
-    user = get_user(username)
+# Função para autenticar o usuário (o bcrypt roda fora do worker)
+async def authenticate_user(redis_client, username: str, password: str):
+    user = await get_user(redis_client, username)
     if not user:
         return False
-    if not verify_password(password, user["password"]):
+    if not await check_password(redis_client, record_key("user", username), password, user["password"]):
         return False
     return user
 
 
-# Função para obter o usuário atual
-def get_current_user(
-    token: str = Depends(oauth2_scheme)
+# Função para obter o usuário atual: token verificado e usuário vêm dos caches do processo
+# (app/auther/token_cache.py) e só o primeiro uso de cada um paga a verificação e o Redis.
+# A revogação é conferida a cada uso (app/auther/revocation.py)
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Não foi possível validar as credenciais",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = get_user(username=token_data.username)
+    # Token revogado: o filtro local descarta quase todos os não revogados sem ir ao Redis
+    if await is_revoked(redis_client, payload):
+        raise credentials_exception
+    user_id = record_key("user", token_data.username)
+    user = await cached_user(user_id, lambda: get_user(redis_client, username=token_data.username))
     if user is None:
         raise credentials_exception
     return user
 
 
+# Dependência dos routers protegidos (máquinas, manutenções, equipes e peças); com
+# Config.AUTH_REQUIRED desligado as rotas ficam abertas
+async def require_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
+):
+    if not Config.AUTH_REQUIRED:
+        return None
+    return await get_current_user(token, redis_client)
+
+
 from fastapi import Form
 
 @router.post(
@@ -97,81 +142,96 @@ from fastapi import Form
     tags=["User Management"],
     status_code=status.HTTP_201_CREATED
 )
-def create_user_account(
+async def create_user_account(
     username: str = Form(...),
     password: str = Form(...),
     email: str = Form(...),
-    redis_client: redis.StrictRedis = Depends(get_redis_client)
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
 ):
-    user_id = f"user:{username}"
+    user_id = record_key("user", username)
 
-    # Verificar duplicidade de usuário ou e-mail
-    if redis_client.get(user_id):
-        raise HTTPException(status_code=400, detail="Usuário já registrado.")
-    if any(
-    u.get("email") == email
-        for v in redis_client.mget(redis_client.keys("user:*")) if v
-        for u in [json.loads(v)] if "email" in u
-    ):
-        raise HTTPException(status_code=400, detail="E-mail já registrado.")
+    # Verificar duplicidade de usuário ou e-mail (índice de e-mails, sem varrer os usuários)
+    # antes de calcular o hash da senha
+    _raise_if_taken(await check_user_available_async(redis_client, user_id, email))
 
-    # Criar usuário
-    user_data = {"username": username, "password": get_password_hash(password), "email": email}
-    redis_client.set(user_id, json.dumps(user_data))
+    # Criar usuário: a chave do usuário e o e-mail são reservados atomicamente
+    # (o hash da senha é calculado no pool do bcrypt, fora do worker)
+    password_hash = await hash_password(password)
+    user_data = {"username": username, "password": password_hash, "email": email}
+    _raise_if_taken(await claim_user_async(redis_client, user_id, username, email, user_data))
+    await bump_versions_async(redis_client, user_id)
 
     return {"username": username, "email": email}
 
+def _raise_if_taken(result):
+    if result == USERNAME_TAKEN:
+        raise HTTPException(status_code=400, detail="Usuário já registrado.")
+    if result == EMAIL_TAKEN:
+        raise HTTPException(status_code=400, detail="E-mail já registrado.")
+
+
 # Endpoint para fazer login e obter o token de acesso
 @router.post(
     "/token",
     tags=["User Management"],
     response_model=Token
 )
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    redis_client: redis.Redis = Depends(get_redis_client)
+    redis_client: redis.asyncio.Redis = Depends(get_redis_client)
 ) -> Token:
     logger.info(f"Usuário tentando fazer login: {form_data.username}")
-    user_id = f"user:{form_data.username}"
+    user_id = record_key("user", form_data.username)
 
+    # Lê apenas os campos usados no login
     try:
-        user_data = redis_client.get(user_id)
-        if not user_data:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Usuário ou senha incorretos",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        user = await load_fields(redis_client, user_id, ["username", "password"])
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao decodificar os dados do usuário: {str(e)}")
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuário ou senha incorretos",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
-        try:
-            user = json.loads(user_data.decode('utf-8'))
-            if not isinstance(user, dict):
-                raise ValueError(f"Formato inválido de dados: {user}")
-
-            if not verify_password(form_data.password, user["password"]):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Usuário ou senha incorretos",
-                    headers={"WWW-Authenticate": "Bearer"},
-                )
-
-        except (json.JSONDecodeError, ValueError) as e:
-            raise HTTPException(status_code=500, detail=f"Erro ao decodificar os dados do usuário: {str(e)}")
-
-        # Gerar o token de acesso
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": user["username"]}, expires_delta=access_token_expires
+    if not await check_password(redis_client, user_id, form_data.password, user["password"]):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuário ou senha incorretos",
+            headers={"WWW-Authenticate": "Bearer"},
         )
 
-        return {"access_token": access_token, "token_type": "bearer"}
+    # Gerar o token de acesso
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    jti = uuid4().hex
+    access_token = create_access_token(
+        data={"sub": user["username"]}, expires_delta=access_token_expires, jti=jti
+    )
+    # jti registrado por usuário para as revogações (ver app/auther/revocation.py); o exp do
+    # token é truncado para segundos, então este nunca vence antes dele
+    await record_issued_token(
+        redis_client, user["username"], jti, time.time() + access_token_expires.total_seconds()
+    )
 
-    except (ConnectionError, TimeoutError) as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao conectar ao Redis: {str(e)}")
+    return {"access_token": access_token, "token_type": "bearer"}
 
 
+# Endpoint com os dados do usuário autenticado
+@router.get(
+    "/users/me",
+    tags=["User Management"]
+)
+async def read_current_user(user: dict = Depends(get_current_user)):
+    return {"username": user["username"], "email": user.get("email")}
+
 
 def configure(
     app: FastAPI
 ):
+    if not Config.AUTH_REQUIRED:
+        logger.warning(
+            "AUTH_REQUIRED desligado: as rotas de máquinas, manutenções, equipes e peças aceitam "
+            "requisições sem token. O padrão passa a ser ligado na próxima versão."
+        )
     app.include_router(router)
\ No newline at end of file
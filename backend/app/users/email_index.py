@@ -0,0 +1,95 @@
+# Índice de e-mails dos usuários.
+#
+# O hash "users_email_index" mapeia e-mail -> nome de usuário, para que o cadastro verifique
+# duplicidade com um HEXISTS em vez de ler todos os "user:*". O usuário e o e-mail são
+# reservados juntos por create_record, então dois cadastros simultâneos não passam ambos.
+#
+# No modo cluster o hash é dividido em buckets pelo e-mail ("users_email_index:{email.7}") e
+# fica num slot diferente do usuário: o e-mail é reservado primeiro (HSETNX) e a reserva é
+# desfeita se o nome de usuário já existir.
+#
+# Preenchimento do índice a partir dos usuários existentes (a partir da pasta backend):
+#   python -m app.users.email_index backfill
+import sys
+
+from app.logging.logger import AppLogger
+from app.redis_setting import async_pool, cluster
+from app.redis_setting.cluster import bucket_of, bucket_tag, bucketed
+from app.redis_setting.redis_pool import (
+    get_redis_client,
+    fetch_many,
+    chunked,
+    RECORD_CREATED,
+    RECORD_EXISTS,
+    CLAIM_TAKEN,
+)
+from config import Config
+
+logger = AppLogger().get_logger()
+
+EMAIL_INDEX = "users_email_index"
+
+# Resultados da reserva
+USER_CREATED = RECORD_CREATED
+USERNAME_TAKEN = RECORD_EXISTS
+EMAIL_TAKEN = CLAIM_TAKEN
+
+
+# Hash do índice que guarda o e-mail (o do bucket do e-mail no cluster)
+def email_index_key(email):
+    if not cluster.enabled():
+        return EMAIL_INDEX
+    return bucketed(EMAIL_INDEX, bucket_tag("email", bucket_of(email)))
+
+
+# Verificação prévia (um round trip) para recusar duplicados antes de calcular o hash da senha
+async def check_user_available_async(redis_client, user_id, email):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.exists(user_id)
+    pipe.hexists(email_index_key(email), email)
+    user_exists, email_exists = await pipe.execute()
+    if user_exists:
+        return USERNAME_TAKEN
+    if email_exists:
+        return EMAIL_TAKEN
+    return USER_CREATED
+
+
+# Grava o usuário e reserva o e-mail atomicamente
+async def claim_user_async(redis_client, user_id, username, email, user_data):
+    if cluster.enabled():
+        index = email_index_key(email)
+        if not await redis_client.hsetnx(index, email, username):
+            return EMAIL_TAKEN
+        result = await async_pool.create_record(redis_client, user_id, user_data)
+        if result != USER_CREATED:
+            await redis_client.hdel(index, email)
+        return result
+    return await async_pool.create_record(
+        redis_client,
+        user_id,
+        user_data,
+        claims={EMAIL_INDEX: (email, username)},
+    )
+
+
+# Preenche o índice com os e-mails dos usuários já cadastrados (SCAN + leitura em lote)
+def backfill_email_index(redis_client):
+    total = 0
+    keys = redis_client.scan_iter("user:*", count=1000)
+    for chunk in chunked(fetch_many(redis_client, keys), Config.REDIS_BULK_CHUNK_SIZE):
+        pipe = redis_client.pipeline(transaction=False)
+        for key, user in chunk:
+            if user.get("email") and user.get("username"):
+                pipe.hsetnx(email_index_key(user["email"]), user["email"], user["username"])
+        pipe.execute()
+        total += len(chunk)
+        logger.info(f"{total} usuários processados")
+    return total
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["backfill"]:
+        print("Uso: python -m app.users.email_index backfill")
+        sys.exit(1)
+    backfill_email_index(get_redis_client())
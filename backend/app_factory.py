@@ -61,6 +61,7 @@ def create_app() -> FastAPI:
         "allow_credentials": True,
         "allow_methods": ["*"],
         "allow_headers": ["*"],
+        "expose_headers": ["X-Next-Cursor", "ETag", "X-Read-Your-Writes"],  # Cursor da próxima página, versão das listagens e janela de leitura no primário
     }
 
     app.add_middleware(
@@ -69,6 +70,7 @@ def create_app() -> FastAPI:
         allow_credentials=CORS_SETTINGS["allow_credentials"],
         allow_methods=CORS_SETTINGS["allow_methods"],
         allow_headers=CORS_SETTINGS["allow_headers"],
+        expose_headers=CORS_SETTINGS["expose_headers"],
         max_age=30,
     )
 
@@ -84,11 +86,23 @@ def create_app() -> FastAPI:
     from app.teams import controller as teams_router
     from app.users import controller as users_router
     from app.tools import controller as tools_router
+    from app.auther import hashing, token_cache, revocation
+    from app.redis_setting import local_cache, client_tracking, backup, connection_pool, async_pool, replicas, resilience
 
     machine_router.configure(app)
     maintenance_router.configure(app)
     teams_router.configure(app)
     users_router.configure(app)
-    tools_router.configure(app)                                                                                                                                                                                                                                                                                                                                                                 
+    tools_router.configure(app)
+    local_cache.configure(app)
+    client_tracking.configure(app)
+    backup.configure(app)
+    connection_pool.configure(app)
+    async_pool.configure(app)
+    replicas.configure(app)
+    resilience.configure(app)
+    hashing.configure(app)
+    token_cache.configure(app)
+    revocation.configure(app)                                                                                                                                                                                                                                                                                                                                                                 
 
     return app
@@ -0,0 +1,48 @@
+# Backup e restauração de todos os registros pela linha de comando (ver app/redis_setting/backup.py).
+#
+# Uso (a partir da pasta backend):
+#   python backup.py dump backup.ndjson.gz
+#   python backup.py dump backup.msgpack.gz --format msgpack
+#   python backup.py restore backup.ndjson.gz
+#
+# O formato é deduzido do nome do arquivo (".msgpack.gz" ou ".ndjson.gz") quando --format
+# não é informado.
+import argparse
+import sys
+
+from app.redis_setting.backup import (
+    NDJSON_FORMAT,
+    MSGPACK_FORMAT,
+    BACKUP_FORMATS,
+    dump_backup,
+    read_backup,
+    restore_backup,
+)
+from app.redis_setting.redis_pool import get_redis_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup e restauração dos registros do Redis")
+    parser.add_argument("command", choices=["dump", "restore"])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=BACKUP_FORMATS, default=None)
+    args = parser.parse_args()
+
+    backup_format = args.format or (MSGPACK_FORMAT if ".msgpack" in args.path else NDJSON_FORMAT)
+    redis_client = get_redis_client()
+    try:
+        if args.command == "dump":
+            with open(args.path, "wb") as out:
+                total = dump_backup(redis_client, out, backup_format)
+            print(f"{total} registros exportados para {args.path}")
+        else:
+            with open(args.path, "rb") as source:
+                total = restore_backup(redis_client, read_backup(source, backup_format))
+            print(f"{total} registros restaurados de {args.path}")
+    except ValueError as e:
+        print(f"Erro: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# Benchmark de carga das rotas síncronas (def, executadas no pool de threads do FastAPI) contra
+# as assíncronas (async def com redis.asyncio), em GET /parts/{code} e numa página de
+# GET /parts. As duas versões fazem o mesmo trabalho (ETag + leitura do registro); a
+# síncrona é montada aqui com as funções de redis_pool.py, a assíncrona é a rota da aplicação.
+#
+# Para cada nível de concorrência são disparadas --requests requisições com no máximo N em voo,
+# medindo req/s, p50 e p99. As rotas síncronas ficam limitadas pelas threads do pool (40 por
+# padrão, --threads muda o limite); com --latency-ms as conexões passam por um proxy local que
+# atrasa cada resposta do Redis, simulando a latência de rede em que as threads ficam presas.
+#
+# Uso (a partir da pasta backend, com um Redis acessível; use um banco separado com --db):
+#   python -m benchmarks.bench_async --host localhost --db 15 --levels 10,50,100,200 --latency-ms 2
+#
+# As partes são gravadas com o código "BENCH-<n>" e removidas ao final.
+import argparse
+import asyncio
+import random
+import statistics
+import threading
+import time
+from typing import Optional
+
+import anyio.to_thread
+import httpx
+import redis
+from fastapi import FastAPI, Header, HTTPException, Response
+
+from app.logging.logger import AppLogger
+from app.tools.models.schemas import GetPartsSchema, GetAllPartsSchema
+from app.redis_setting import async_pool
+from app.redis_setting.connection_pool import create_pool
+from app.redis_setting.redis_pool import (
+    chunked,
+    create_record,
+    fetch_collection_page,
+    load_fields,
+)
+from app.redis_setting.trusted_reads import read_record
+from app.redis_setting.versions import current_etag, not_modified_response
+from app_factory import create_app
+from config import Config
+
+logger = AppLogger().get_logger()
+
+PREFIX = "BENCH-"
+
+
+def populate(redis_client, size):
+    keys = []
+    for i in range(size):
+        code = f"{PREFIX}{i:07d}"
+        data = {"code": code, "description": f"Parte {i}", "location": "Almoxarifado", "name": "Rolamento", "quantity": i}
+        create_record(redis_client, f"parts:{code}", data, sets=["parts_list"])
+        keys.append(f"parts:{code}")
+    return keys
+
+
+def cleanup(redis_client, keys):
+    for chunk in chunked(keys, 1000):
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.srem("parts_list", *chunk)
+        pipe.delete(*chunk)
+        pipe.execute()
+
+
+# Proxy TCP que atrasa cada bloco vindo do Redis, num event loop próprio
+def start_latency_proxy(host, port, latency):
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    address = {}
+
+    async def pipe(reader, writer, delay):
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                if delay:
+                    await asyncio.sleep(delay)
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(client_reader, client_writer):
+        server_reader, server_writer = await asyncio.open_connection(host, port)
+        asyncio.ensure_future(pipe(client_reader, server_writer, 0))
+        asyncio.ensure_future(pipe(server_reader, client_writer, latency))
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        address["port"] = server.sockets[0].getsockname()[1]
+        ready.set()
+        await server.serve_forever()
+
+    threading.Thread(target=loop.run_until_complete, args=(serve(),), daemon=True).start()
+    ready.wait()
+    return address["port"]
+
+
+# As mesmas rotas em def, sobre o pool síncrono
+def create_sync_app(pool):
+    app = FastAPI()
+
+    @app.get("/parts/{code}")
+    def get_part_by_code(code: str, response: Response, if_none_match: Optional[str] = Header(None)):
+        logger.info(f"Obtendo parte de reposição com código: {code}")
+        redis_client = redis.Redis(connection_pool=pool)
+        parts_id = f"parts:{code}"
+        not_modified = not_modified_response(response, if_none_match, current_etag(redis_client, parts_id))
+        if not_modified:
+            return not_modified
+        part_data = load_fields(redis_client, parts_id, ["code"])
+        if not part_data:
+            raise HTTPException(status_code=404, detail="Parte não encontrada.")
+        return GetPartsSchema(**part_data)
+
+    @app.get("/parts")
+    def get_all_parts(response: Response, cursor: int = 0, limit: int = 50):
+        logger.info("Obtendo todas as partes de reposição")
+        redis_client = redis.Redis(connection_pool=pool)
+        response.headers["ETag"] = current_etag(redis_client, "parts_list")
+        next_cursor, records = fetch_collection_page(redis_client, "parts_list", cursor, limit)
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+        return [read_record(GetAllPartsSchema, data) for key, data in records]
+
+    return app
+
+
+async def run_level(app, urls, concurrency, requests):
+    latencies, errors = [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        async def one(url):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    response.raise_for_status()
+                except (httpx.HTTPError, redis.RedisError):
+                    errors += 1
+                    return
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(one(random.choice(urls)) for _ in range(min(concurrency, requests))))
+        start = time.perf_counter()
+        latencies.clear()
+        await asyncio.gather(*(one(random.choice(urls)) for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, latencies, errors
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def benchmark(apps, urls, levels, requests):
+    print(f"{'rota':<6} | {'concorrência':>12} | {'req/s':>8} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'erros':>5}")
+    for concurrency in levels:
+        for name, app in apps:
+            rate, latencies, errors = await run_level(app, urls, concurrency, requests)
+            p50 = statistics.median(latencies) * 1000 if latencies else float("nan")
+            p99 = percentile(latencies, 0.99) * 1000
+            print(f"{name:<6} | {concurrency:>12} | {rate:>8.1f} | {p50:>9.2f} | {p99:>9.2f} | {errors:>5}")
+    await async_pool.stop_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das rotas síncronas contra as assíncronas")
+    parser.add_argument("--host", default=Config.REDIS_HOST)
+    parser.add_argument("--port", type=int, default=Config.REDIS_PORT)
+    parser.add_argument("--db", type=int, default=Config.REDIS_DB)
+    parser.add_argument("--records", type=int, default=1_000)
+    parser.add_argument("--requests", type=int, default=2_000, help="requisições por nível e rota")
+    parser.add_argument("--levels", default="10,50,100,200", help="níveis de concorrência")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="atraso de cada resposta do Redis")
+    parser.add_argument("--threads", type=int, default=None, help="threads do pool das rotas síncronas")
+    parser.add_argument("--page", action="store_true", help="usa GET /parts?limit=50 em vez de um registro")
+    args = parser.parse_args()
+    # As duas versões sem autenticação (a rota síncrona montada aqui não tem)
+    Config.AUTH_REQUIRED = False
+    levels = [int(level) for level in args.levels.split(",")]
+
+    redis_client = redis.Redis(host=args.host, port=args.port, db=args.db)
+    keys = populate(redis_client, args.records)
+    try:
+        Config.REDIS_DB = args.db
+        Config.REDIS_HOST, Config.REDIS_PORT = args.host, args.port
+        if args.latency_ms:
+            Config.REDIS_HOST = "127.0.0.1"
+            Config.REDIS_PORT = start_latency_proxy(args.host, args.port, args.latency_ms / 1000)
+        # Os dois pools recebem o mesmo limite de conexões, vindo do Config
+        apps = [("sync", create_sync_app(create_pool())), ("async", create_app())]
+        if args.page:
+            urls = ["/parts?limit=50"]
+        else:
+            urls = [f"/parts/{key.split(':', 1)[1]}" for key in keys]
+
+        async def run():
+            if args.threads:
+                anyio.to_thread.current_default_thread_limiter().total_tokens = args.threads
+            threads = anyio.to_thread.current_default_thread_limiter().total_tokens
+            print(
+                f"threads do pool: {threads}, conexões por pool: {Config.REDIS_MAX_CONNECTIONS}, "
+                f"latência extra: {args.latency_ms} ms"
+            )
+            await benchmark(apps, urls, levels, args.requests)
+
+        asyncio.run(run())
+    finally:
+        cleanup(redis_client, keys)
+
+
+if __name__ == "__main__":
+    main()
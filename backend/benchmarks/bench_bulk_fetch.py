@@ -0,0 +1,112 @@
+# Benchmark da leitura de coleções: um HGETALL por chave vs. pipeline em blocos (fetch_collection).
+#
+# Uso (a partir da pasta backend, com um Redis acessível):
+#   python -m benchmarks.bench_bulk_fetch --host localhost --sizes 1000 10000 100000
+#
+# Os registros são gravados sob o prefixo "bench:" e removidos ao final.
+import argparse
+import time
+
+import redis
+
+from app.redis_setting.redis_pool import chunked, fetch_collection, encode_fields, decode_fields
+from config import Config
+
+LIST_NAME = "bench:machines_list"
+
+
+class CountingRedis(redis.Redis):
+    # Conta cada comando enviado ao servidor (um round trip por comando fora de pipeline)
+    round_trips = 0
+
+    def execute_command(self, *args, **options):
+        self.round_trips += 1
+        return super().execute_command(*args, **options)
+
+    # Um pipeline executado é um único round trip, qualquer que seja o nº de comandos
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        execute = pipe.execute
+
+        def counted_execute(*args, **kwargs):
+            self.round_trips += 1
+            return execute(*args, **kwargs)
+
+        pipe.execute = counted_execute
+        return pipe
+
+
+def populate(redis_client, size):
+    for chunk in chunked(range(size), 1000):
+        pipe = redis_client.pipeline(transaction=False)
+        for i in chunk:
+            key = f"bench:machine:SN{i:07d}"
+            pipe.hset(key, mapping=encode_fields({
+                "name": f"Maquina {i}",
+                "type": "Industrial",
+                "model": "Mod-XYZ",
+                "serial_number": f"SN{i:07d}",
+                "location": "Linha de produção A",
+                "maintenance_history": [],
+                "status": "operando",
+            }))
+            pipe.sadd(LIST_NAME, key)
+        pipe.execute()
+
+
+def cleanup(redis_client):
+    for chunk in chunked(redis_client.sscan_iter(LIST_NAME, count=1000), 1000):
+        redis_client.delete(*chunk)
+    redis_client.delete(LIST_NAME)
+
+
+def read_one_by_one(redis_client):
+    records = []
+    for key in redis_client.smembers(LIST_NAME):
+        data = redis_client.hgetall(key)
+        if data:
+            records.append(decode_fields(data))
+    return records
+
+
+def read_in_bulk(redis_client, chunk_size):
+    return [record for _, record in fetch_collection(redis_client, LIST_NAME, chunk_size)]
+
+
+def measure(redis_client, reader, *args):
+    redis_client.round_trips = 0
+    start = time.perf_counter()
+    records = reader(redis_client, *args)
+    elapsed = time.perf_counter() - start
+    return len(records), redis_client.round_trips, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de leitura em lote no Redis")
+    parser.add_argument("--host", default=Config.REDIS_HOST)
+    parser.add_argument("--port", type=int, default=Config.REDIS_PORT)
+    parser.add_argument("--db", type=int, default=Config.REDIS_DB)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--chunk-size", type=int, default=Config.REDIS_BULK_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    redis_client = CountingRedis(host=args.host, port=args.port, db=args.db)
+
+    print(f"{'registros':>10} | {'modo':<17} | {'round trips':>11} | {'tempo (ms)':>10}")
+    for size in args.sizes:
+        cleanup(redis_client)
+        populate(redis_client, size)
+        try:
+            for label, reader, extra in (
+                ("HGETALL por chave", read_one_by_one, ()),
+                ("pipeline em lote", read_in_bulk, (args.chunk_size,)),
+            ):
+                count, round_trips, elapsed = measure(redis_client, reader, *extra)
+                assert count == size, f"esperado {size} registros, lidos {count}"
+                print(f"{size:>10} | {label:<17} | {round_trips:>11} | {elapsed * 1000:>10.1f}")
+        finally:
+            cleanup(redis_client)
+
+
+if __name__ == "__main__":
+    main()
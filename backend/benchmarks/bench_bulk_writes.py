@@ -0,0 +1,73 @@
+# Benchmark da sincronização de peças: uma requisição POST /parts por item vs. POST /parts/bulk
+# (lote validado de uma vez e gravado em pipelines).
+#
+# Uso (a partir da pasta backend, com um Redis acessível):
+#   python -m benchmarks.bench_bulk_writes --host localhost --items 10000
+#
+# As peças são gravadas com o prefixo de código "BENCH-" e removidas com DELETE /parts/bulk.
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+from app.redis_setting.redis_pool import chunked
+from app_factory import create_app
+from config import Config
+
+
+def parts(size, run):
+    return [
+        {
+            "code": f"BENCH-{run}-{i:07d}",
+            "description": "Peça de benchmark",
+            "location": "Almoxarifado",
+            "name": f"Peça {i}",
+            "quantity": i % 100,
+        }
+        for i in range(size)
+    ]
+
+
+def one_by_one(client, items):
+    for item in items:
+        client.post("/parts", json=item).raise_for_status()
+
+
+def in_bulk(client, items):
+    for batch in chunked(items, Config.BULK_MAX_ITEMS):
+        client.post("/parts/bulk", json=batch).raise_for_status()
+
+
+def cleanup(client, items):
+    for batch in chunked([item["code"] for item in items], Config.BULK_MAX_ITEMS):
+        client.request("DELETE", "/parts/bulk", json=batch).raise_for_status()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das rotas em lote")
+    parser.add_argument("--host", default=Config.REDIS_HOST)
+    parser.add_argument("--port", type=int, default=Config.REDIS_PORT)
+    parser.add_argument("--db", type=int, default=Config.REDIS_DB)
+    parser.add_argument("--items", type=int, default=10_000)
+    args = parser.parse_args()
+    # Rotas abertas: o benchmark mede só as escritas em lote
+    Config.AUTH_REQUIRED = False
+
+    # As rotas usam o pool assíncrono, criado no startup a partir do Config
+    Config.REDIS_HOST, Config.REDIS_PORT, Config.REDIS_DB = args.host, args.port, args.db
+
+    print(f"{'modo':<12} | {'itens':>8} | {'tempo (s)':>9} | {'itens/s':>9}")
+    with TestClient(create_app()) as client:
+        for label, writer in (("um por um", one_by_one), ("lote", in_bulk)):
+            items = parts(args.items, label.replace(" ", ""))
+            start = time.perf_counter()
+            try:
+                writer(client, items)
+                elapsed = time.perf_counter() - start
+            finally:
+                cleanup(client, items)
+            print(f"{label:<12} | {args.items:>8} | {elapsed:>9.2f} | {args.items / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Benchmark da latência de leitura de registros (load_record) com o CLIENT TRACKING desligado
+# e ligado. Os registros são lidos ao acaso entre as --hot chaves mais quentes; com
+# --write-ratio uma fração das operações grava um campo, gerando invalidações.
+#
+# Uso (a partir da pasta backend, com um Redis >= 6 acessível):
+#   python -m benchmarks.bench_client_tracking --host localhost --reads 50000 --hot 200
+#
+# Os registros são gravados sob o prefixo "bench:machine:" e removidos ao final.
+import argparse
+import random
+import statistics
+import time
+
+import redis
+
+from app.redis_setting import client_tracking
+from app.redis_setting.redis_pool import chunked, encode_fields, load_record
+from config import Config
+
+PREFIX = "bench:machine:"
+
+
+def populate(redis_client, size):
+    for chunk in chunked(range(size), 1000):
+        pipe = redis_client.pipeline(transaction=False)
+        for i in chunk:
+            pipe.hset(f"{PREFIX}SN{i:07d}", mapping=encode_fields({
+                "name": f"Maquina {i}",
+                "type": "Industrial",
+                "model": "Mod-XYZ",
+                "serial_number": f"SN{i:07d}",
+                "location": "Linha de produção A",
+                "maintenance_history": [],
+                "status": "operando",
+            }))
+        pipe.execute()
+
+
+def cleanup(redis_client):
+    for chunk in chunked(redis_client.scan_iter(f"{PREFIX}*", count=1000), 1000):
+        redis_client.delete(*chunk)
+
+
+def run(redis_client, keys, reads, write_ratio):
+    latencies = []
+    for _ in range(reads):
+        key = random.choice(keys)
+        if random.random() < write_ratio:
+            redis_client.hset(key, mapping=encode_fields({"status": random.choice(["operando", "parada"])}))
+            continue
+        start = time.perf_counter()
+        load_record(redis_client, key)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies
+
+
+def report(label, latencies):
+    p50 = latencies[len(latencies) // 2] * 1_000_000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1_000_000
+    mean = statistics.fmean(latencies) * 1_000_000
+    print(f"{label:<12} | {len(latencies):>8} | {mean:>10.1f} | {p50:>9.1f} | {p99:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de leitura com CLIENT TRACKING")
+    parser.add_argument("--host", default=Config.REDIS_HOST)
+    parser.add_argument("--port", type=int, default=Config.REDIS_PORT)
+    parser.add_argument("--db", type=int, default=Config.REDIS_DB)
+    parser.add_argument("--records", type=int, default=10_000)
+    parser.add_argument("--hot", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=50_000)
+    parser.add_argument("--write-ratio", type=float, default=0.0)
+    args = parser.parse_args()
+
+    redis_client = redis.Redis(host=args.host, port=args.port, db=args.db)
+    cleanup(redis_client)
+    populate(redis_client, args.records)
+    keys = [f"{PREFIX}SN{i:07d}" for i in range(min(args.hot, args.records))]
+
+    print(f"{'tracking':<12} | {'leituras':>8} | {'média (µs)':>10} | {'p50 (µs)':>9} | {'p99 (µs)':>9}")
+    try:
+        report("desligado", run(redis_client, keys, args.reads, args.write_ratio))
+
+        client_tracking.start_tracking(redis_client, prefixes=[PREFIX])
+        deadline = time.monotonic() + 5
+        while not client_tracking.tracking_cache.active:
+            if time.monotonic() > deadline:
+                raise SystemExit("CLIENT TRACKING não foi ativado (o Redis é >= 6?)")
+            time.sleep(0.05)
+        report("ligado", run(redis_client, keys, args.reads, args.write_ratio))
+        print(client_tracking.tracking_cache.stats())
+    finally:
+        client_tracking.stop_tracking()
+        cleanup(redis_client)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Benchmark do codec dos registros: tempo de codificação/decodificação e bytes gravados por
+# tipo de entidade, comparando o JSON da biblioteca padrão (formato anterior, sem byte de
+# versão) com os formatos do codec (JSON via orjson e msgpack).
+#
+# Não usa o Redis: mede apenas encode_fields/decode_fields sobre registros de exemplo.
+#
+# Uso (a partir da pasta backend):
+#   python -m benchmarks.bench_codec --repeat 20000
+import argparse
+import json
+import time
+import uuid
+
+from app.redis_setting.redis_pool import (
+    encode_fields,
+    decode_fields,
+    JSON_FORMAT,
+    MSGPACK_FORMAT,
+    msgpack,
+    orjson,
+)
+
+SAMPLES = {
+    "machine": {
+        "name": "Torno CNC",
+        "type": "Industrial",
+        "model": "Mod-XYZ",
+        "serial_number": "SN0000001",
+        "location": "Linha de produção A",
+        "maintenance_history": ["2024-01-10", "2024-03-22", "2024-07-05"],
+        "status": "operando",
+    },
+    "team": {
+        "team_id": "team:Alfa",
+        "name": "Alfa",
+        "members": ["ana", "bruno", "carla", "diego"],
+        "specialites": ["elétrica", "hidráulica"],
+    },
+    "parts": {
+        "code": "P-0001",
+        "name": "Rolamento",
+        "description": "Rolamento de esferas 6204",
+        "location": "Almoxarifado 2",
+        "quantity": 120,
+    },
+    "maintenance": {
+        "maintenance_register_id": str(uuid.UUID(int=1)),
+        "machine_id": "machine:SN0000001",
+        "problem_description": "Vibração excessiva no eixo principal",
+        "request_date": "2024-01-01",
+        "priority": "Alta",
+        "assigned_team_id": "team:Alfa",
+        "status": "Aberta",
+    },
+    "user": {
+        "username": "ana",
+        "password": "$2b$12$" + "x" * 53,
+        "email": "ana@example.com",
+    },
+}
+
+
+# Formato anterior ao codec: json.dumps por campo, sem byte de versão
+def encode_stdlib(data):
+    return {field: json.dumps(value).encode("utf-8") for field, value in data.items()}
+
+
+def decode_stdlib(mapping):
+    return {field: json.loads(value) for field, value in mapping.items()}
+
+
+def codecs():
+    yield "json (stdlib)", encode_stdlib, decode_stdlib
+    if orjson is not None:
+        yield "json (orjson)", lambda data: encode_fields(data, JSON_FORMAT), decode_fields
+    if msgpack is not None:
+        yield "msgpack", lambda data: encode_fields(data, MSGPACK_FORMAT), decode_fields
+
+
+def stored_bytes(mapping):
+    return sum(len(field) + len(value) for field, value in mapping.items())
+
+
+def timed(function, argument, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(argument)
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do codec dos registros")
+    parser.add_argument("--repeat", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"{'entidade':<12} | {'codec':<14} | {'encode (µs)':>11} | {'decode (µs)':>11} | {'bytes':>6}")
+    for entity, sample in SAMPLES.items():
+        for label, encode, decode in codecs():
+            encoded = encode(sample)
+            assert decode(encoded) == sample, f"{label} não preservou o registro {entity}"
+            encode_time = timed(encode, sample, args.repeat)
+            decode_time = timed(decode, encoded, args.repeat)
+            print(
+                f"{entity:<12} | {label:<14} | {encode_time:>11.2f} | "
+                f"{decode_time:>11.2f} | {stored_bytes(encoded):>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
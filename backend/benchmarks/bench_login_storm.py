@@ -0,0 +1,170 @@
+# Benchmark de uma rajada de logins (troca de turno): --logins requisições POST /token
+# disparadas de uma vez, com no máximo --concurrency em voo, enquanto um cliente separado faz
+# GET /parts/{code} em sequência e mede a latência das rotas sem autenticação durante a rajada.
+#
+# Cada configuração de --workers é medida em sequência: 0 calcula o bcrypt no pool de threads
+# do próprio processo (como antes do pool de processos), N > 0 usa N processos
+# (Config.PASSWORD_HASH_WORKERS). Mostra logins/s, p50/p99 dos logins, logins recusados (503,
+# fila cheia) e p50/p99 e falhas da rota sem autenticação, com a linha de base medida sem logins.
+#
+# Uso (a partir da pasta backend, com um Redis acessível; use um banco separado com --db):
+#   python -m benchmarks.bench_login_storm --host localhost --db 15 --logins 300 --workers 0,2,4
+#
+# Os usuários e a parte são gravados com o prefixo "BENCH-" e removidos ao final.
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+import redis
+
+from app.auther import hashing
+from app.auther.hashing import password_context
+from app.auther.revocation import issued_tokens_key
+from app.redis_setting import async_pool
+from app.redis_setting.cluster import record_key
+from app.redis_setting.redis_pool import create_record
+from app_factory import create_app
+from config import Config
+
+PREFIX = "BENCH-"
+PASSWORD = "senha-do-turno"
+PART_CODE = f"{PREFIX}PART"
+
+
+def populate(redis_client, users, rounds):
+    # Todos com a mesma senha: um único hash, calculado uma vez
+    password_hash = password_context(rounds).hash(PASSWORD)
+    keys = []
+    for i in range(users):
+        username = f"{PREFIX}{i:05d}"
+        key = record_key("user", username)
+        create_record(redis_client, key, {"username": username, "password": password_hash, "email": f"{username}@bench"})
+        keys.append(key)
+    part_key = record_key("parts", PART_CODE)
+    part = {"code": PART_CODE, "description": "Parte", "location": "Almoxarifado", "name": "Rolamento", "quantity": 1}
+    create_record(redis_client, part_key, part, sets=["parts_list"])
+    return keys, part_key
+
+
+def cleanup(redis_client, keys, part_key, users):
+    redis_client.delete(*keys, part_key, *(issued_tokens_key(f"{PREFIX}{i:05d}") for i in range(users)))
+    redis_client.srem("parts_list", part_key)
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def ms(values, fraction):
+    return percentile(values, fraction) * 1000
+
+
+# GET sem autenticação em sequência até stop ser marcado; devolve as latências e as falhas
+async def probe(client, stop):
+    latencies, errors = [], 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(f"/parts/{PART_CODE}")
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors += 1
+        await asyncio.sleep(0.005)
+    return latencies, errors
+
+
+async def storm(client, users, logins, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, rejected, errors = [], 0, 0
+
+    async def one(i):
+        nonlocal rejected, errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/token", data={"username": f"{PREFIX}{i % users:05d}", "password": PASSWORD})
+            if response.status_code == 503:
+                rejected += 1
+            elif response.status_code != 200:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(logins)))
+    return len(latencies) / (time.perf_counter() - start), latencies, rejected, errors
+
+
+async def run_mode(app, users, logins, concurrency):
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        await hashing.start_pool()
+        stop = asyncio.Event()
+        baseline = asyncio.ensure_future(probe(client, stop))
+        await asyncio.sleep(1)
+        stop.set()
+        baseline, _ = await baseline
+
+        stop = asyncio.Event()
+        during = asyncio.ensure_future(probe(client, stop))
+        result = await storm(client, users, logins, concurrency)
+        stop.set()
+        during = await during
+        await hashing.stop_pool()
+    return result, baseline, during
+
+
+async def benchmark(app, modes, users, logins, concurrency):
+    print(
+        f"{'workers':>7} | {'logins/s':>8} | {'login p50':>9} | {'login p99':>9} | {'503':>4} | {'erros':>5} | "
+        f"{'GET base p50':>12} | {'GET p50':>8} | {'GET p99':>8} | {'GET erros':>9}"
+    )
+    for workers in modes:
+        Config.PASSWORD_HASH_WORKERS = workers
+        (rate, latencies, rejected, errors), baseline, (during, probe_errors) = await run_mode(
+            app, users, logins, concurrency
+        )
+        print(
+            f"{workers:>7} | {rate:>8.1f} | {ms(latencies, 0.5):>9.1f} | {ms(latencies, 0.99):>9.1f} | {rejected:>4} | "
+            f"{errors:>5} | {statistics.median(baseline) * 1000:>12.2f} | {ms(during, 0.5):>8.2f} | {ms(during, 0.99):>8.2f} | {probe_errors:>9}"
+        )
+    await async_pool.stop_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de uma rajada de logins")
+    parser.add_argument("--host", default=Config.REDIS_HOST)
+    parser.add_argument("--port", type=int, default=Config.REDIS_PORT)
+    parser.add_argument("--db", type=int, default=Config.REDIS_DB)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--logins", type=int, default=300, help="logins da rajada")
+    parser.add_argument("--concurrency", type=int, default=300, help="logins em voo ao mesmo tempo")
+    parser.add_argument("--workers", default="0,4", help="processos do bcrypt em cada medição (0 = threads)")
+    parser.add_argument("--rounds", type=int, default=Config.BCRYPT_ROUNDS, help="custo do bcrypt")
+    parser.add_argument("--queue-limit", type=int, default=Config.PASSWORD_HASH_QUEUE_LIMIT)
+    args = parser.parse_args()
+    # A rota sem autenticação de referência é GET /parts/{code}
+    Config.AUTH_REQUIRED = False
+
+    Config.REDIS_HOST, Config.REDIS_PORT, Config.REDIS_DB = args.host, args.port, args.db
+    Config.BCRYPT_ROUNDS = args.rounds
+    Config.PASSWORD_HASH_QUEUE_LIMIT = args.queue_limit
+    redis_client = redis.Redis(host=args.host, port=args.port, db=args.db)
+    keys, part_key = populate(redis_client, args.users, args.rounds)
+    try:
+        print(
+            f"custo do bcrypt: {args.rounds}, usuários: {args.users}, logins: {args.logins}, "
+            f"concorrência: {args.concurrency}, fila: {args.queue_limit}"
+        )
+        modes = [int(workers) for workers in args.workers.split(",")]
+        asyncio.run(benchmark(create_app(), modes, args.users, args.logins, args.concurrency))
+    finally:
+        cleanup(redis_client, keys, part_key, args.users)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Benchmark de requisições por segundo em GET /maintenance com a leitura confiável desligada
+# (registros reconstruídos como modelos Pydantic e revalidados pelo response_model) e ligada
+# (registros conferidos e serializados direto). As requisições usam o filtro de status, que lê
+# os registros do Redis a cada chamada (a listagem completa seria servida do snapshot).
+#
+# Uso (a partir da pasta backend, com um Redis acessível; use um banco separado com --db):
+#   python -m benchmarks.bench_trusted_reads --host localhost --db 15 --records 2000 --requests 200
+#
+# As manutenções são gravadas com o status "Benchmark" e removidas ao final.
+import argparse
+import time
+import uuid
+
+import redis
+from fastapi.testclient import TestClient
+
+from app.maintenance.indexes import MAINTENANCE_LIST, creation_indexes, remove_from_indexes
+from app.redis_setting.redis_pool import chunked, create_record, fetch_many
+from app_factory import create_app
+from config import Config
+
+STATUS = "Benchmark"
+
+
+def populate(redis_client, size):
+    keys = []
+    for i in range(size):
+        data = {
+            "maintenance_register_id": str(uuid.uuid4()),
+            "problem_description": f"Problema {i}",
+            "request_date": f"2024-01-{i % 28 + 1:02d}",
+            "priority": "Alta",
+            "assigned_team_id": "team:Benchmark",
+            "status": STATUS,
+            "machine_id": f"SN{i:07d}",
+        }
+        key = f"maintenance:{data['maintenance_register_id']}"
+        index_sets, date_index = creation_indexes(data)
+        create_record(redis_client, key, data, sets=[MAINTENANCE_LIST, *index_sets], sorted_sets=date_index)
+        keys.append(key)
+    return keys
+
+
+def cleanup(redis_client, keys):
+    for chunk in chunked(keys, 1000):
+        records = dict(fetch_many(redis_client, chunk))
+        pipe = redis_client.pipeline(transaction=False)
+        for key in chunk:
+            remove_from_indexes(pipe, key, records.get(key, {}))
+            pipe.srem(MAINTENANCE_LIST, key)
+            pipe.delete(key)
+        pipe.execute()
+
+
+def run(client, url, requests):
+    client.get(url)
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(url)
+        response.raise_for_status()
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da leitura confiável em GET /maintenance")
+    parser.add_argument("--host", default=Config.REDIS_HOST)
+    parser.add_argument("--port", type=int, default=Config.REDIS_PORT)
+    parser.add_argument("--db", type=int, default=Config.REDIS_DB)
+    parser.add_argument("--records", type=int, default=2_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=None, help="tamanho da página (padrão: sem paginação)")
+    args = parser.parse_args()
+    # Rotas abertas: a comparação é só da validação das listagens
+    Config.AUTH_REQUIRED = False
+
+    redis_client = redis.Redis(host=args.host, port=args.port, db=args.db)
+    # As rotas usam o pool assíncrono, criado no startup a partir do Config
+    Config.REDIS_HOST, Config.REDIS_PORT, Config.REDIS_DB = args.host, args.port, args.db
+    url = f"/maintenance?status={STATUS}" + (f"&limit={args.limit}" if args.limit else "")
+
+    keys = populate(redis_client, args.records)
+    print(f"{'leitura':<12} | {'registros':>9} | {'req/s':>8}")
+    try:
+        with TestClient(create_app()) as client:
+            results = {}
+            for trusted in (False, True):
+                Config.TRUSTED_READS = trusted
+                results[trusted] = run(client, url, args.requests)
+                print(f"{'confiável' if trusted else 'validada':<12} | {args.records:>9} | {results[trusted]:>8.1f}")
+            print(f"ganho: {results[True] / results[False]:.2f}x")
+    finally:
+        cleanup(redis_client, keys)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Benchmark das atualizações parciais (PUT): HGETALL + mescla no Python + regravação do hash inteiro
+# vs. script Lua (merge_record), que grava só os campos alterados.
+#
+# Vários workers atualizam concorrentemente o mesmo registro, cada um gravando o próprio campo.
+# Além da vazão, o benchmark conta as atualizações perdidas: ao final, todo worker deveria ver
+# o seu último valor gravado no registro.
+#
+# Uso (a partir da pasta backend, com um Redis acessível):
+#   python -m benchmarks.bench_updates --host localhost --workers 16 --updates 500
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+
+from app.redis_setting.redis_pool import merge_record, load_record, encode_fields
+from config import Config
+
+KEY = "bench:parts:P-0001"
+
+
+def update_in_python(redis_client, changes):
+    data = load_record(redis_client, KEY)
+    data.update(changes)
+    pipe = redis_client.pipeline()
+    pipe.delete(KEY)
+    pipe.hset(KEY, mapping=encode_fields(data))
+    pipe.execute()
+
+
+def update_in_redis(redis_client, changes):
+    merge_record(redis_client, KEY, changes)
+
+
+def run(redis_client, updater, workers, updates):
+    redis_client.delete(KEY)
+    redis_client.hset(KEY, mapping=encode_fields({"code": "P-0001", "name": "Peça", "quantity": 0}))
+
+    def worker(worker_id):
+        for i in range(updates):
+            updater(redis_client, {f"worker_{worker_id}": i})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(worker, range(workers)))
+    elapsed = time.perf_counter() - start
+
+    final = load_record(redis_client, KEY)
+    lost = sum(1 for w in range(workers) if final.get(f"worker_{w}") != updates - 1)
+    return workers * updates / elapsed, lost
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de atualizações concorrentes no Redis")
+    parser.add_argument("--host", default=Config.REDIS_HOST)
+    parser.add_argument("--port", type=int, default=Config.REDIS_PORT)
+    parser.add_argument("--db", type=int, default=Config.REDIS_DB)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--updates", type=int, default=500)
+    args = parser.parse_args()
+
+    redis_client = redis.Redis(
+        connection_pool=redis.ConnectionPool(
+            host=args.host, port=args.port, db=args.db, max_connections=args.workers
+        )
+    )
+
+    print(f"{'modo':<16} | {'atualizações/s':>14} | {'workers com valor perdido':>25}")
+    try:
+        for label, updater in (
+            ("HGETALL + HSET", update_in_python),
+            ("script Lua", update_in_redis),
+        ):
+            throughput, lost = run(redis_client, updater, args.workers, args.updates)
+            print(f"{label:<16} | {throughput:>14.0f} | {lost:>13} de {args.workers:<8}")
+    finally:
+        redis_client.delete(KEY)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,21 @@
+import os
+
+
+# Leitura de variáveis de ambiente com valor padrão
+def _env(name, default, cast=str):
+    value = os.getenv(name)
+    return default if value is None or value == "" else cast(value)
+
+
+def _env_bool(value):
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Lista separada por vírgulas ("machine:,team:")
+def _env_tuple(value):
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
 class Config:
     # Api configuration
     port=8000
@@ -5,10 +23,101 @@ class Config:
     
     
     # Redis configuration for docker
-    REDIS_HOST = 'redis'
-    REDIS_PORT = 6379
-    REDIS_DB = 0
-    
+    REDIS_HOST = _env("REDIS_HOST", 'redis')
+    REDIS_PORT = _env("REDIS_PORT", 6379, int)
+    REDIS_DB = _env("REDIS_DB", 0, int)
+
+    # Pool de conexões com o Redis (configurável por variáveis de ambiente). Com o pool
+    # bloqueante, picos de requisições esperam até REDIS_POOL_TIMEOUT segundos por uma conexão
+    # livre em vez de abrir conexões sem limite. Comandos que falham por conexão ou timeout são
+    # repetidos até REDIS_RETRY_ATTEMPTS vezes com backoff exponencial com jitter (base/teto em
+    # segundos), dentro do orçamento de REDIS_REQUEST_BUDGET segundos por requisição (0 desliga),
+    # e conexões paradas há mais de REDIS_HEALTH_CHECK_INTERVAL segundos recebem um PING antes
+    # de serem usadas.
+    REDIS_MAX_CONNECTIONS = _env("REDIS_MAX_CONNECTIONS", 50, int)
+    REDIS_POOL_BLOCKING = _env("REDIS_POOL_BLOCKING", True, _env_bool)
+    REDIS_POOL_TIMEOUT = _env("REDIS_POOL_TIMEOUT", 5.0, float)
+    REDIS_SOCKET_TIMEOUT = _env("REDIS_SOCKET_TIMEOUT", 5.0, float)
+    REDIS_SOCKET_CONNECT_TIMEOUT = _env("REDIS_SOCKET_CONNECT_TIMEOUT", 2.0, float)
+    REDIS_SOCKET_KEEPALIVE = _env("REDIS_SOCKET_KEEPALIVE", True, _env_bool)
+    REDIS_HEALTH_CHECK_INTERVAL = _env("REDIS_HEALTH_CHECK_INTERVAL", 30, int)
+    REDIS_RETRY_ATTEMPTS = _env("REDIS_RETRY_ATTEMPTS", 2, int)
+    REDIS_RETRY_BACKOFF_BASE = _env("REDIS_RETRY_BACKOFF_BASE", 0.05, float)
+    REDIS_RETRY_BACKOFF_CAP = _env("REDIS_RETRY_BACKOFF_CAP", 0.5, float)
+    REDIS_REQUEST_BUDGET = _env("REDIS_REQUEST_BUDGET", 2.0, float)
+
+    # Circuit breaker: depois de REDIS_BREAKER_FAILURES chamadas seguidas com falha as chamadas
+    # ao Redis falham na hora (503) por REDIS_BREAKER_RESET_TIMEOUT segundos
+    REDIS_BREAKER_FAILURES = _env("REDIS_BREAKER_FAILURES", 5, int)
+    REDIS_BREAKER_RESET_TIMEOUT = _env("REDIS_BREAKER_RESET_TIMEOUT", 5.0, float)
+
+    # Réplicas de leitura ("host:porta,host:porta"): as rotas GET leem de uma delas, em rodízio
+    # ("round_robin") ou pela menor latência ("least_latency"); as escritas vão para o primário.
+    # A saúde das réplicas é conferida a cada REDIS_REPLICA_CHECK_INTERVAL segundos. Com
+    # REDIS_READ_YOUR_WRITES, quem acabou de escrever lê do primário por
+    # REDIS_READ_YOUR_WRITES_WINDOW segundos (cookie/cabeçalho X-Read-Your-Writes).
+    REDIS_REPLICAS = _env("REDIS_REPLICAS", "")
+    REDIS_READ_STRATEGY = _env("REDIS_READ_STRATEGY", "round_robin")
+    REDIS_REPLICA_CHECK_INTERVAL = _env("REDIS_REPLICA_CHECK_INTERVAL", 5.0, float)
+    REDIS_READ_YOUR_WRITES = _env("REDIS_READ_YOUR_WRITES", True, _env_bool)
+    REDIS_READ_YOUR_WRITES_WINDOW = _env("REDIS_READ_YOUR_WRITES_WINDOW", 2.0, float)
+
+    # Redis Cluster: nós iniciais ("host:porta,host:porta"; padrão REDIS_HOST:REDIS_PORT) e
+    # quantidade de buckets em que cada coleção é dividida (ver app/redis_setting/cluster.py).
+    # REDIS_CLUSTER_BUCKETS não pode mudar depois que houver dados gravados no cluster.
+    REDIS_CLUSTER = _env("REDIS_CLUSTER", False, _env_bool)
+    REDIS_CLUSTER_NODES = _env("REDIS_CLUSTER_NODES", "")
+    REDIS_CLUSTER_BUCKETS = _env("REDIS_CLUSTER_BUCKETS", 64, int)
+    REDIS_CLUSTER_READ_FROM_REPLICAS = _env("REDIS_CLUSTER_READ_FROM_REPLICAS", False, _env_bool)
+
+    # Quantidade de chaves por MGET nas leituras em lote
+    REDIS_BULK_CHUNK_SIZE = _env("REDIS_BULK_CHUNK_SIZE", 500, int)
+
+    # Paginação das listagens (cursor/limit)
+    PAGE_SIZE = _env("PAGE_SIZE", 100, int)
+    MAX_PAGE_SIZE = _env("MAX_PAGE_SIZE", 1000, int)
+
+    # Formato dos valores gravados nos registros: "msgpack" ou "json" (registros antigos
+    # continuam legíveis em qualquer um dos dois). Usa os pacotes msgpack e orjson quando
+    # instalados; sem o msgpack os registros são gravados em JSON.
+    REDIS_CODEC = _env("REDIS_CODEC", "json")
+
+    # Tempo (s) que o resultado de uma consulta com vários filtros de manutenção fica em cache
+    MAINTENANCE_QUERY_TTL = _env("MAINTENANCE_QUERY_TTL", 60, int)
+
+    # Cache em memória das leituras de máquinas, equipes e peças (por worker), invalidado
+    # via pub/sub no canal LOCAL_CACHE_CHANNEL a cada escrita
+    LOCAL_CACHE_ENABLED = _env("LOCAL_CACHE_ENABLED", True, _env_bool)
+    LOCAL_CACHE_MAX_ENTRIES = _env("LOCAL_CACHE_MAX_ENTRIES", 1024, int)
+    LOCAL_CACHE_TTL = _env("LOCAL_CACHE_TTL", 30, float)
+    LOCAL_CACHE_CHANNEL = _env("LOCAL_CACHE_CHANNEL", "cache_invalidation")
+
+    # Cache no cliente assistido pelo Redis (CLIENT TRACKING em modo BCAST): os hashes das
+    # chaves com estes prefixos ficam em memória em cada worker, até REDIS_TRACKING_MAX_KEYS
+    # chaves, e o próprio Redis avisa quando mudam
+    REDIS_CLIENT_TRACKING = _env("REDIS_CLIENT_TRACKING", False, _env_bool)
+    REDIS_TRACKING_PREFIXES = _env("REDIS_TRACKING_PREFIXES", ("machine:", "team:"), _env_tuple)
+    REDIS_TRACKING_MAX_KEYS = _env("REDIS_TRACKING_MAX_KEYS", 10000, int)
+
+    # Rotas em lote (/bulk): máximo de itens por requisição e itens por transação no Redis
+    BULK_MAX_ITEMS = _env("BULK_MAX_ITEMS", 10000, int)
+    BULK_WRITE_CHUNK_SIZE = _env("BULK_WRITE_CHUNK_SIZE", 500, int)
+
+    # Backup/restauração: nível do gzip e tamanho a partir do qual o upload da restauração vai
+    # para disco. As rotas /admin exigem o cabeçalho X-Admin-Token igual a ADMIN_TOKEN e ficam
+    # desativadas enquanto ele não for definido.
+    BACKUP_COMPRESSION_LEVEL = _env("BACKUP_COMPRESSION_LEVEL", 6, int)
+    BACKUP_SPOOL_BYTES = _env("BACKUP_SPOOL_BYTES", 64 * 1024 * 1024, int)
+    ADMIN_TOKEN = _env("ADMIN_TOKEN", None)
+
+    # Leitura confiável nas listagens: registros gravados pela API são enviados sem revalidação
+    TRUSTED_READS = _env("TRUSTED_READS", True, _env_bool)
+
+    # Snapshots pré-serializados das listagens completas, comprimidos com gzip acima do tamanho mínimo
+    SNAPSHOT_COMPRESSION = _env("SNAPSHOT_COMPRESSION", True, _env_bool)
+    SNAPSHOT_MIN_COMPRESS_BYTES = _env("SNAPSHOT_MIN_COMPRESS_BYTES", 1024, int)
+    SNAPSHOT_COMPRESSION_LEVEL = _env("SNAPSHOT_COMPRESSION_LEVEL", 5, int)
+
     # redis configuration for localhost
     # REDIS_HOST = '0.0.0.0'
     # REDIS_PORT = 6379
@@ -20,3 +129,27 @@ class Config:
     SECRET_KEY = "secret"
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+    # Senhas: custo do bcrypt (hashes com outro custo são refeitos no login) e pool de processos
+    # que calcula os hashes fora do worker (0 usa threads). Com PASSWORD_HASH_QUEUE_LIMIT
+    # operações já esperando, novos logins/cadastros recebem 503 (ver app/auther/hashing.py).
+    BCRYPT_ROUNDS = _env("BCRYPT_ROUNDS", 12, int)
+    PASSWORD_HASH_WORKERS = _env("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1), int)
+    PASSWORD_HASH_QUEUE_LIMIT = _env("PASSWORD_HASH_QUEUE_LIMIT", 64, int)
+
+    # Autenticação das rotas de máquinas, manutenções, equipes e peças (token Bearer de /token).
+    # Desligada por padrão nesta versão para os clientes que ainda não enviam o token (o app
+    # mobile); o padrão passa a ser ligado na próxima versão (ver "Autenticação" no readme.md).
+    # Tokens verificados ficam em cache até expirar e os usuários por AUTH_USER_CACHE_TTL
+    # segundos (ver app/auther/token_cache.py)
+    AUTH_REQUIRED = _env("AUTH_REQUIRED", False, _env_bool)
+    AUTH_TOKEN_CACHE_SIZE = _env("AUTH_TOKEN_CACHE_SIZE", 10000, int)
+    AUTH_USER_CACHE_SIZE = _env("AUTH_USER_CACHE_SIZE", 10000, int)
+    AUTH_USER_CACHE_TTL = _env("AUTH_USER_CACHE_TTL", 5.0, float)
+
+    # Revogação de tokens: canal que avisa os workers e filtro de Bloom local dos jtis
+    # revogados (capacidade, taxa de falsos positivos e reconstrução, em segundos)
+    REVOCATION_CHANNEL = _env("REVOCATION_CHANNEL", "token_revocation")
+    REVOCATION_FILTER_CAPACITY = _env("REVOCATION_FILTER_CAPACITY", 10000, int)
+    REVOCATION_FILTER_ERROR_RATE = _env("REVOCATION_FILTER_ERROR_RATE", 0.001, float)
+    REVOCATION_FILTER_REBUILD_INTERVAL = _env("REVOCATION_FILTER_REBUILD_INTERVAL", 300, float)